@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from src.agent.react_agent import build_agent
+from src.retrieval.recipe_retriever import warmup
 
 # --- Page config ---
 st.set_page_config(
@@ -57,6 +58,9 @@ header { visibility: hidden; }
 
 st.title("🥗 Nutribot")
 
+# --- Load model + vector index in the background (no-op after first run) ---
+warmup()
+
 # --- Initialize agent once ---
 if "agent" not in st.session_state:
     st.session_state.agent = build_agent()
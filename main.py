@@ -44,12 +44,16 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from src.agent.react_agent import build_agent
+from src.retrieval.recipe_retriever import warmup
 
 
 def get_agent():
     return build_agent()
 
 def run():
+    # Model + index load overlaps with the user typing the first message
+    warmup()
+
     print("NutriChat (agentic + grounded) — type 'exit' to quit\n")
 
     agent = get_agent()
@@ -0,0 +1,86 @@
+# src/benchmarks/bench_compressed_index.py
+#
+# Memory vs recall for the compressed index types (sq8, sqfp16, ivfpq)
+# against exact float32 search, with and without exact re-ranking of
+# k * rerank candidates from the full-precision vectors. Memory is given
+# per million recipes, both estimated (bytes per vector) and measured
+# (serialized index size scaled to 1M). Queries are noisy corpus vectors,
+# as in bench_vector_index.
+#
+#   python -m src.benchmarks.bench_compressed_index --k 15 --queries 500 \
+#       --pq-m 24 48 96 --rerank 0 2 4
+
+import argparse
+import time
+from typing import List
+
+import faiss
+import numpy as np
+
+from src.benchmarks.bench_vector_index import _build, _load_corpus, _make_queries
+from src.retrieval.vector_index import IndexConfig, exact_rerank
+
+
+def _measure(index, corpus: np.ndarray, queries: np.ndarray, k: int, rerank: int, truth: np.ndarray):
+    latencies: List[float] = []
+    hits = 0
+    for i in range(len(queries)):
+        q = queries[i:i + 1]
+        start = time.perf_counter()
+        if rerank:
+            _, rows = index.search(q, k * rerank)
+            _, rows = exact_rerank(q, rows, corpus, k)
+        else:
+            _, rows = index.search(q, k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(np.intersect1d(rows[0], truth[i]))
+    ms = np.array(latencies) * 1000
+    return hits / truth.size, np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed FAISS index memory / recall / latency")
+    parser.add_argument("--k", type=int, default=15, help="k * oversample used by retrieve_recipes")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, default=IndexConfig().nprobe)
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[24, 48, 96])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 2, 4])
+    args = parser.parse_args()
+
+    corpus = _load_corpus()
+    n, dim = corpus.shape
+    queries = _make_queries(corpus, args.queries, args.noise, seed=1)
+    print(f"corpus {n:,} x {dim}, {len(queries)} queries, k={args.k}")
+
+    flat, _ = _build(IndexConfig("flat"), corpus)
+    _, truth = flat.search(queries, args.k)
+
+    configs = [IndexConfig("flat"), IndexConfig("sqfp16"), IndexConfig("sq8")]
+    configs += [
+        IndexConfig("ivfpq", nlist=args.nlist, nprobe=args.nprobe, pq_m=m).resolved(n)
+        for m in args.pq_m if dim % m == 0
+    ]
+
+    print(
+        f"{'index':<50}{'B/vec':>7}{'MB/1M':>8}{'meas.':>8}{'build s':>9}"
+        f"{'recall@k':>10}{'p50 ms':>9}{'p99 ms':>9}"
+    )
+    for config in configs:
+        index, build_s = (flat, 0.0) if config.kind == "flat" else _build(config, corpus)
+        measured = faiss.serialize_index(index).nbytes / n * 1e6 / 2**20
+        per_vector = config.bytes_per_vector(dim)
+        for rerank in ([0] if config.kind == "flat" else args.rerank):
+            run = config.with_search_params(rerank=rerank)
+            recall, p50, p99 = _measure(index, corpus, queries, args.k, rerank, truth)
+            print(
+                f"{run.describe():<50}{per_vector:>7.0f}{per_vector * 1e6 / 2**20:>8.0f}{measured:>8.0f}"
+                f"{build_s:>9.2f}{recall:>10.3f}{p50:>9.3f}{p99:>9.3f}"
+            )
+
+    print(f"re-rank vectors (mmap'd, paged in on demand): {4 * dim * 1e6 / 2**20:.0f} MB/1M on disk")
+
+
+if __name__ == "__main__":
+    main()
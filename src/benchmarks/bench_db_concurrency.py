@@ -0,0 +1,112 @@
+# src/benchmarks/bench_db_concurrency.py
+#
+# Concurrent read throughput of the serving engine configurations:
+# bare default engine vs tuned read-only ("file") vs in-memory snapshot.
+# Each worker thread mixes a pandas batch fetch with DB-API point lookups,
+# roughly what one agent turn does. The default thread counts go past the
+# pool size, and failed turns (e.g. a connection closed under a thread)
+# are counted.
+#
+#   python -m src.benchmarks.bench_db_concurrency --threads 1 4 16 32 --seconds 3
+
+import argparse
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, List
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from src.config.settings import DB_PATH, DB_POOL_SIZE
+from src.db.engine import connect_reader, create_read_engine
+
+
+def _worker_loop(
+        make_cursor: Callable,
+        eng,
+        max_id: int,
+        stop_at: float,
+        counts: List[int],
+        errors: List[int],
+        slot: int,
+):
+    rng = random.Random(slot)
+    cur = make_cursor()
+    ops = failed = 0
+    while time.perf_counter() < stop_at:
+        ids = [rng.randint(1, max_id) for _ in range(10)]
+        placeholders = ",".join("?" for _ in ids)
+        try:
+            pd.read_sql(
+                f"SELECT recipe_id, name, calories FROM recipes WHERE recipe_id IN ({placeholders})",
+                eng,
+                params=tuple(ids),
+            )
+            for rid in ids:
+                cur.execute("SELECT ingredient FROM recipe_ingredients WHERE recipe_id = ?", (rid,)).fetchall()
+            ops += 1
+        except Exception:
+            failed += 1
+    counts[slot] = ops
+    errors[slot] = failed
+
+
+def _run(name: str, eng, make_cursor: Callable, threads: int, seconds: float, max_id: int):
+    counts = [0] * threads
+    errors = [0] * threads
+    stop_at = time.perf_counter() + seconds
+    workers = [
+        threading.Thread(target=_worker_loop, args=(make_cursor, eng, max_id, stop_at, counts, errors, i))
+        for i in range(threads)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    total = sum(counts)
+    print(f"{name:<10}{threads:>8}{total / seconds:>14.1f}{sum(errors):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent SQLite read throughput")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=[1, 4, DB_POOL_SIZE, 2 * DB_POOL_SIZE],
+        help="Thread counts (include some above --pool-size)",
+    )
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--pool-size", type=int, default=DB_POOL_SIZE)
+    args = parser.parse_args()
+
+    configs = [
+        (
+            "default",
+            create_engine(f"sqlite:///{DB_PATH}", future=True),
+            lambda: sqlite3.connect(str(DB_PATH), check_same_thread=False).cursor(),
+        ),
+        (
+            "file",
+            create_read_engine("file", args.pool_size),
+            lambda: connect_reader("file").cursor(),
+        ),
+        (
+            "memory",
+            create_read_engine("memory", args.pool_size),
+            lambda: connect_reader("memory").cursor(),
+        ),
+    ]
+
+    max_id = connect_reader("file").execute("SELECT MAX(recipe_id) FROM recipes").fetchone()[0]
+
+    print(f"{'config':<10}{'threads':>8}{'turns/sec':>14}{'errors':>8}")
+    for name, eng, make_cursor in configs:
+        for n in args.threads:
+            _run(name, eng, make_cursor, n, args.seconds, max_id)
+
+
+if __name__ == "__main__":
+    main()
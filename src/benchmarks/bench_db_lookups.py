@@ -0,0 +1,91 @@
+# src/benchmarks/bench_db_lookups.py
+#
+# Per-call latency of the small lookups in src/db/recipes.py:
+# the old pd.read_sql implementation ("before") vs the DB-API fast path.
+#
+#   python -m src.benchmarks.bench_db_lookups --calls 2000
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import pandas as pd
+
+from src.db.engine import engine
+from src.db import recipes
+
+
+# --------------------------------------------------
+# Previous (pandas) implementations
+# --------------------------------------------------
+
+def _pd_recipe_by_id(recipe_id: int):
+    df = pd.read_sql("SELECT * FROM recipes WHERE recipe_id = ?", engine, params=(recipe_id,))
+    return df.iloc[0].to_dict() if not df.empty else None
+
+
+def _pd_ingredients(recipe_id: int):
+    df = pd.read_sql(
+        "SELECT ingredient FROM recipe_ingredients WHERE recipe_id = ?",
+        engine,
+        params=(recipe_id,),
+    )
+    return df["ingredient"].tolist()
+
+
+def _pd_tags(recipe_id: int):
+    df = pd.read_sql("SELECT tag FROM recipe_tags WHERE recipe_id = ?", engine, params=(recipe_id,))
+    return df["tag"].tolist()
+
+
+def _pd_nutrition(recipe_id: int):
+    df = pd.read_sql(
+        f"SELECT {', '.join(recipes.NUTRITION_COLUMNS)} FROM recipes WHERE recipe_id = ?",
+        engine,
+        params=(recipe_id,),
+    )
+    return df.iloc[0].to_dict() if not df.empty else {}
+
+
+# --------------------------------------------------
+# Harness
+# --------------------------------------------------
+
+def _time_per_call(fn: Callable[[int], object], ids: List[int]) -> float:
+    for rid in ids[:50]:  # warm caches / statement cache
+        fn(rid)
+    start = time.perf_counter()
+    for rid in ids:
+        fn(rid)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Small-lookup latency: pandas vs fast path")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        max_id = conn.exec_driver_sql("SELECT MAX(recipe_id) FROM recipes").scalar()
+
+    rng = random.Random(args.seed)
+    ids = [rng.randint(1, max_id) for _ in range(args.calls)]
+
+    cases = [
+        ("get_recipe_by_id", _pd_recipe_by_id, recipes.get_recipe_by_id),
+        ("get_recipe_ingredients", _pd_ingredients, recipes.get_recipe_ingredients),
+        ("get_recipe_tags", _pd_tags, recipes.get_recipe_tags),
+        ("get_recipe_nutrition", _pd_nutrition, recipes.get_recipe_nutrition),
+    ]
+
+    print(f"{'lookup':<26}{'pandas µs':>12}{'fast µs':>12}{'speedup':>10}")
+    for name, before, after in cases:
+        t_before = _time_per_call(before, ids)
+        t_after = _time_per_call(after, ids)
+        print(f"{name:<26}{t_before:>12.1f}{t_after:>12.1f}{t_before / t_after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# src/benchmarks/bench_embedders.py
+#
+# Cold start, per-query latency and batch throughput of each query-encoder
+# backend. Every backend runs in a fresh interpreter so import time
+# (torch vs onnxruntime) is measured, not shared.
+#
+#   python -m src.benchmarks.bench_embedders --backends torch onnx onnx-int8 \
+#       --queries 300 --docs 2048 --threads 4
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from src.benchmarks.queries import sample_queries
+from src.retrieval.embedders import EMBEDDING_BACKENDS
+
+
+def _texts(n: int, words: int) -> List[str]:
+    return [" ".join([q] * words) for q in sample_queries(n, meals=True)]
+
+
+def _child(backend: str, n_queries: int, n_docs: int, threads: Optional[int]) -> dict:
+    start = time.perf_counter()
+    if backend == "torch" and threads:
+        import torch
+
+        torch.set_num_threads(threads)
+    from src.retrieval.embedders import make_embedder
+
+    embedder = make_embedder(backend, device="cpu", threads=threads)
+    load_s = time.perf_counter() - start
+
+    queries = _texts(n_queries, 1)
+    start = time.perf_counter()
+    embedder.embed_query(queries[0])
+    first_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        embedder.embed_query(q)
+        latencies.append(time.perf_counter() - start)
+    ms = np.array(latencies) * 1000
+
+    docs = _texts(n_docs, 6)    # document-length inputs
+    start = time.perf_counter()
+    embedder.embed_documents(docs)
+    docs_s = time.perf_counter() - start
+
+    return {
+        "load_s": load_s,
+        "first_ms": first_ms,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "qps": len(queries) / ms.sum() * 1000,
+        "docs_per_s": n_docs / docs_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query encoder backend latency / throughput")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--docs", type=int, default=2048)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--child", choices=EMBEDDING_BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.queries, args.docs, args.threads)))
+        return
+
+    print(
+        f"{'backend':<12}{'load s':>8}{'1st ms':>9}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'q/s':>9}{'docs/s':>9}"
+    )
+    for backend in args.backends:
+        cmd = [
+            sys.executable, "-m", "src.benchmarks.bench_embedders", "--child", backend,
+            "--queries", str(args.queries), "--docs", str(args.docs),
+        ]
+        if args.threads:
+            cmd += ["--threads", str(args.threads)]
+        run = subprocess.run(cmd, capture_output=True, text=True)
+        if run.returncode != 0:
+            print(f"{backend:<12}failed: {run.stderr.strip().splitlines()[-1] if run.stderr else run.returncode}")
+            continue
+        r = json.loads(run.stdout.strip().splitlines()[-1])
+        print(
+            f"{backend:<12}{r['load_s']:>8.2f}{r['first_ms']:>9.1f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+            f"{r['qps']:>9.0f}{r['docs_per_s']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# src/benchmarks/bench_hybrid.py
+#
+# Cost and benefit of the BM25 side of hybrid retrieval:
+#   - lexical index build time / size over the recipes table
+#   - BM25 latency per query (p50 / p99), on its own
+#   - retrieve_recipes latency in "vector" vs "hybrid" mode (cold caches)
+#   - hit@k on exact dish-name queries (is the named recipe returned?)
+# Run build_vectorstore first so the persisted indexes exist.
+#
+#   python -m src.benchmarks.bench_hybrid --queries 300 --k 5
+
+import argparse
+import time
+from typing import Callable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.benchmarks.queries import sample_queries
+from src.config.settings import HYBRID_CANDIDATES
+from src.db.engine import engine
+from src.retrieval.lexical_index import build_lexical_index
+from src.retrieval.recipe_retriever import clear_retrieval_caches, retrieve_recipes, warmup
+
+
+def _percentiles(fn: Callable[[str], object], queries: Sequence[str]):
+    latencies: List[float] = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        latencies.append(time.perf_counter() - start)
+    ms = np.array(latencies) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 / hybrid retrieval cost and name-query recall")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    docs = pd.read_sql("SELECT recipe_id, name, document FROM recipes ORDER BY recipe_id", engine)
+    docs = docs.fillna("")
+
+    start = time.perf_counter()
+    index = build_lexical_index(docs["recipe_id"], docs["document"], docs["name"])
+    build_s = time.perf_counter() - start
+    size_mb = sum(a.nbytes for a in (index.vocab, index.offsets, index.rows, index.weights, index.recipe_ids)) / 2**20
+    print(
+        f"BM25 build: {len(docs):,} recipes, {len(index.vocab):,} terms, "
+        f"{len(index.rows):,} postings, {size_mb:.1f} MB in {build_s:.2f}s"
+    )
+
+    rng = np.random.default_rng(args.seed)
+    sample = docs.iloc[rng.choice(len(docs), size=min(args.queries, len(docs)), replace=False)]
+    name_queries = sample["name"].tolist()
+    topic_queries = sample_queries(args.queries)
+
+    depth = max(args.k, HYBRID_CANDIDATES)
+    print(f"\n{'BM25 only (depth ' + str(depth) + ')':<28}{'p50 ms':>9}{'p99 ms':>9}")
+    for label, queries in (("name queries", name_queries), ("topic queries", topic_queries)):
+        p50, p99 = _percentiles(lambda q: index.search(q, depth), queries)
+        print(f"{label:<28}{p50:>9.3f}{p99:>9.3f}")
+
+    warmup(background=False)
+    print(f"\n{'retrieve_recipes':<28}{'p50 ms':>9}{'p99 ms':>9}{'name hit@k':>12}")
+    for mode in ("vector", "hybrid"):
+        clear_retrieval_caches()
+        p50, p99 = _percentiles(
+            lambda q: retrieve_recipes(q, k=args.k, fields="id", mode=mode),
+            topic_queries,
+        )
+        clear_retrieval_caches()
+        hits = sum(
+            int(rid) in retrieve_recipes(name, k=args.k, fields="id", mode=mode).recipe_ids
+            for rid, name in zip(sample["recipe_id"], name_queries)
+        )
+        print(f"{mode:<28}{p50:>9.3f}{p99:>9.3f}{hits / len(name_queries):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
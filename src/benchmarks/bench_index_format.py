@@ -0,0 +1,135 @@
+# src/benchmarks/bench_index_format.py
+#
+# Startup time and memory of the lean index format (raw index.faiss +
+# recipe_ids.npy, memory-mapped) against the old LangChain format
+# (index.faiss + pickled InMemoryDocstore holding every document).
+# The old format is recreated in a temp directory from the current index
+# and the recipes table. Each load runs in a fresh interpreter; RSS is
+# split into anonymous (private per process) and file-backed (shared
+# page cache) memory.
+#
+#   python -m src.benchmarks.bench_index_format --runs 3
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config.settings import VECTOR_INDEX_PATH
+from src.db.engine import engine
+from src.retrieval.vector_index import load_index
+
+FORMATS = ("langchain", "lean", "lean-nommap")
+
+
+def _memory_mb() -> dict:
+    """RssAnon / RssFile from /proc (Linux); peak RSS elsewhere."""
+    try:
+        status = Path("/proc/self/status").read_text()
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"anon": peak / (2**20 if sys.platform == "darwin" else 2**10), "file": 0.0}
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+    return {
+        "anon": int(fields["RssAnon"].split()[0]) / 1024,
+        "file": int(fields["RssFile"].split()[0]) / 1024,
+    }
+
+
+def _child(fmt: str, index_dir: Path) -> dict:
+    before = _memory_mb()
+    start = time.perf_counter()
+
+    if fmt == "langchain":
+        from langchain_community.embeddings import FakeEmbeddings
+        from langchain_community.vectorstores import FAISS
+
+        store = FAISS.load_local(str(index_dir), FakeEmbeddings(size=1), allow_dangerous_deserialization=True)
+        ids = np.array([
+            store.docstore.search(doc_id).metadata["recipe_id"]
+            for _, doc_id in sorted(store.index_to_docstore_id.items())
+        ], dtype=np.int64)
+        index = store.index
+    else:
+        index, ids = load_index(index_dir, mmap=(fmt == "lean"))
+
+    load_s = time.perf_counter() - start
+    # Touch every vector once, as a full scan would
+    index.search(np.zeros((1, index.d), dtype=np.float32), 1)
+    after = _memory_mb()
+    return {
+        "load_s": load_s,
+        "anon_mb": after["anon"] - before["anon"],
+        "file_mb": after["file"] - before["file"],
+        "n": int(len(ids)),
+    }
+
+
+def _write_langchain_format(out_dir: Path):
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.embeddings import FakeEmbeddings
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    index, row_recipe_ids = load_index(mmap=False)
+    docs = pd.read_sql("SELECT recipe_id, document FROM recipes", engine).set_index("recipe_id")["document"]
+    doc_ids = [str(rid) if rid >= 0 else f"removed-{row}" for row, rid in enumerate(row_recipe_ids.tolist())]
+    FAISS(
+        embedding_function=FakeEmbeddings(size=index.d),
+        index=index,
+        docstore=InMemoryDocstore({
+            doc_id: Document(page_content=docs.get(rid) or "", metadata={"recipe_id": rid})
+            for doc_id, rid in zip(doc_ids, row_recipe_ids.tolist())
+        }),
+        index_to_docstore_id=dict(enumerate(doc_ids)),
+    ).save_local(str(out_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lean mmap index vs LangChain save_local: startup / RSS")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", choices=FORMATS, help=argparse.SUPPRESS)
+    parser.add_argument("--dir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.dir)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_dir = Path(tmp)
+        _write_langchain_format(legacy_dir)
+        sizes = {
+            "langchain": sum(f.stat().st_size for f in legacy_dir.iterdir()),
+            "lean": sum(f.stat().st_size for f in VECTOR_INDEX_PATH.glob("*") if f.suffix in (".faiss", ".npy")),
+        }
+        sizes["lean-nommap"] = sizes["lean"]
+
+        print(f"{'format':<14}{'disk MB':>9}{'load s':>9}{'anon MB':>9}{'file MB':>9}")
+        for fmt in FORMATS:
+            index_dir = legacy_dir if fmt == "langchain" else VECTOR_INDEX_PATH
+            runs = []
+            for _ in range(args.runs):
+                out = subprocess.run(
+                    [sys.executable, "-m", "src.benchmarks.bench_index_format",
+                     "--child", fmt, "--dir", str(index_dir)],
+                    capture_output=True, text=True, check=True,
+                )
+                runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            best = min(runs, key=lambda r: r["load_s"])
+            print(
+                f"{fmt:<14}{sizes[fmt] / 2**20:>9.1f}{best['load_s']:>9.3f}"
+                f"{best['anon_mb']:>9.1f}{best['file_mb']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
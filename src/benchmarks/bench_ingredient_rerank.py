@@ -0,0 +1,80 @@
+# src/benchmarks/bench_ingredient_rerank.py
+#
+# Semantic re-ranking of the ingredient_suggester SQL candidates: the old
+# path (an unrelated retrieve_recipes(k=3k) intersected with the
+# candidates) against rank_recipe_ids (one encode, stored vectors of
+# exactly the candidates, one matrix-vector product). Reports latency and
+# how many of the k slots each path fills. Ingredient sets are drawn from
+# real recipes, so every set has candidates.
+#
+#   python -m src.benchmarks.bench_ingredient_rerank --sets 200 --ingredients 2 --k 5
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.db.engine import engine
+from src.db.recipes import get_recipe_ingredients_many, get_recipes_with_all_ingredients
+from src.retrieval.recipe_retriever import (
+    clear_retrieval_caches,
+    rank_recipe_ids,
+    retrieve_recipes,
+    warmup,
+)
+
+
+def _ingredient_sets(n: int, size: int, seed: int) -> List[List[str]]:
+    recipe_ids = pd.read_sql("SELECT recipe_id FROM recipes", engine)["recipe_id"].to_numpy()
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(recipe_ids, size=min(n, len(recipe_ids)), replace=False).tolist()
+    ingredients = get_recipe_ingredients_many(picked)
+    return [
+        sorted(rng.choice(ingredients[rid], size=size, replace=False).tolist())
+        for rid in picked
+        if len(ingredients[rid]) >= size
+    ]
+
+
+def _legacy_rerank(query: str, candidate_ids: List[int], k: int) -> List[int]:
+    semantic = retrieve_recipes(query=query, k=min(len(candidate_ids), k * 3), fields="id")
+    candidates = set(candidate_ids)
+    return [r["recipe_id"] for r in semantic.recipes if r.get("recipe_id") in candidates][:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ingredient_suggester semantic rerank: legacy vs direct")
+    parser.add_argument("--sets", type=int, default=200)
+    parser.add_argument("--ingredients", type=int, default=2, help="Ingredients per set")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    warmup(background=False)
+    sets = _ingredient_sets(args.sets, args.ingredients, args.seed)
+    candidates = [get_recipes_with_all_ingredients(s, fields="id")["recipe_id"].tolist() for s in sets]
+    sizes = np.array([len(c) for c in candidates])
+    print(f"{len(sets)} ingredient sets, candidates per set: median {np.median(sizes):.0f}, max {sizes.max()}")
+
+    print(f"{'path':<10}{'p50 ms':>9}{'p99 ms':>9}{'filled':>9}{'empty':>7}")
+    for name, rerank in (("legacy", _legacy_rerank), ("direct", rank_recipe_ids)):
+        clear_retrieval_caches()
+        latencies, filled, empty = [], 0, 0
+        for ingredients, ids in zip(sets, candidates):
+            start = time.perf_counter()
+            ranked = rerank(" ".join(ingredients), ids, args.k)
+            latencies.append(time.perf_counter() - start)
+            filled += len(ranked)
+            empty += not ranked
+        ms = np.array(latencies) * 1000
+        possible = np.minimum(sizes, args.k).sum()
+        print(
+            f"{name:<10}{np.percentile(ms, 50):>9.2f}{np.percentile(ms, 99):>9.2f}"
+            f"{filled / possible:>9.1%}{empty:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# src/benchmarks/bench_mmr.py
+#
+# Cost and effect of the MMR diversity stage.
+#   1) mmr_select alone on the real candidate pools (k * oversample
+#      candidates per query): per-query and batched milliseconds
+#   2) retrieve_recipes_many end to end with and without MMR (warm query
+#      embeddings, cold result cache), with the mean similarity of results
+#      to the query (relevance) and to each other (redundancy) per lambda
+#
+#   python -m src.benchmarks.bench_mmr --k 20 --oversample 3 --lambdas 1.0 0.7 0.5
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from src.benchmarks.queries import sample_queries
+from src.retrieval import recipe_retriever as retriever
+from src.retrieval.diversity import mmr_select
+
+
+def _vectors(recipe_ids: List[List[int]], dim: int) -> np.ndarray:
+    """(q, n, d) stored vectors of each result list (zero padded)."""
+    width = max(len(ids) for ids in recipe_ids)
+    out = np.zeros((len(recipe_ids), width, dim), dtype=np.float32)
+    for i, ids in enumerate(recipe_ids):
+        rows = retriever._rows_of(np.asarray(ids, dtype=np.int64))
+        out[i, :len(ids)] = retriever._get_index().reconstruct(rows)
+    return out / np.maximum(np.linalg.norm(out, axis=2, keepdims=True), 1e-12)
+
+
+def _quality(queries: np.ndarray, results: List[List[int]]):
+    vectors = _vectors(results, queries.shape[1])
+    relevance = np.einsum("qnd,qd->qn", vectors, queries).mean()
+    pairwise = vectors @ vectors.transpose(0, 2, 1)
+    n = vectors.shape[1]
+    redundancy = (pairwise.sum(axis=(1, 2)) - n) / (n * (n - 1))
+    return float(relevance), float(redundancy.mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMR diversity re-ranking cost / effect")
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--oversample", type=int, default=3)
+    parser.add_argument("--lambdas", type=float, nargs="+", default=[1.0, 0.7, 0.5])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    retriever.warmup(background=False)
+    queries = sample_queries(args.queries)
+    pool = args.k * args.oversample
+    vectors = retriever._embed_queries([retriever.normalize_query(q) for q in queries])
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    # 1) The MMR step on its own, over the real candidate pools
+    found = retriever._filtered_search(vectors, pool, retriever.RecipeFilters.build())
+    candidates = _vectors(found, vectors.shape[1])
+    print(f"{len(queries)} queries, k={args.k}, pool={pool} (k * oversample)")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for i in range(len(queries)):
+            mmr_select(vectors[i:i + 1], candidates[i:i + 1], args.k, 0.7)
+    single_ms = (time.perf_counter() - start) * 1000 / (args.repeat * len(queries))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        mmr_select(vectors, candidates, args.k, 0.7)
+    batch_ms = (time.perf_counter() - start) * 1000 / (args.repeat * len(queries))
+    print(f"mmr_select: {single_ms:.3f} ms/query alone, {batch_ms:.3f} ms/query batched")
+
+    # 2) End to end
+    print(f"{'lambda':>8}{'ms/query':>10}{'relevance':>11}{'redundancy':>12}")
+    for mmr_lambda in [None] + args.lambdas:
+        retriever._RESULTS.clear()
+        start = time.perf_counter()
+        results = retriever.retrieve_recipes_many(
+            queries, k=args.k, oversample=args.oversample, fields="id", mmr_lambda=mmr_lambda,
+        )
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        relevance, redundancy = _quality(vectors, [r.recipe_ids for r in results])
+        label = "off" if mmr_lambda is None else f"{mmr_lambda:.2f}"
+        print(f"{label:>8}{ms:>10.3f}{relevance:>11.3f}{redundancy:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
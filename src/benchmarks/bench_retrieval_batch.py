@@ -0,0 +1,58 @@
+# src/benchmarks/bench_retrieval_batch.py
+#
+# Throughput of retrieve_recipes in a loop vs one retrieve_recipes_many
+# call over the same queries (cold caches for both), and a check that
+# both return the same recipe_ids.
+#
+#   python -m src.benchmarks.bench_retrieval_batch --batch-sizes 1 8 32 128 --k 5
+
+import argparse
+import time
+
+from src.benchmarks.queries import sample_queries
+from src.retrieval.recipe_retriever import (
+    clear_retrieval_caches,
+    retrieve_recipes,
+    retrieve_recipes_many,
+    warmup,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched vs looped semantic retrieval")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--exclude", nargs="*", default=["peanuts"])
+    parser.add_argument("--fields", default="card")
+    args = parser.parse_args()
+
+    warmup(background=False)
+
+    print(f"{'batch':>6}{'loop q/s':>12}{'batch q/s':>12}{'speedup':>9}{'same ids':>10}")
+    for n in args.batch_sizes:
+        queries = sample_queries(n, meals=True)
+
+        clear_retrieval_caches()
+        start = time.perf_counter()
+        looped = [
+            retrieve_recipes(q, k=args.k, exclude=args.exclude, fields=args.fields).recipe_ids
+            for q in queries
+        ]
+        loop_s = time.perf_counter() - start
+
+        clear_retrieval_caches()
+        start = time.perf_counter()
+        batched = [
+            r.recipe_ids
+            for r in retrieve_recipes_many(queries, k=args.k, exclude=args.exclude, fields=args.fields)
+        ]
+        batch_s = time.perf_counter() - start
+
+        print(
+            f"{n:>6}{n / loop_s:>12.1f}{n / batch_s:>12.1f}"
+            f"{loop_s / batch_s:>8.1f}x{str(looped == batched):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
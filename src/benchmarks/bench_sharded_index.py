@@ -0,0 +1,82 @@
+# src/benchmarks/bench_sharded_index.py
+#
+# Latency / throughput of the sharded index against one monolithic index
+# of the same type, built from the cached document embeddings. Each shard
+# count is searched with the fan-out pool and sequentially (threads=1), so
+# the gain from parallel shard search is visible. recall@k is against
+# exact search (IVF shards each get their own, smaller, nlist).
+#
+#   python -m src.benchmarks.bench_sharded_index --index-type flat \
+#       --shards 1 2 4 8 --k 15 --queries 500 --batch 32
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from src.benchmarks.bench_vector_index import _build, _load_corpus, _make_queries
+from src.retrieval.sharded_index import IndexShard, ShardedIndex
+from src.retrieval.vector_index import INDEX_KINDS, IndexConfig
+
+
+def _shards(config: IndexConfig, corpus: np.ndarray, n_shards: int) -> List[IndexShard]:
+    # Hash sharding over corpus positions (the corpus row is the "recipe_id")
+    ids = np.arange(len(corpus), dtype=np.int64)
+    shards = []
+    for shard in range(n_shards):
+        rows = ids[ids % n_shards == shard]
+        shard_config = config.resolved(len(rows))
+        index, _ = _build(shard_config, corpus[rows])
+        shards.append(IndexShard(index, rows, shard_config))
+    return shards
+
+
+def _measure(index: ShardedIndex, queries: np.ndarray, k: int, batch: int, truth: np.ndarray):
+    latencies: List[float] = []
+    hits = 0
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, rows = index.search(queries[i:i + 1], k)
+        latencies.append(time.perf_counter() - start)
+        found = index.row_recipe_ids[rows[0][rows[0] >= 0]]
+        hits += len(np.intersect1d(found, truth[i]))
+    ms = np.array(latencies) * 1000
+
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        index.search(queries[i:i + batch], k)
+    qps = len(queries) / (time.perf_counter() - start)
+    return hits / truth.size, np.percentile(ms, 50), np.percentile(ms, 99), qps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded vs monolithic FAISS index latency / throughput")
+    parser.add_argument("--index-type", choices=INDEX_KINDS, default="flat")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--k", type=int, default=15, help="k * oversample used by retrieve_recipes")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=32, help="Queries per search for the throughput run")
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--nprobe", type=int, default=IndexConfig().nprobe)
+    args = parser.parse_args()
+
+    corpus = _load_corpus()
+    queries = _make_queries(corpus, args.queries, args.noise, seed=1)
+    config = IndexConfig(args.index_type, nprobe=args.nprobe)
+    print(f"corpus {corpus.shape[0]:,} x {corpus.shape[1]}, {len(queries)} queries, k={args.k}, {config.describe()}")
+
+    flat, _ = _build(IndexConfig("flat"), corpus)
+    _, truth = flat.search(queries, args.k)
+
+    print(f"{'shards':>7}{'threads':>9}{'recall@k':>10}{'p50 ms':>9}{'p99 ms':>9}{'batch q/s':>11}")
+    for n_shards in args.shards:
+        shards = _shards(config, corpus, n_shards)
+        for threads in sorted({n_shards, 1}, reverse=True):
+            index = ShardedIndex(shards, threads)
+            recall, p50, p99, qps = _measure(index, queries, args.k, args.batch, truth)
+            print(f"{n_shards:>7}{threads:>9}{recall:>10.3f}{p50:>9.3f}{p99:>9.3f}{qps:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# src/benchmarks/bench_vector_index.py
+#
+# Recall@k against exact (flat) search and single-query latency for the
+# selectable index types, built from the cached document embeddings
+# (run build_vectorstore first). Queries are corpus vectors with a little
+# Gaussian noise, renormalized, which keeps them close to real
+# query/document similarities without loading the model.
+#
+#   python -m src.benchmarks.bench_vector_index --k 15 --queries 500 \
+#       --nprobe 4 8 16 32 --ef-search 16 32 64 128
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from src.config.settings import EMBEDDING_MODEL
+from src.retrieval.embedding_cache import EmbeddingCache
+from src.retrieval.vector_index import (
+    IndexConfig,
+    apply_search_params,
+    build_index,
+    training_size,
+)
+
+
+def _load_corpus() -> np.ndarray:
+    cache = EmbeddingCache.load(EMBEDDING_MODEL)
+    if not len(cache):
+        raise SystemExit("Embedding cache is empty - run src.ingestion.build_vectorstore first")
+    return np.ascontiguousarray(np.concatenate(list(cache.iter_blocks(cache.keys))))
+
+
+def _make_queries(corpus: np.ndarray, n: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    q = corpus[rng.choice(len(corpus), size=min(n, len(corpus)), replace=False)]
+    q = q + rng.normal(scale=noise, size=q.shape).astype(np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    return np.ascontiguousarray(q, dtype=np.float32)
+
+
+def _build(config: IndexConfig, corpus: np.ndarray):
+    n_train = training_size(config, len(corpus))
+    training = corpus[np.random.default_rng(0).choice(len(corpus), n_train, replace=False)] if n_train else None
+    start = time.perf_counter()
+    index = build_index(config, corpus.shape[1], len(corpus), [corpus], training)
+    return index, time.perf_counter() - start
+
+
+def _measure(index, queries: np.ndarray, k: int, truth: np.ndarray):
+    latencies: List[float] = []
+    hits = 0
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(np.intersect1d(ids[0], truth[i], assume_unique=True))
+    ms = np.array(latencies) * 1000
+    return hits / truth.size, np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS index type recall / latency sweep")
+    parser.add_argument("--k", type=int, default=15, help="k * oversample used by retrieve_recipes")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32, 64])
+    parser.add_argument("--hnsw-m", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    args = parser.parse_args()
+
+    corpus = _load_corpus()
+    queries = _make_queries(corpus, args.queries, args.noise, seed=1)
+    print(f"corpus {corpus.shape[0]:,} x {corpus.shape[1]}, {len(queries)} queries, k={args.k}")
+
+    flat, build_s = _build(IndexConfig("flat"), corpus)
+    _, truth = flat.search(queries, args.k)
+
+    print(f"{'index':<34}{'build s':>9}{'recall@k':>10}{'p50 ms':>9}{'p99 ms':>9}")
+
+    def report(config: IndexConfig, index, build_s: float):
+        recall, p50, p99 = _measure(index, queries, args.k, truth)
+        print(f"{config.describe():<34}{build_s:>9.2f}{recall:>10.3f}{p50:>9.3f}{p99:>9.3f}")
+
+    report(IndexConfig("flat"), flat, build_s)
+
+    ivf = IndexConfig("ivf", nlist=args.nlist).resolved(len(corpus))
+    index, build_s = _build(ivf, corpus)
+    for nprobe in args.nprobe:
+        config = ivf.with_search_params(nprobe=nprobe)
+        apply_search_params(index, config)
+        report(config, index, build_s)
+
+    for m in args.hnsw_m:
+        hnsw = IndexConfig("hnsw", hnsw_m=m)
+        index, build_s = _build(hnsw, corpus)
+        for ef in args.ef_search:
+            config = hnsw.with_search_params(ef_search=ef)
+            apply_search_params(index, config)
+            report(config, index, build_s)
+
+
+if __name__ == "__main__":
+    main()
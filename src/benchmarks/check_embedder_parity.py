@@ -0,0 +1,91 @@
+# src/benchmarks/check_embedder_parity.py
+#
+# Parity of the ONNX / int8 encoders against the PyTorch reference on
+# real recipe documents and queries:
+#   - cosine between reference and backend vectors (mean / min)
+#   - recall@k of backend queries against the reference document vectors
+#     (serving a torch-built index with a faster query encoder)
+#   - recall@k with both sides encoded by the backend (index rebuilt)
+# Exits non-zero when a backend falls below the thresholds, so it can gate
+# a backend switch.
+#
+#   python -m src.benchmarks.check_embedder_parity --backends onnx onnx-int8 --k 10
+
+import argparse
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.benchmarks.queries import sample_queries
+from src.db.engine import engine
+from src.retrieval.embedders import EMBEDDING_BACKENDS, make_embedder
+
+
+def _encode(backend: str, texts: List[str]) -> np.ndarray:
+    vectors = make_embedder(backend, device="cpu").embed_documents(texts)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def _top_k(queries: np.ndarray, docs: np.ndarray, k: int) -> np.ndarray:
+    # Unit vectors: inner product ranks like the index's L2 distance
+    scores = queries @ docs.T
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(f, t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX / int8 encoder parity vs PyTorch")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"],
+                        choices=[b for b in EMBEDDING_BACKENDS if b != "torch"])
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Minimum mean cosine")
+    parser.add_argument("--min-recall", type=float, default=0.90)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    recipes = pd.read_sql("SELECT name, document FROM recipes", engine).fillna("")
+    rng = np.random.default_rng(args.seed)
+    sample = recipes.iloc[rng.choice(len(recipes), size=min(args.docs, len(recipes)), replace=False)]
+    documents = sample["document"].tolist()
+
+    topics = sample_queries()
+    names = sample["name"].tolist()[: max(0, args.queries - len(topics))]
+    queries = (topics + names)[: args.queries]
+    k = min(args.k, len(documents))
+
+    print(f"{len(documents)} documents, {len(queries)} queries, k={k}")
+    ref_docs = _encode("torch", documents)
+    ref_queries = _encode("torch", queries)
+    truth = _top_k(ref_queries, ref_docs, k)
+
+    print(f"{'backend':<12}{'cos mean':>10}{'cos min':>10}{'recall q':>10}{'recall q+d':>12}{'':>6}")
+    failed = []
+    for backend in args.backends:
+        docs = _encode(backend, documents)
+        qs = _encode(backend, queries)
+        cosines = np.concatenate([(docs * ref_docs).sum(axis=1), (qs * ref_queries).sum(axis=1)])
+
+        recall_q = _recall(_top_k(qs, ref_docs, k), truth)
+        recall_qd = _recall(_top_k(qs, docs, k), truth)
+
+        ok = cosines.mean() >= args.min_cosine and min(recall_q, recall_qd) >= args.min_recall
+        if not ok:
+            failed.append(backend)
+        print(
+            f"{backend:<12}{cosines.mean():>10.5f}{cosines.min():>10.5f}"
+            f"{recall_q:>10.3f}{recall_qd:>12.3f}{'ok' if ok else 'FAIL':>6}"
+        )
+
+    if failed:
+        raise SystemExit(f"Parity below thresholds for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# src/benchmarks/queries.py
+#
+# Synthetic query fixtures shared by the benchmarks: "<style> <main>"
+# topics, or "<style> <main> <meal> ideas" with meals=True.
+
+import itertools
+from typing import List, Optional
+
+STYLES = ["quick", "healthy", "vegetarian", "high protein", "low carb", "spicy", "kid friendly"]
+MAINS = ["chicken", "tofu", "salmon", "beef", "lentils", "eggs", "pasta", "rice", "mushrooms"]
+MEALS = ["breakfast", "lunch", "dinner", "snack", "dessert", "side dish"]
+
+
+def sample_queries(n: Optional[int] = None, meals: bool = False) -> List[str]:
+    """
+    `n` queries cycling through every style x main (x meal) combination
+    in a fixed order; n=None gives each combination once.
+    """
+    if meals:
+        combos = [f"{s} {m} {meal} ideas" for s, m, meal in itertools.product(STYLES, MAINS, MEALS)]
+    else:
+        combos = [f"{s} {m}" for s, m in itertools.product(STYLES, MAINS)]
+    if n is None:
+        return combos
+    return list(itertools.islice(itertools.cycle(combos), n))
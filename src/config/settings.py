@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -10,6 +11,71 @@ DB_DIR = DATA_DIR / "db"
 VECTOR_DIR = DATA_DIR / "vectorstore"
 
 DB_PATH = DB_DIR / "recipes.db"
+INGREDIENT_INDEX_PATH = DB_DIR / "ingredient_index.npz"
+NUTRITION_STORE_DIR = DB_DIR / "nutrition_store"
 VECTOR_INDEX_PATH = VECTOR_DIR / "faiss_recipes_index"
+EMBEDDING_CACHE_DIR = VECTOR_DIR / "embedding_cache"
+ONNX_ENCODER_DIR = VECTOR_DIR / "onnx_encoder"
 
+# --------------------------------------------------
+# Embeddings
+# --------------------------------------------------
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Query encoder used by the retriever: "torch" | "onnx" | "onnx-int8"
+# (ONNX backends need src.ingestion.export_onnx_encoder to have run)
+EMBEDDING_BACKEND = os.getenv("NUTRIBOT_EMBEDDING_BACKEND", "torch")
 
+# --------------------------------------------------
+# SQLite serving connections (env-overridable)
+# --------------------------------------------------
+# "file": read-only connections on DB_PATH
+# "memory": copy the DB into a shared in-memory database at startup
+DB_READ_MODE = os.getenv("NUTRIBOT_DB_READ_MODE", "file")
+DB_POOL_SIZE = int(os.getenv("NUTRIBOT_DB_POOL_SIZE", "16"))
+# Extra connections opened under load beyond DB_POOL_SIZE (closed when returned)
+DB_POOL_MAX_OVERFLOW = int(os.getenv("NUTRIBOT_DB_POOL_MAX_OVERFLOW", "16"))
+DB_MMAP_SIZE = int(os.getenv("NUTRIBOT_DB_MMAP_SIZE", str(512 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("NUTRIBOT_DB_CACHE_SIZE_KB", str(64 * 1024)))
+
+# --------------------------------------------------
+# Caches
+# --------------------------------------------------
+RECIPE_CACHE_SIZE = int(os.getenv("NUTRIBOT_RECIPE_CACHE_SIZE", "4096"))
+# Larger fetches (bulk ingredient matches) bypass the cache
+RECIPE_CACHE_MAX_BATCH = int(os.getenv("NUTRIBOT_RECIPE_CACHE_MAX_BATCH", "256"))
+# How often (seconds) serving processes re-read dataset_version
+DATASET_VERSION_CHECK_S = float(os.getenv("NUTRIBOT_DATASET_VERSION_CHECK_S", "5"))
+# Retriever: normalized query -> embedding, and query -> ranked recipe_ids
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("NUTRIBOT_QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("NUTRIBOT_RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL_S = float(os.getenv("NUTRIBOT_RETRIEVAL_CACHE_TTL_S", "600"))
+
+# --------------------------------------------------
+# Sharded vector index
+# --------------------------------------------------
+# Threads searching shards concurrently (0 = one per shard)
+SHARD_SEARCH_THREADS = int(os.getenv("NUTRIBOT_SHARD_SEARCH_THREADS", "0"))
+
+# --------------------------------------------------
+# Candidate re-ranking (rank_recipe_ids)
+# --------------------------------------------------
+# Larger candidate sets (e.g. "any ingredient" matches on salt / onion)
+# are ranked by a filtered index search instead of scoring every
+# candidate's reconstructed vector
+RERANK_MAX_CANDIDATES = int(os.getenv("NUTRIBOT_RERANK_MAX_CANDIDATES", "2048"))
+
+# --------------------------------------------------
+# Hybrid retrieval (BM25 + vector, reciprocal-rank fusion)
+# --------------------------------------------------
+# Candidates taken from each side before fusing (at least k)
+HYBRID_CANDIDATES = int(os.getenv("NUTRIBOT_HYBRID_CANDIDATES", "50"))
+# RRF constant: larger values flatten the rank weighting
+RRF_K = int(os.getenv("NUTRIBOT_RRF_K", "60"))
+
+# --------------------------------------------------
+# Diversity (MMR) re-ranking
+# --------------------------------------------------
+# MMR lambda recipe_lookup passes to retrieve_recipes
+# (unset = plain ranking; 1.0 = relevance only, lower = more variety)
+_RECIPE_LOOKUP_MMR = os.getenv("NUTRIBOT_RECIPE_LOOKUP_MMR_LAMBDA")
+RECIPE_LOOKUP_MMR_LAMBDA = float(_RECIPE_LOOKUP_MMR) if _RECIPE_LOOKUP_MMR else None
@@ -1,13 +1,191 @@
+import itertools
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Union
+
 from sqlalchemy import create_engine
-from src.config.settings import DB_PATH
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from src.config.settings import (
+    DB_PATH,
+    DB_READ_MODE,
+    DB_POOL_SIZE,
+    DB_POOL_MAX_OVERFLOW,
+    DB_MMAP_SIZE,
+    DB_CACHE_SIZE_KB,
+)
 
 
 # --------------------------------------------------
-# Database engine (single source of truth)
+# Connection settings
 # --------------------------------------------------
 
-engine = create_engine(
-    f"sqlite:///{DB_PATH}",
-    future=True,
-    echo=False
-)
+STATEMENT_CACHE_SIZE = 256
+
+# Serving: read-only, page cache + mmap sized for the whole recipe DB
+READ_PRAGMAS: Dict[str, Union[int, str]] = {
+    "mmap_size": DB_MMAP_SIZE,
+    "cache_size": -DB_CACHE_SIZE_KB,  # negative = KiB
+    "temp_store": "MEMORY",
+    "query_only": "ON",
+}
+
+# Ingestion: WAL so serving readers are never blocked by a rebuild
+WRITE_PRAGMAS: Dict[str, Union[int, str]] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -DB_CACHE_SIZE_KB,
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Union[int, str]]) -> None:
+    for key, value in pragmas.items():
+        conn.execute(f"PRAGMA {key} = {value}")
+
+
+# --------------------------------------------------
+# In-memory snapshot (DB_READ_MODE = "memory")
+# --------------------------------------------------
+# The anchor connection keeps the shared in-memory DB alive; every
+# reader connects to the same URI. Each reload copies into a fresh
+# database (new URI) and drops the pooled readers of the old one, so
+# queries never see a half-copied snapshot; the old copy is freed when
+# its last checked-out reader is returned.
+
+_MEMORY_URI_FORMAT = "file:nutribot_recipes_{}?mode=memory&cache=shared"
+_MEMORY_URI: Optional[str] = None
+_MEMORY_ANCHOR: Optional[sqlite3.Connection] = None
+_MEMORY_GENERATIONS = itertools.count()
+_MEMORY_LOCK = threading.Lock()
+
+
+def load_memory_snapshot(reload: bool = False) -> None:
+    """
+    Copy DB_PATH into the shared in-memory database via the backup API.
+    """
+    global _MEMORY_ANCHOR, _MEMORY_URI
+    with _MEMORY_LOCK:
+        if _MEMORY_ANCHOR is not None and not reload:
+            return
+
+        uri = _MEMORY_URI_FORMAT.format(next(_MEMORY_GENERATIONS))
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+        try:
+            source.backup(anchor)
+        finally:
+            source.close()
+
+        previous = _MEMORY_ANCHOR
+        _MEMORY_ANCHOR, _MEMORY_URI = anchor, uri
+        if previous is not None:
+            engine.dispose()
+            previous.close()
+
+
+# --------------------------------------------------
+# Connection factories
+# --------------------------------------------------
+
+def _open_reader(uri: str) -> sqlite3.Connection:
+    return sqlite3.connect(
+        uri,
+        uri=True,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+
+
+def connect_reader(mode: str = DB_READ_MODE) -> sqlite3.Connection:
+    """
+    Open a tuned, read-only serving connection.
+    """
+    if mode == "memory":
+        load_memory_snapshot()
+        # Under the lock: a reload cannot free the snapshot this URI
+        # names before the connection holds it
+        with _MEMORY_LOCK:
+            conn = _open_reader(_MEMORY_URI)
+    elif mode == "file":
+        conn = _open_reader(f"file:{DB_PATH}?mode=ro")
+    else:
+        raise ValueError(f"Unknown DB read mode '{mode}' (expected 'file' or 'memory')")
+
+    _apply_pragmas(conn, READ_PRAGMAS)
+
+    if mode == "memory":
+        # Shared-cache readers would otherwise take table-level read locks
+        conn.execute("PRAGMA read_uncommitted = ON")
+
+    return conn
+
+
+def connect_writer() -> sqlite3.Connection:
+    """
+    Open a connection for ingestion (build_database).
+    """
+    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+    _apply_pragmas(conn, WRITE_PRAGMAS)
+    return conn
+
+
+def create_read_engine(
+        mode: str = DB_READ_MODE,
+        pool_size: int = DB_POOL_SIZE,
+        max_overflow: int = DB_POOL_MAX_OVERFLOW,
+) -> Engine:
+    """
+    Read engine over a queue of tuned connections. A connection is checked
+    out by one thread at a time and returned after each query, so any
+    number of (short-lived) threads can share `pool_size` connections;
+    bursts open up to `max_overflow` more.
+    """
+    return create_engine(
+        f"sqlite:///{DB_PATH}",
+        creator=lambda: connect_reader(mode),
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        future=True,
+        echo=False,
+    )
+
+
+def create_write_engine() -> Engine:
+    return create_engine(
+        f"sqlite:///{DB_PATH}",
+        creator=connect_writer,
+        future=True,
+        echo=False,
+    )
+
+
+# --------------------------------------------------
+# Database engines (single source of truth)
+# --------------------------------------------------
+
+engine = create_read_engine()          # serving / tools
+write_engine = create_write_engine()   # build_database only
+
+
+# --------------------------------------------------
+# Raw DB-API fast path (no pandas / SQLAlchemy)
+# --------------------------------------------------
+# Plain sqlite3 cursors on connections borrowed from the read engine's
+# pool, so any number of (short-lived) threads share its bounded set of
+# connections. Pooled connections stay open, and sqlite3 caches prepared
+# statements per connection, so hot lookups are only parsed once.
+
+@contextmanager
+def read_cursor() -> Iterator[sqlite3.Cursor]:
+    """
+    DB-API cursor on a pooled read connection, returned to the pool on exit.
+    """
+    conn = engine.raw_connection()
+    try:
+        yield conn.cursor()
+    finally:
+        conn.close()
@@ -0,0 +1,203 @@
+# src/db/ingredient_index.py
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from functools import reduce
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.engine import Engine
+
+from src.db.engine import engine
+from src.db.meta import current_dataset_version
+from src.config.settings import INGREDIENT_INDEX_PATH
+
+
+# ==================================================
+# Posting-list index
+# ==================================================
+
+@dataclass(frozen=True)
+class IngredientIndex:
+    """
+    Inverted index over `recipe_ingredients` in CSR layout.
+
+    The postings of `vocab[i]` are `postings[offsets[i]:offsets[i + 1]]`,
+    a sorted array of recipe_ids.
+    """
+    vocab: np.ndarray      # sorted unique ingredient names (unicode)
+    offsets: np.ndarray    # int64, len(vocab) + 1
+    postings: np.ndarray   # int64 recipe_ids, sorted per ingredient
+
+    @property
+    def n_ingredients(self) -> int:
+        return len(self.vocab)
+
+    def _slice(self, i: int) -> np.ndarray:
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def postings_for(self, ingredient: str) -> np.ndarray:
+        """
+        Recipe ids whose ingredient list contains exactly `ingredient`.
+        """
+        ingredient = ingredient.strip().lower()
+        i = int(np.searchsorted(self.vocab, ingredient))
+        if i < len(self.vocab) and self.vocab[i] == ingredient:
+            return self._slice(i)
+        return np.empty(0, dtype=np.int64)
+
+    def postings_containing(self, term: str) -> np.ndarray:
+        """
+        Recipe ids with at least one ingredient containing `term`
+        (same semantics as the old `LIKE '%term%'` scan).
+        """
+        term = term.strip().lower()
+        hits = np.flatnonzero(np.char.find(self.vocab, term) >= 0)
+        if len(hits) == 0:
+            return np.empty(0, dtype=np.int64)
+        if len(hits) == 1:
+            return self._slice(int(hits[0]))
+        return np.unique(np.concatenate([self._slice(int(i)) for i in hits]))
+
+    # ----------------------------
+    # Set operations
+    # ----------------------------
+
+    def match_all(self, ingredients: List[str]) -> np.ndarray:
+        """
+        Sorted recipe ids containing ALL ingredients (exact match).
+        """
+        lists = sorted((self.postings_for(i) for i in ingredients), key=len)
+        return reduce(
+            lambda a, b: np.intersect1d(a, b, assume_unique=True),
+            lists,
+        )
+
+    def match_any(self, ingredients: List[str]) -> np.ndarray:
+        """
+        Sorted recipe ids containing ANY of the ingredients (exact match).
+        """
+        lists = [self.postings_for(i) for i in ingredients]
+        return np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=np.int64)
+
+    def match_at_least(
+            self,
+            terms: List[str],
+            min_matches: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recipe ids matching at least `min_matches` terms (substring match),
+        ranked by match count DESC then recipe_id ASC.
+
+        Returns:
+            (recipe_ids, match_counts)
+        """
+        lists = [self.postings_containing(t) for t in terms]
+        if not lists:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        ids, counts = np.unique(np.concatenate(lists), return_counts=True)
+        keep = counts >= min_matches
+        ids, counts = ids[keep], counts[keep]
+
+        order = np.lexsort((ids, -counts))
+        return ids[order], counts[order]
+
+
+# ==================================================
+# Build / persist
+# ==================================================
+
+def build_ingredient_index(
+        persist: bool = True,
+        bind: Optional[Engine] = None,
+) -> IngredientIndex:
+    """
+    Build the posting lists from `recipe_ingredients`.
+    Optionally persists them next to the database.
+    """
+    df = pd.read_sql(
+        "SELECT ingredient, recipe_id FROM recipe_ingredients",
+        bind or engine,
+    )
+
+    ingredients = df["ingredient"].to_numpy(dtype=str)
+    recipe_ids = df["recipe_id"].to_numpy(dtype=np.int64)
+
+    order = np.lexsort((recipe_ids, ingredients))
+    ingredients = ingredients[order]
+    recipe_ids = recipe_ids[order]
+
+    vocab, starts = np.unique(ingredients, return_index=True)
+    offsets = np.append(starts, len(recipe_ids)).astype(np.int64)
+
+    index = IngredientIndex(vocab=vocab, offsets=offsets, postings=recipe_ids)
+
+    if persist:
+        # Temp file renamed into place: a process reloading on a version
+        # bump never reads a half-written archive
+        INGREDIENT_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = INGREDIENT_INDEX_PATH.with_name(INGREDIENT_INDEX_PATH.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                vocab=index.vocab,
+                offsets=index.offsets,
+                postings=index.postings,
+            )
+        os.replace(tmp, INGREDIENT_INDEX_PATH)
+
+    return index
+
+
+def load_ingredient_index() -> IngredientIndex:
+    """
+    Load the persisted index, building it from the DB if missing.
+    """
+    if not INGREDIENT_INDEX_PATH.exists():
+        return build_ingredient_index(persist=True)
+
+    with np.load(INGREDIENT_INDEX_PATH, allow_pickle=False) as data:
+        return IngredientIndex(
+            vocab=data["vocab"],
+            offsets=data["offsets"],
+            postings=data["postings"],
+        )
+
+
+# ==================================================
+# Process-wide instance
+# ==================================================
+
+_INDEX: Optional[IngredientIndex] = None
+_INDEX_VERSION: Optional[str] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_ingredient_index() -> IngredientIndex:
+    """
+    Return the shared index, loading it on first use and reloading it
+    when build_database publishes a new dataset version.
+    """
+    global _INDEX, _INDEX_VERSION
+    version = current_dataset_version()
+    if _INDEX is None or version != _INDEX_VERSION:
+        with _INDEX_LOCK:
+            if _INDEX is None or version != _INDEX_VERSION:
+                _INDEX = load_ingredient_index()
+                _INDEX_VERSION = version
+    return _INDEX
+
+
+def reset_ingredient_index() -> None:
+    """
+    Drop the shared index so the next call reloads it.
+    """
+    global _INDEX
+    with _INDEX_LOCK:
+        _INDEX = None
@@ -0,0 +1,180 @@
+# src/db/meta.py
+
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from src.db.engine import connect_reader, load_memory_snapshot, read_cursor
+from src.config.settings import DATASET_VERSION_CHECK_S, DB_READ_MODE
+
+
+# ==================================================
+# Dataset version
+# ==================================================
+# build_database stamps a new version on every build; caches compare
+# against it to invalidate.
+
+_VERSION_SQL = "SELECT value FROM dataset_meta WHERE key = 'dataset_version'"
+
+
+def new_dataset_version() -> str:
+    return uuid.uuid4().hex
+
+
+def set_dataset_version(conn: sqlite3.Connection, version: str) -> None:
+    """
+    Record `version` using a writer DB-API connection.
+    """
+    conn.execute(
+        """
+        INSERT INTO dataset_meta (key, value)
+        VALUES ('dataset_version', ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """,
+        (version,),
+    )
+
+
+def _read_version(cur: sqlite3.Cursor) -> Optional[str]:
+    try:
+        row = cur.execute(_VERSION_SQL).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def get_dataset_version() -> Optional[str]:
+    """
+    Read the version from the DB (None for databases built before it existed).
+
+    In memory mode the version is read from the file on disk, and the
+    in-memory snapshot is copied again when it is behind, so new builds
+    reach memory-mode readers (and invalidate their caches).
+    """
+    if DB_READ_MODE != "memory":
+        with read_cursor() as cur:
+            return _read_version(cur)
+
+    with closing(connect_reader("file")) as conn:
+        on_disk = _read_version(conn.cursor())
+    with read_cursor() as cur:
+        in_memory = _read_version(cur)
+    if on_disk != in_memory:
+        load_memory_snapshot(reload=True)
+    return on_disk
+
+
+_CHECKED_AT = float("-inf")
+_CURRENT: Optional[str] = None
+_LOCK = threading.Lock()
+
+
+def current_dataset_version() -> Optional[str]:
+    """
+    Throttled `get_dataset_version`: re-reads at most every
+    DATASET_VERSION_CHECK_S seconds.
+    """
+    global _CHECKED_AT, _CURRENT
+    now = time.monotonic()
+    if now - _CHECKED_AT >= DATASET_VERSION_CHECK_S:
+        with _LOCK:
+            if now - _CHECKED_AT >= DATASET_VERSION_CHECK_S:
+                _CURRENT = get_dataset_version()
+                _CHECKED_AT = now
+    return _CURRENT
+
+
+# ==================================================
+# Change log
+# ==================================================
+# Every build appends to `dataset_versions`; incremental builds also list
+# the recipe_ids they touched in `dataset_changes`, so consumers holding
+# the parent version can patch themselves instead of rebuilding.
+
+@dataclass(frozen=True)
+class VersionChanges:
+    version: str
+    parent_version: Optional[str]
+    mode: str                 # "full" | "incremental"
+    added: List[int]
+    updated: List[int]
+    deleted: List[int]
+
+    @property
+    def changed_ids(self) -> List[int]:
+        return self.added + self.updated + self.deleted
+
+    def applies_to(self, version: Optional[str]) -> bool:
+        """True if this is an incremental step on top of `version`."""
+        return self.mode == "incremental" and version is not None and self.parent_version == version
+
+
+def record_dataset_version(
+        conn: sqlite3.Connection,
+        version: str,
+        parent_version: Optional[str],
+        mode: str,
+        n_recipes: int,
+        added: List[int] = (),
+        updated: List[int] = (),
+        deleted: List[int] = (),
+) -> None:
+    """
+    Log a build and publish `version`, using a writer DB-API connection.
+    Per-recipe changes are only stored for incremental builds.
+    """
+    conn.execute(
+        """
+        INSERT INTO dataset_versions
+            (version, parent_version, mode, built_at, n_recipes, n_added, n_updated, n_deleted)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            version,
+            parent_version,
+            mode,
+            datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            n_recipes,
+            len(added),
+            len(updated),
+            len(deleted),
+        ),
+    )
+    if mode == "incremental":
+        conn.executemany(
+            "INSERT INTO dataset_changes (version, recipe_id, change) VALUES (?, ?, ?)",
+            [(version, rid, "added") for rid in added]
+            + [(version, rid, "updated") for rid in updated]
+            + [(version, rid, "deleted") for rid in deleted],
+        )
+    set_dataset_version(conn, version)
+
+
+def get_version_changes(version: str) -> Optional[VersionChanges]:
+    """
+    Change log entry for `version` (None if it was never logged).
+    """
+    with read_cursor() as cur:
+        try:
+            row = cur.execute(
+                "SELECT parent_version, mode FROM dataset_versions WHERE version = ?",
+                (version,),
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        if row is None:
+            return None
+
+        changes = {"added": [], "updated": [], "deleted": []}
+        for rid, change in cur.execute(
+                "SELECT recipe_id, change FROM dataset_changes WHERE version = ? ORDER BY recipe_id",
+                (version,),
+        ):
+            changes[change].append(rid)
+
+    return VersionChanges(version=version, parent_version=row[0], mode=row[1], **changes)
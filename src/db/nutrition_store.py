@@ -0,0 +1,188 @@
+# src/db/nutrition_store.py
+
+from __future__ import annotations
+
+import json
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.engine import Engine
+
+from src.db.engine import engine
+from src.db.meta import current_dataset_version
+from src.db.recipes import NUTRITION_COLUMNS
+from src.config.settings import NUTRITION_STORE_DIR
+
+STORE_COLUMNS: Tuple[str, ...] = NUTRITION_COLUMNS + ("minutes", "n_ingredients")
+
+Range = Tuple[Optional[float], Optional[float]]
+
+
+# ==================================================
+# Columnar store
+# ==================================================
+
+@dataclass(frozen=True)
+class NutritionStore:
+    """
+    One float32 array per column, addressed directly by recipe_id
+    (row i == recipe_id i), memory-mapped read-only so worker processes
+    share the pages.
+    """
+    present: np.ndarray               # bool, True where recipe_id exists
+    columns: Dict[str, np.ndarray]    # column -> float32 (NaN = missing)
+    dataset_version: Optional[str] = None
+
+    def valid_ids(self, recipe_ids: Iterable[int]) -> np.ndarray:
+        """
+        Unique ids (input order) that exist in the store.
+        """
+        ids = np.fromiter(dict.fromkeys(int(r) for r in recipe_ids), dtype=np.int64)
+        ids = ids[(ids >= 0) & (ids < len(self.present))]
+        return ids[self.present[ids]]
+
+    def matrix(self, recipe_ids: np.ndarray, columns: Sequence[str] = NUTRITION_COLUMNS) -> np.ndarray:
+        """
+        (len(recipe_ids), len(columns)) float64 block via fancy indexing.
+        """
+        return np.stack([self.columns[c][recipe_ids] for c in columns], axis=1).astype(np.float64)
+
+    def summarize(
+            self,
+            recipe_ids: Iterable[int],
+            columns: Sequence[str] = NUTRITION_COLUMNS,
+    ) -> Tuple[Dict[int, Dict[str, float]], Dict[str, float]]:
+        """
+        Per-recipe breakdown and NaN-safe totals.
+        Values are rounded to 3 decimals to hide float32 noise.
+        """
+        ids = self.valid_ids(recipe_ids)
+        if len(ids) == 0:
+            return {}, {}
+
+        block = self.matrix(ids, columns)
+        totals = np.round(np.nansum(block, axis=0), 3)
+        rows = np.round(block, 3)
+
+        per_recipe = {
+            int(rid): dict(zip(columns, row))
+            for rid, row in zip(ids.tolist(), rows.tolist())
+        }
+        return per_recipe, dict(zip(columns, totals.tolist()))
+
+    def filter(self, **ranges: Range) -> np.ndarray:
+        """
+        Recipe ids whose columns fall inside inclusive (low, high) ranges,
+        e.g. filter(calories=(None, 400), protein_pdv=(30, None)).
+        """
+        unknown = [c for c in ranges if c not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown nutrition columns: {unknown}")
+
+        mask = np.array(self.present, dtype=bool)
+        for col, (low, high) in ranges.items():
+            values = self.columns[col]
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return np.flatnonzero(mask)
+
+
+# ==================================================
+# Build / load
+# ==================================================
+
+def build_nutrition_store(
+        dataset_version: Optional[str] = None,
+        bind: Optional[Engine] = None,
+) -> int:
+    """
+    Write the columnar store from `recipes`. Files are written to a
+    temporary directory and swapped in, so mapped readers never see a
+    half-written array. Returns the number of recipes stored.
+    """
+    df = pd.read_sql(
+        f"SELECT recipe_id, {', '.join(STORE_COLUMNS)} FROM recipes",
+        bind or engine,
+    )
+
+    ids = df["recipe_id"].to_numpy(dtype=np.int64)
+    size = int(ids.max()) + 1 if len(ids) else 1
+
+    tmp_dir = NUTRITION_STORE_DIR.with_name(NUTRITION_STORE_DIR.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    present = np.zeros(size, dtype=bool)
+    present[ids] = True
+    np.save(tmp_dir / "present.npy", present)
+
+    for col in STORE_COLUMNS:
+        values = np.full(size, np.nan, dtype=np.float32)
+        values[ids] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+        np.save(tmp_dir / f"{col}.npy", values)
+
+    (tmp_dir / "meta.json").write_text(json.dumps({
+        "dataset_version": dataset_version,
+        "n_recipes": len(ids),
+        "columns": list(STORE_COLUMNS),
+    }))
+
+    old_dir = NUTRITION_STORE_DIR.with_name(NUTRITION_STORE_DIR.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if NUTRITION_STORE_DIR.exists():
+        NUTRITION_STORE_DIR.rename(old_dir)
+    tmp_dir.rename(NUTRITION_STORE_DIR)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    return len(ids)
+
+
+def load_nutrition_store() -> Optional[NutritionStore]:
+    """
+    Memory-map the store, or None if it has not been built.
+    """
+    meta_path = NUTRITION_STORE_DIR / "meta.json"
+    if not meta_path.exists():
+        return None
+
+    meta = json.loads(meta_path.read_text())
+    return NutritionStore(
+        present=np.load(NUTRITION_STORE_DIR / "present.npy", mmap_mode="r"),
+        columns={
+            col: np.load(NUTRITION_STORE_DIR / f"{col}.npy", mmap_mode="r")
+            for col in meta["columns"]
+        },
+        dataset_version=meta.get("dataset_version"),
+    )
+
+
+# ==================================================
+# Process-wide instance
+# ==================================================
+
+_STORE: Optional[NutritionStore] = None
+_STORE_VERSION: Optional[str] = None
+_STORE_LOADED = False
+_STORE_LOCK = threading.Lock()
+
+
+def get_nutrition_store() -> Optional[NutritionStore]:
+    """
+    Return the shared store (None if not built), remapping it when the
+    dataset version changes.
+    """
+    global _STORE, _STORE_VERSION, _STORE_LOADED
+    version = current_dataset_version()
+    if not _STORE_LOADED or version != _STORE_VERSION:
+        with _STORE_LOCK:
+            if not _STORE_LOADED or version != _STORE_VERSION:
+                _STORE = load_nutrition_store()
+                _STORE_VERSION = version
+                _STORE_LOADED = True
+    return _STORE
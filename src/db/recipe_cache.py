@@ -0,0 +1,132 @@
+# src/db/recipe_cache.py
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.db.meta import get_version_changes
+from src.config.settings import RECIPE_CACHE_SIZE, RECIPE_CACHE_MAX_BATCH
+
+
+class RecipeCache:
+    """
+    Bounded, thread-safe LRU of recipe rows keyed by recipe_id.
+
+    Entries accumulate columns across projections: a row first fetched for
+    "nutrition" and later for "name" ends up holding both, so a tool chain
+    over the same recipe_ids only hits SQLite once per column set.
+    """
+
+    def __init__(self, max_entries: int = RECIPE_CACHE_SIZE, max_batch: int = RECIPE_CACHE_MAX_BATCH):
+        self.max_entries = max_entries
+        self.max_batch = max_batch
+
+        self._rows: "OrderedDict[int, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ----------------------------
+    # Lookup / fill
+    # ----------------------------
+
+    def get_many(
+            self,
+            recipe_ids: Sequence[int],
+            columns: Sequence[str],
+    ) -> Tuple[Dict[int, dict], List[int]]:
+        """
+        Split `recipe_ids` into cached rows (projected to `columns`)
+        and ids that must be fetched.
+        """
+        found: Dict[int, dict] = {}
+        missing: List[int] = []
+
+        with self._lock:
+            for rid in recipe_ids:
+                row = self._rows.get(rid)
+                if row is not None and all(c in row for c in columns):
+                    self._rows.move_to_end(rid)
+                    found[rid] = {c: row[c] for c in columns}
+                else:
+                    missing.append(rid)
+
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        return found, missing
+
+    def put_many(self, rows: Iterable[dict]) -> None:
+        with self._lock:
+            for row in rows:
+                rid = row["recipe_id"]
+                cached = self._rows.get(rid)
+                if cached is None:
+                    self._rows[rid] = dict(row)
+                else:
+                    cached.update(row)
+                    self._rows.move_to_end(rid)
+
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+                self.evictions += 1
+
+    def admits(self, n_ids: int) -> bool:
+        """Large scans bypass the cache so they don't flush hot rows."""
+        return 0 < n_ids <= self.max_batch
+
+    # ----------------------------
+    # Invalidation / stats
+    # ----------------------------
+
+    def check_version(self, version: Optional[str]) -> None:
+        """
+        Sync with the dataset version. An incremental build on top of the
+        cached version only evicts the recipe_ids it touched; anything
+        else drops the whole cache.
+        """
+        if version == self._version:
+            return
+        changes = get_version_changes(version) if version else None
+        with self._lock:
+            if version == self._version:
+                return
+            if changes is not None and changes.applies_to(self._version):
+                for rid in changes.changed_ids:
+                    self._rows.pop(rid, None)
+            else:
+                self._rows.clear()
+            self._version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._rows),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "dataset_version": self._version,
+            }
+
+
+# --------------------------------------------------
+# Process-wide instance
+# --------------------------------------------------
+
+RECIPE_CACHE = RecipeCache()
+
+
+def recipe_cache_stats() -> dict:
+    return RECIPE_CACHE.stats()
@@ -1,177 +1,346 @@
 # src/db/recipes.py
 
-from typing import List, Optional
+import re
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
 import pandas as pd
-from sqlalchemy import text
 
-from src.db.engine import engine
+from src.db.engine import engine, read_cursor
+from src.db.ingredient_index import get_ingredient_index
+from src.db.meta import current_dataset_version
+from src.db.recipe_cache import RECIPE_CACHE
+
+# Stay under SQLite's host-parameter limit (999 on older builds)
+SQLITE_MAX_PARAMS = 900
+
+
+# ==================================================
+# Column projections
+# ==================================================
+
+NUTRITION_COLUMNS: Tuple[str, ...] = (
+    "calories",
+    "total_fat_pdv",
+    "sugar_pdv",
+    "sodium_pdv",
+    "protein_pdv",
+    "saturated_fat_pdv",
+    "carbs_pdv",
+)
+
+RECIPE_COLUMNS: Tuple[str, ...] = (
+    "recipe_id",
+    "name",
+    "description",
+    "minutes",
+    "n_steps",
+    "n_ingredients",
+    *NUTRITION_COLUMNS,
+    "steps_json",
+    "ingredients_json",
+    "tags_json",
+    "document",
+)
+
+# Named column sets, so each tool only pulls what it uses.
+# "full" keeps the old SELECT * behaviour.
+RECIPE_FIELD_SETS: Dict[str, Tuple[str, ...]] = {
+    "id": ("recipe_id",),
+    "name": ("recipe_id", "name"),
+    "nutrition": ("recipe_id", *NUTRITION_COLUMNS),
+    "ingredients": ("recipe_id", "ingredients_json"),
+    "card": ("recipe_id", "name", "ingredients_json", *NUTRITION_COLUMNS),
+    # Everything the agent may quote (ingredients, times, tags), without
+    # the heavy steps / embedding document text
+    "lookup": tuple(c for c in RECIPE_COLUMNS if c not in ("steps_json", "document")),
+    "full": RECIPE_COLUMNS,
+}
+
+Fields = Union[str, Sequence[str]]
+
+
+def resolve_fields(fields: Fields = "full") -> Tuple[str, ...]:
+    """
+    Turn a field-set name or explicit column list into validated columns.
+    recipe_id is always included (callers key and order on it).
+    """
+    if isinstance(fields, str):
+        if fields not in RECIPE_FIELD_SETS:
+            raise ValueError(
+                f"Unknown field set '{fields}'. "
+                f"Expected one of: {sorted(RECIPE_FIELD_SETS)}"
+            )
+        return RECIPE_FIELD_SETS[fields]
+
+    unknown = [c for c in fields if c not in RECIPE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown recipe columns: {unknown}")
+
+    return ("recipe_id",) + tuple(c for c in fields if c != "recipe_id")
+
+
+def _select_list(fields: Fields) -> str:
+    # Always explicit: `recipes` also carries build bookkeeping columns
+    return ", ".join(resolve_fields(fields))
 
 
 # ==================================================
 # Core recipe access
 # ==================================================
 
-def get_recipe_by_id(recipe_id: int) -> Optional[dict]:
+def get_recipe_by_id(recipe_id: int, fields: Fields = "full") -> Optional[dict]:
     """
-    Fetch a single recipe by ID.
+    Fetch a single recipe by ID (fast path, no DataFrame).
     """
-    query = """
-    SELECT *
+    query = f"""
+    SELECT {_select_list(fields)}
     FROM recipes
     WHERE recipe_id = ?
     """
-    df = pd.read_sql(query, engine, params=(recipe_id,))
-    return df.iloc[0].to_dict() if not df.empty else None
+    return _fetch_one_dict(query, (int(recipe_id),))
 
 
-def get_recipes_by_ids(recipe_ids: List[int]) -> pd.DataFrame:
+def get_recipes_by_ids(recipe_ids: List[int], fields: Fields = "full") -> pd.DataFrame:
     """
-    Fetch multiple recipes by ID.
-    Preserves input order.
+    Fetch multiple recipes by ID, projected to `fields`.
+    Preserves input order (duplicates collapse to the first occurrence).
+
+    Small batches are served through the shared LRU row cache; misses are
+    filled with a single query.
     """
     if not recipe_ids:
         return pd.DataFrame()
 
-    placeholders = ",".join("?" for _ in recipe_ids)
-    query = f"""
-    SELECT *
-    FROM recipes
-    WHERE recipe_id IN ({placeholders})
-    """
+    recipe_ids = list(dict.fromkeys(int(rid) for rid in recipe_ids))
+    columns = resolve_fields(fields)
+
+    if RECIPE_CACHE.admits(len(recipe_ids)):
+        RECIPE_CACHE.check_version(current_dataset_version())
+        rows, missing = RECIPE_CACHE.get_many(recipe_ids, columns)
+        fetched = _fetch_rows(missing, columns)
+        RECIPE_CACHE.put_many(fetched)
+    else:
+        rows, fetched = {}, _fetch_rows(recipe_ids, columns)
+
+    rows.update((row["recipe_id"], row) for row in fetched)
+    records = [rows[rid] for rid in recipe_ids if rid in rows]
+
+    return pd.DataFrame.from_records(records, columns=list(columns))
 
-    df = pd.read_sql(
-        query,
-        engine,
-        params=tuple(recipe_ids),
-    )
 
-    # Preserve input order
-    order_map = {rid: i for i, rid in enumerate(recipe_ids)}
-    df["_order"] = df["recipe_id"].map(order_map)
+def _fetch_rows(recipe_ids: List[int], columns: Tuple[str, ...]) -> List[dict]:
+    if not recipe_ids:
+        return []
+
+    select = ", ".join(columns)
 
-    return df.sort_values("_order").drop(columns="_order")
+    rows: List[dict] = []
+    with read_cursor() as cur:
+        for chunk in _chunks(recipe_ids):
+            placeholders = ",".join("?" for _ in chunk)
+            cur.execute(
+                f"SELECT {select} FROM recipes WHERE recipe_id IN ({placeholders})",
+                chunk,
+            )
+            rows.extend(dict(zip(columns, row)) for row in cur.fetchall())
+    return rows
 
 
 # ==================================================
 # Ingredient-based retrieval (STRICT / LOOSE / FALLBACK)
 # ==================================================
+# Two-phase: ids are ranked from the in-memory posting lists
+# (src/db/ingredient_index.py), then only the requested page is fetched.
+# Pages are addressed by limit/offset or by a keyset cursor (page_cursor),
+# which stays cheap and stable when paging deep into large result sets.
 
-def get_recipes_with_all_ingredients(ingredients: List[str]) -> pd.DataFrame:
+def get_recipes_with_all_ingredients(
+        ingredients: List[str],
+        fields: Fields = "full",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+) -> pd.DataFrame:
     """
-    Return recipes that contain ALL specified ingredients.
+    Return recipes that contain ALL specified ingredients (recipe_id ASC).
     """
     if not ingredients:
         return pd.DataFrame()
 
-    ingredients = [i.lower() for i in ingredients]
-    placeholders = ",".join("?" for _ in ingredients)
-
-    query = f"""
-    SELECT r.*
-    FROM recipes r
-    JOIN recipe_ingredients ri
-      ON r.recipe_id = ri.recipe_id
-    WHERE ri.ingredient IN ({placeholders})
-    GROUP BY r.recipe_id
-    HAVING COUNT(DISTINCT ri.ingredient) = ?
-    """
-
-    params = tuple(ingredients) + (len(ingredients),)
-    return pd.read_sql(query, engine, params=params)
+    ids = get_ingredient_index().match_all(ingredients)
+    return _fetch_page(ids, None, fields, limit, offset, cursor)
 
 
 def get_recipes_with_any_ingredients(
         ingredients: List[str],
         min_matches: int = 1,
+        fields: Fields = "full",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
 ) -> pd.DataFrame:
     """
     Return recipes that match AT LEAST `min_matches` of the given ingredients.
-    SQLite-safe implementation.
+    Ranked by match_count DESC.
     """
-
     if not ingredients or min_matches <= 0:
         return pd.DataFrame()
 
-    ingredients = [ing.lower().strip() for ing in ingredients]
+    ids, counts = get_ingredient_index().match_at_least(ingredients, min_matches)
+    return _fetch_page(ids, counts, fields, limit, offset, cursor)
 
-    score_clauses = []
-    where_clauses = []
-    params = {}
 
-    for i, ing in enumerate(ingredients):
-        key = f"ing{i}"
-        score_clauses.append(
-            f"CASE WHEN LOWER(ingredients_json) LIKE :{key} THEN 1 ELSE 0 END"
-        )
-        where_clauses.append(f"LOWER(ingredients_json) LIKE :{key}")
-        params[key] = f"%{ing}%"
+def get_recipes_with_partial_ingredients(
+    ingredients: List[str],
+    min_matches: int,
+    fields: Fields = "full",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Alias of get_recipes_with_any_ingredients, kept for existing callers.
+    The old fallback's substring matching is now what every ingredient
+    lookup does (see src/db/ingredient_index.py), so the two are the same.
+    """
+    return get_recipes_with_any_ingredients(
+        ingredients, min_matches, fields, limit, offset, cursor
+    )
 
-    score_sql = " + ".join(score_clauses)
-    where_sql = " OR ".join(where_clauses)
 
-    query = f"""
-    SELECT *
-    FROM (
-        SELECT
-            *,
-            ({score_sql}) AS match_count
-        FROM recipes
-        WHERE ({where_sql})
-    )
-    WHERE match_count >= :min_matches
-    ORDER BY match_count DESC
+def iter_recipes_with_all_ingredients(
+        ingredients: List[str],
+        page_size: int = 500,
+        fields: Fields = "full",
+) -> Iterator[pd.DataFrame]:
+    """
+    Lazily yield pages of get_recipes_with_all_ingredients.
+    Ids are ranked once; each page is fetched only when requested.
     """
+    if not ingredients:
+        return
 
-    params["min_matches"] = min_matches
+    ids = get_ingredient_index().match_all(ingredients)
+    yield from _iter_pages(ids, None, page_size, fields)
 
-    with engine.connect() as conn:
-        return pd.read_sql(text(query), conn, params=params)
 
+def iter_recipes_with_any_ingredients(
+        ingredients: List[str],
+        min_matches: int = 1,
+        page_size: int = 500,
+        fields: Fields = "full",
+) -> Iterator[pd.DataFrame]:
+    """
+    Lazily yield pages of get_recipes_with_any_ingredients.
+    """
+    if not ingredients or min_matches <= 0:
+        return
 
+    ids, counts = get_ingredient_index().match_at_least(ingredients, min_matches)
+    yield from _iter_pages(ids, counts, page_size, fields)
 
-def get_recipes_with_partial_ingredients(
-    ingredients: List[str],
-    min_matches: int,
-) -> pd.DataFrame:
+
+def page_cursor(df: pd.DataFrame) -> Optional[str]:
     """
-    Return recipes that match AT LEAST `min_matches` ingredients.
-    Fallback matcher using ingredients_json.
+    Cursor pointing just after the last row of a page (None if empty).
     """
-    if not ingredients or min_matches <= 0:
+    if df.empty:
+        return None
+
+    last = df.iloc[-1]
+    if "match_count" in df.columns:
+        return f"{int(last['match_count'])}:{int(last['recipe_id'])}"
+    return str(int(last["recipe_id"]))
+
+
+def _cursor_start(ids: np.ndarray, counts: Optional[np.ndarray], cursor: str) -> int:
+    """Position of the first ranked id after `cursor`."""
+    try:
+        if counts is None:
+            return int(np.searchsorted(ids, int(cursor), side="right"))
+
+        count, rid = (int(part) for part in cursor.split(":"))
+    except ValueError:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from None
+
+    # Ranking is (match_count DESC, recipe_id ASC)
+    after = np.flatnonzero((counts < count) | ((counts == count) & (ids > rid)))
+    return int(after[0]) if len(after) else len(ids)
+
+
+def _fetch_page(
+        ids: np.ndarray,
+        counts: Optional[np.ndarray],
+        fields: Fields,
+        limit: Optional[int],
+        offset: int,
+        cursor: Optional[str],
+) -> pd.DataFrame:
+    start = _cursor_start(ids, counts, cursor) if cursor else 0
+    start += max(0, int(offset))
+    stop = len(ids) if limit is None else start + max(0, int(limit))
+
+    page_ids = ids[start:stop]
+    if len(page_ids) == 0:
         return pd.DataFrame()
 
-    ingredients = [ing.lower().strip() for ing in ingredients]
+    if fields == "id":
+        # Ids come straight from the index: no DB round trip
+        df = pd.DataFrame({"recipe_id": page_ids})
+    else:
+        df = get_recipes_by_ids(page_ids.tolist(), fields=fields)
 
-    like_clauses = []
-    params = {}
+    if counts is not None:
+        df["match_count"] = df["recipe_id"].map(pd.Series(counts[start:stop], index=page_ids))
+    return df
 
-    for i, ing in enumerate(ingredients):
-        key = f"ing{i}"
-        like_clauses.append(f"LOWER(ingredients_json) LIKE :{key}")
-        params[key] = f"%{ing}%"
 
-    where_sql = " OR ".join(like_clauses)
+def _iter_pages(
+        ids: np.ndarray,
+        counts: Optional[np.ndarray],
+        page_size: int,
+        fields: Fields,
+) -> Iterator[pd.DataFrame]:
+    page_size = max(1, int(page_size))
+    for start in range(0, len(ids), page_size):
+        yield _fetch_page(ids, counts, fields, page_size, start, None)
 
-    score_sql = " + ".join(
-        [
-            f"CASE WHEN LOWER(ingredients_json) LIKE :ing{i} THEN 1 ELSE 0 END"
-            for i in range(len(ingredients))
-        ]
-    )
 
-    query = f"""
-    SELECT *,
-           ({score_sql}) AS match_count
-    FROM recipes
-    WHERE ({where_sql})
-    HAVING match_count >= :min_matches
-    ORDER BY match_count DESC
+# ==================================================
+# Name search (FTS5, bm25-ranked)
+# ==================================================
+
+def _fts_terms(raw: str) -> List[str]:
+    """Tokenize user text into quoted FTS5 prefix terms."""
+    return [f'"{tok}"*' for tok in re.findall(r"\w+", raw.lower())]
+
+
+def search_recipes_by_name(name: str, limit: int = 5) -> pd.DataFrame:
     """
+    Ranked recipe-name lookup.
+    Every token must prefix-match the name; exact names rank first,
+    then bm25.
+    """
+    terms = _fts_terms(name or "")
+    if not terms:
+        return pd.DataFrame(columns=["recipe_id", "name"])
 
-    params["min_matches"] = min_matches
+    match = " AND ".join(f"name : {t}" for t in terms)
 
-    with engine.connect() as conn:
-        return pd.read_sql(text(query), conn, params=params)
+    query = """
+    SELECT r.recipe_id, r.name
+    FROM recipes_fts f
+    JOIN recipes r
+      ON r.recipe_id = f.rowid
+    WHERE recipes_fts MATCH ?
+    ORDER BY LOWER(r.name) = ? DESC, bm25(recipes_fts)
+    LIMIT ?
+    """
+    return pd.read_sql(
+        query,
+        engine,
+        params=(match, name.strip().lower(), int(limit)),
+    )
 
 
 # ==================================================
@@ -185,69 +354,160 @@ def exclude_ingredients(df: pd.DataFrame, banned: List[str]) -> pd.DataFrame:
     if df.empty or not banned:
         return df
 
-    banned = [b.lower() for b in banned]
-    placeholders = ",".join("?" for _ in banned)
-
-    query = f"""
-    SELECT DISTINCT recipe_id
-    FROM recipe_ingredients
-    WHERE ingredient IN ({placeholders})
-    """
+    banned_ids = get_ingredient_index().match_any(banned)
+    return df[~df["recipe_id"].isin(banned_ids)]
 
-    banned_ids = pd.read_sql(
-        query,
-        engine,
-        params=tuple(banned),
-    )["recipe_id"].tolist()
 
-    return df[~df["recipe_id"].isin(banned_ids)]
+def _chunks(items: List[int], size: int = SQLITE_MAX_PARAMS) -> Iterator[List[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
 # ==================================================
 # Lightweight helpers (used by tools)
 # ==================================================
+# Pandas-free: plain DB-API rows over the thread-local cursor.
+# Query strings are constants so sqlite3's statement cache hits.
+
+_INGREDIENTS_SQL = """
+SELECT ingredient
+FROM recipe_ingredients
+WHERE recipe_id = ?
+"""
+
+_TAGS_SQL = """
+SELECT tag
+FROM recipe_tags
+WHERE recipe_id = ?
+"""
+
+_NUTRITION_SQL = f"""
+SELECT {", ".join(NUTRITION_COLUMNS)}
+FROM recipes
+WHERE recipe_id = ?
+"""
+
+
+def _fetch_one_dict(query: str, params: tuple) -> Optional[dict]:
+    with read_cursor() as cur:
+        row = cur.execute(query, params).fetchone()
+        if row is None:
+            return None
+        return dict(zip((d[0] for d in cur.description), row))
+
+
+def _fetch_column(query: str, params: tuple) -> List:
+    with read_cursor() as cur:
+        return [row[0] for row in cur.execute(query, params).fetchall()]
+
 
 def get_recipe_ingredients(recipe_id: int) -> List[str]:
     """
     Return ingredient list for a recipe.
     """
-    query = """
-    SELECT ingredient
-    FROM recipe_ingredients
-    WHERE recipe_id = ?
-    """
-    df = pd.read_sql(query, engine, params=(recipe_id,))
-    return df["ingredient"].tolist()
+    return _fetch_column(_INGREDIENTS_SQL, (int(recipe_id),))
 
 
 def get_recipe_tags(recipe_id: int) -> List[str]:
     """
     Return tags for a recipe.
     """
-    query = """
-    SELECT tag
-    FROM recipe_tags
-    WHERE recipe_id = ?
-    """
-    df = pd.read_sql(query, engine, params=(recipe_id,))
-    return df["tag"].tolist()
+    return _fetch_column(_TAGS_SQL, (int(recipe_id),))
 
 
 def get_recipe_nutrition(recipe_id: int) -> dict:
     """
     Return nutrition fields for a single recipe.
     """
-    query = """
-    SELECT
-        calories,
-        total_fat_pdv,
-        sugar_pdv,
-        sodium_pdv,
-        protein_pdv,
-        saturated_fat_pdv,
-        carbs_pdv
-    FROM recipes
-    WHERE recipe_id = ?
+    return _fetch_one_dict(_NUTRITION_SQL, (int(recipe_id),)) or {}
+
+
+# ==================================================
+# Batch helpers (one indexed query per chunk, no N+1)
+# ==================================================
+
+def get_recipe_ingredients_many(recipe_ids: List[int]) -> Dict[int, List[str]]:
+    """
+    Return {recipe_id: [ingredient, ...]} for many recipes.
+    Every requested id is present (empty list if unknown).
+    """
+    return _fetch_grouped("recipe_ingredients", "ingredient", recipe_ids)
+
+
+def get_recipe_tags_many(recipe_ids: List[int]) -> Dict[int, List[str]]:
+    """
+    Return {recipe_id: [tag, ...]} for many recipes.
+    Every requested id is present (empty list if unknown).
+    """
+    return _fetch_grouped("recipe_tags", "tag", recipe_ids)
+
+
+def _fetch_grouped(table: str, column: str, recipe_ids: List[int]) -> Dict[int, List[str]]:
+    recipe_ids = list(dict.fromkeys(int(rid) for rid in recipe_ids))
+    grouped: Dict[int, List[str]] = {rid: [] for rid in recipe_ids}
+
+    with read_cursor() as cur:
+        for chunk in _chunks(recipe_ids):
+            placeholders = ",".join("?" for _ in chunk)
+            cur.execute(
+                f"SELECT recipe_id, {column} FROM {table} WHERE recipe_id IN ({placeholders})",
+                chunk,
+            )
+            for rid, value in cur.fetchall():
+                grouped[rid].append(value)
+
+    return grouped
+
+
+# ==================================================
+# Id filters (for filtered vector search)
+# ==================================================
+
+def get_recipe_ids_with_tags(tags: List[str]) -> np.ndarray:
+    """
+    Sorted recipe ids carrying ALL of `tags` (exact, case-insensitive).
+    """
+    tags = list(dict.fromkeys(t.strip().lower() for t in tags if t and t.strip()))
+    if not tags:
+        return np.empty(0, dtype=np.int64)
+
+    placeholders = ",".join("?" for _ in tags)
+    with read_cursor() as cur:
+        rows = cur.execute(
+            f"""
+            SELECT recipe_id
+            FROM recipe_tags
+            WHERE tag IN ({placeholders})
+            GROUP BY recipe_id
+            HAVING COUNT(DISTINCT tag) = ?
+            """,
+            (*tags, len(tags)),
+        ).fetchall()
+    return np.sort(np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)))
+
+
+def get_recipe_ids_in_ranges(**ranges: Tuple[Optional[float], Optional[float]]) -> np.ndarray:
+    """
+    Sorted recipe ids whose numeric columns fall inside inclusive
+    (low, high) ranges; SQL counterpart of NutritionStore.filter.
     """
-    df = pd.read_sql(query, engine, params=(recipe_id,))
-    return df.iloc[0].to_dict() if not df.empty else {}
+    unknown = [c for c in ranges if c not in RECIPE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown recipe columns: {unknown}")
+
+    clauses, params = [], []
+    for col, (low, high) in ranges.items():
+        if low is not None:
+            clauses.append(f"{col} >= ?")
+            params.append(low)
+        if high is not None:
+            clauses.append(f"{col} <= ?")
+            params.append(high)
+
+    where = " AND ".join(clauses) or "1"
+    with read_cursor() as cur:
+        rows = cur.execute(
+            f"SELECT recipe_id FROM recipes WHERE {where} ORDER BY recipe_id",
+            params,
+        ).fetchall()
+    return np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
@@ -1,11 +1,22 @@
+import argparse
 import ast
+import hashlib
 import json
+import os
+import sqlite3
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 from tqdm import tqdm
 
-from src.db.engine import engine
+from src.db.engine import connect_writer, write_engine
+from src.db.ingredient_index import build_ingredient_index, reset_ingredient_index
+from src.db.meta import new_dataset_version, record_dataset_version
+from src.db.nutrition_store import build_nutrition_store
 from src.config.settings import PROCESSED_DIR
 
 # --------------------------------------------------
@@ -15,138 +26,479 @@ CSV_PATH = PROCESSED_DIR / "PROCESSED_recipes.csv"
 SCHEMA_PATH = Path(__file__).resolve().parent / "schema.sql"
 
 # --------------------------------------------------
-# Main builder
+# Ingest settings
 # --------------------------------------------------
-def build_database():
-    print("🚀 Starting database build")
-    print("⚠️ This will DROP and rebuild recipe tables")
+CHUNK_SIZE = 20_000
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
 
-    # ----------------------------
-    # Load processed data
-    # ----------------------------
-    print(f"📄 Loading data from {CSV_PATH}")
-    df = pd.read_csv(CSV_PATH)
+# Served columns of `recipes`, in insert order (recipe_id is assigned
+# by the builder, so it is not part of the parsed values)
+VALUE_COLUMNS = [
+    "name",
+    "description",
+    "minutes",
+    "n_steps",
+    "n_ingredients",
+    "calories",
+    "total_fat_pdv",
+    "sugar_pdv",
+    "sodium_pdv",
+    "protein_pdv",
+    "saturated_fat_pdv",
+    "carbs_pdv",
+    "steps_json",
+    "ingredients_json",
+    "tags_json",
+    "document",
+]
 
-    for col in ["tags", "steps", "ingredients"]:
-        df[col] = df[col].apply(ast.literal_eval)
+# Bookkeeping for incremental builds
+KEY_COLUMNS = ["source_key", "row_hash"]
 
-    # ----------------------------
-    # Reset schema (IMPORTANT)
-    # ----------------------------
+# Fixed CSV dtypes, so every chunk parses a column the same way (an int
+# column with a NaN would otherwise turn float in that chunk only, and
+# change the row hash and source key of unchanged recipes)
+INT_COLUMNS = ["id", "minutes", "n_steps", "n_ingredients"]
+FLOAT_COLUMNS = [
+    "calories",
+    "total_fat_pdv",
+    "sugar_pdv",
+    "sodium_pdv",
+    "protein_pdv",
+    "saturated_fat_pdv",
+    "carbs_pdv",
+]
+TEXT_COLUMNS = ["name", "description", "steps", "ingredients", "tags", "document"]
+CSV_DTYPES = {
+    **{c: "Int64" for c in INT_COLUMNS},
+    **{c: "float64" for c in FLOAT_COLUMNS},
+    **{c: "string" for c in TEXT_COLUMNS},
+}
+
+INSERT_RECIPE_SQL = (
+    f"INSERT INTO recipes (recipe_id, {', '.join(VALUE_COLUMNS + KEY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in range(1 + len(VALUE_COLUMNS) + len(KEY_COLUMNS)))})"
+)
+UPDATE_RECIPE_SQL = (
+    f"UPDATE recipes SET {', '.join(f'{c} = ?' for c in VALUE_COLUMNS + KEY_COLUMNS)} "
+    "WHERE recipe_id = ?"
+)
+INSERT_INGREDIENT_SQL = "INSERT INTO recipe_ingredients (recipe_id, ingredient) VALUES (?, ?)"
+INSERT_TAG_SQL = "INSERT INTO recipe_tags (recipe_id, tag) VALUES (?, ?)"
+
+# (source_key, row_hash, values in VALUE_COLUMNS order, ingredients, tags)
+ParsedRecipe = Tuple[str, str, tuple, List[str], List[str]]
+ParsedChunk = Tuple[List[ParsedRecipe], float]
+
+
+# --------------------------------------------------
+# Stage timing
+# --------------------------------------------------
+class StageStats:
+    """Accumulates rows and seconds per build stage."""
+
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, stage: str, rows: int, seconds: float):
+        self.rows[stage] = self.rows.get(stage, 0) + rows
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def report(self):
+        print("⏱️ Stage throughput")
+        for stage, rows in self.rows.items():
+            secs = self.seconds[stage]
+            rate = rows / secs if secs > 0 else float("inf")
+            print(f"   {stage:<22}{rows:>12,} rows {secs:>9.2f}s {rate:>14,.0f} rows/s")
+
+
+# --------------------------------------------------
+# Chunk parsing (runs in worker processes)
+# --------------------------------------------------
+def _row_hash(values: tuple) -> str:
+    return hashlib.blake2b(
+        json.dumps(values, ensure_ascii=False).encode("utf-8"),
+        digest_size=16,
+    ).hexdigest()
+
+
+def _parse_chunk(chunk: pd.DataFrame) -> ParsedChunk:
+    """
+    Parse list columns for one CSV chunk and hash each processed row.
+
+    The source key is the CSV `id` column when present, else the recipe
+    name (duplicates are disambiguated in file order by `_SourceKeys`).
+    """
+    start = time.perf_counter()
+
+    key_column = "id" if "id" in chunk.columns else "name"
+    records = chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+
+    parsed: List[ParsedRecipe] = []
+
+    for rec in records:
+        steps = ast.literal_eval(rec["steps"])
+        ingredients = ast.literal_eval(rec["ingredients"])
+        tags = ast.literal_eval(rec["tags"])
+
+        row = dict(
+            rec,
+            steps_json=json.dumps(steps),
+            ingredients_json=json.dumps(ingredients),
+            tags_json=json.dumps(tags),
+        )
+        values = tuple(row[c] for c in VALUE_COLUMNS)
+
+        parsed.append((
+            str(rec[key_column] or ""),
+            _row_hash(values),
+            values,
+            list(dict.fromkeys(i.strip().lower() for i in ingredients)),
+            list(dict.fromkeys(t.strip().lower() for t in tags)),
+        ))
+
+    return parsed, time.perf_counter() - start
+
+
+def _iter_parsed_chunks(csv_path: Path, chunk_size: int, workers: int) -> Iterator[ParsedChunk]:
+    """
+    Stream the CSV in chunks and parse them in a process pool.
+    At most 2 * workers chunks are in flight, which bounds peak memory.
+    Chunks are yielded in file order.
+    """
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    reader = pd.read_csv(
+        csv_path,
+        chunksize=chunk_size,
+        dtype={c: t for c, t in CSV_DTYPES.items() if c in columns},
+    )
+
+    if workers <= 1:
+        for chunk in reader:
+            yield _parse_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in reader:
+            pending.append(pool.submit(_parse_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _SourceKeys:
+    """Makes source keys unique in file order ("name", "name#2", ...)."""
+
+    def __init__(self):
+        self._seen: Counter = Counter()
+
+    def assign(self, parsed: List[ParsedRecipe]) -> List[ParsedRecipe]:
+        out = []
+        for key, row_hash, values, ingredients, tags in parsed:
+            self._seen[key] += 1
+            n = self._seen[key]
+            out.append((key if n == 1 else f"{key}#{n}", row_hash, values, ingredients, tags))
+        return out
+
+
+# --------------------------------------------------
+# Row writers (caller owns the transaction)
+# --------------------------------------------------
+def _insert_children(conn, rows: List[Tuple[int, ParsedRecipe]], stats: StageStats):
+    t = time.perf_counter()
+    ingredient_rows = [(rid, ing) for rid, p in rows for ing in p[3]]
+    conn.executemany(INSERT_INGREDIENT_SQL, ingredient_rows)
+    stats.add("write ingredients", len(ingredient_rows), time.perf_counter() - t)
+
+    t = time.perf_counter()
+    tag_rows = [(rid, tag) for rid, p in rows for tag in p[4]]
+    conn.executemany(INSERT_TAG_SQL, tag_rows)
+    stats.add("write tags", len(tag_rows), time.perf_counter() - t)
+
+
+def _delete_children(conn, recipe_ids: List[int]):
+    params = [(rid,) for rid in recipe_ids]
+    conn.executemany("DELETE FROM recipe_ingredients WHERE recipe_id = ?", params)
+    conn.executemany("DELETE FROM recipe_tags WHERE recipe_id = ?", params)
+
+
+def _insert_recipes(conn, rows: List[Tuple[int, ParsedRecipe]], stats: StageStats):
+    t = time.perf_counter()
+    conn.executemany(
+        INSERT_RECIPE_SQL,
+        [(rid, *values, key, row_hash) for rid, (key, row_hash, values, _, _) in rows],
+    )
+    stats.add("write recipes", len(rows), time.perf_counter() - t)
+    _insert_children(conn, rows, stats)
+
+
+def _update_recipes(conn, rows: List[Tuple[int, ParsedRecipe]], stats: StageStats):
+    t = time.perf_counter()
+    conn.executemany(
+        UPDATE_RECIPE_SQL,
+        [(*values, key, row_hash, rid) for rid, (key, row_hash, values, _, _) in rows],
+    )
+    _delete_children(conn, [rid for rid, _ in rows])
+    stats.add("write recipes", len(rows), time.perf_counter() - t)
+    _insert_children(conn, rows, stats)
+
+
+def _delete_recipes(conn, recipe_ids: List[int], stats: StageStats):
+    t = time.perf_counter()
+    _delete_children(conn, recipe_ids)
+    conn.executemany("DELETE FROM recipes WHERE recipe_id = ?", [(rid,) for rid in recipe_ids])
+    stats.add("delete recipes", len(recipe_ids), time.perf_counter() - t)
+
+
+def _supports_incremental(conn) -> bool:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(recipes)")}
+    return "source_key" in columns and "row_hash" in columns
+
+
+def _read_dataset_version(conn) -> Optional[str]:
+    try:
+        row = conn.execute(
+            "SELECT value FROM dataset_meta WHERE key = 'dataset_version'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+# --------------------------------------------------
+# Ingest modes
+# --------------------------------------------------
+def _ingest_full(conn, schema_sql: str, chunk_size: int, workers: int, stats: StageStats) -> int:
+    """
+    DROP and re-insert everything. Returns the recipe count.
+    """
     print("🧱 Resetting database schema")
-    print(f"📜 Loading schema from {SCHEMA_PATH}")
+    print("⚠️ This will DROP and rebuild recipe tables")
+
+    # 🔥 Drop tables explicitly (prevents zombie schemas)
+    conn.executescript("""
+    DROP TABLE IF EXISTS recipes_fts;
+    DROP TABLE IF EXISTS recipe_ingredients;
+    DROP TABLE IF EXISTS recipe_tags;
+    DROP TABLE IF EXISTS recipes;
+    """)
+
+    # ✅ Create fresh schema
+    conn.executescript(schema_sql)
+
+    print(f"📄 Streaming {CSV_PATH} (chunks of {chunk_size:,}, {workers} workers)")
+
+    keys = _SourceKeys()
+    total = 0
+    progress = tqdm(unit=" recipes", desc="Ingesting")
+
+    for parsed, parse_secs in _iter_parsed_chunks(CSV_PATH, chunk_size, workers):
+        stats.add("parse (per worker)", len(parsed), parse_secs)
+
+        rows = [(total + 1 + i, p) for i, p in enumerate(keys.assign(parsed))]
+
+        # One transaction per chunk
+        with conn:
+            _insert_recipes(conn, rows, stats)
+
+        total += len(rows)
+        progress.update(len(rows))
+
+    progress.close()
+    return total
+
+
+def _ingest_incremental(
+        conn,
+        schema_sql: str,
+        chunk_size: int,
+        workers: int,
+        stats: StageStats,
+) -> Tuple[int, List[int], List[int], List[int]]:
+    """
+    Diff the CSV against the stored row hashes and apply only the changes.
+    Existing recipes keep their recipe_id; new ones are appended.
+
+    Returns:
+        (recipe count, added ids, updated ids, deleted ids)
+    """
+    print("🔁 Incremental update (existing recipes keep their recipe_id)")
+
+    # Adds any tables/indexes/triggers introduced since the last full build
+    conn.executescript(schema_sql)
+
+    t = time.perf_counter()
+    existing: Dict[str, Tuple[int, str]] = {
+        key: (rid, row_hash)
+        for key, rid, row_hash in conn.execute(
+            "SELECT source_key, recipe_id, row_hash FROM recipes"
+        )
+    }
+    # Past every id ever handed out (sqlite_sequence also remembers
+    # deleted ones), as AUTOINCREMENT would: a deleted recipe's id is
+    # never reused for a different recipe
+    next_id = conn.execute("""
+        SELECT MAX(
+            COALESCE((SELECT MAX(recipe_id) FROM recipes), 0),
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'recipes'), 0)
+        ) + 1
+    """).fetchone()[0]
+    stats.add("load row hashes", len(existing), time.perf_counter() - t)
+
+    print(f"📄 Streaming {CSV_PATH} (chunks of {chunk_size:,}, {workers} workers)")
+
+    keys = _SourceKeys()
+    total = 0
+    added: List[int] = []
+    updated: List[int] = []
+    progress = tqdm(unit=" recipes", desc="Diffing")
+
+    for parsed, parse_secs in _iter_parsed_chunks(CSV_PATH, chunk_size, workers):
+        stats.add("parse (per worker)", len(parsed), parse_secs)
 
+        new_rows, changed_rows = [], []
+        for p in keys.assign(parsed):
+            # pop() marks the key as seen; leftovers are deletions
+            previous = existing.pop(p[0], None)
+            if previous is None:
+                new_rows.append((next_id, p))
+                next_id += 1
+            elif previous[1] != p[1]:
+                changed_rows.append((previous[0], p))
+
+        if new_rows or changed_rows:
+            with conn:
+                _insert_recipes(conn, new_rows, stats)
+                _update_recipes(conn, changed_rows, stats)
+
+        added.extend(rid for rid, _ in new_rows)
+        updated.extend(rid for rid, _ in changed_rows)
+        total += len(parsed)
+        progress.update(len(parsed))
+
+    progress.close()
+
+    deleted = sorted(rid for rid, _ in existing.values())
+    if deleted:
+        with conn:
+            _delete_recipes(conn, deleted, stats)
+
+    return total, added, updated, deleted
+
+
+# --------------------------------------------------
+# Main builder
+# --------------------------------------------------
+def build_database(
+        chunk_size: int = CHUNK_SIZE,
+        workers: int = DEFAULT_WORKERS,
+        incremental: bool = False,
+):
+    print("🚀 Starting database build")
+
+    build_start = time.perf_counter()
+    stats = StageStats()
+
+    print(f"📜 Loading schema from {SCHEMA_PATH}")
     schema_sql = SCHEMA_PATH.read_text()
 
-    with engine.begin() as conn:
-        raw = conn.connection
+    conn = connect_writer()
+    try:
+        parent_version = _read_dataset_version(conn)
+
+        if incremental and not _supports_incremental(conn):
+            print("⚠️ Database has no row hashes yet, falling back to a full build")
+            incremental = False
+
+        if incremental:
+            total, added, updated, deleted = _ingest_incremental(
+                conn, schema_sql, chunk_size, workers, stats
+            )
+            print(f"🔁 {len(added)} added, {len(updated)} updated, {len(deleted)} deleted")
+        else:
+            total = _ingest_full(conn, schema_sql, chunk_size, workers, stats)
+            added, updated, deleted = [], [], []
+
+        db_count = conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+        assert db_count == total, (
+            "❌ Row count mismatch between CSV and database "
+            f"({total} vs {db_count})"
+        )
 
-        # 🔥 Drop tables explicitly (prevents zombie schemas)
-        raw.executescript("""
-        DROP TABLE IF EXISTS recipe_ingredients;
-        DROP TABLE IF EXISTS recipe_tags;
-        DROP TABLE IF EXISTS recipes;
-        """)
+        if incremental and not (added or updated or deleted):
+            print("✅ No changes, dataset version unchanged")
+            print(f"🏷️ Dataset version: {parent_version}")
+            return
 
-        # ✅ Create fresh schema
-        raw.executescript(schema_sql)
+        # ----------------------------
+        # Full-text index (kept in sync by triggers)
+        # ----------------------------
+        print("🔎 Optimizing full-text index")
+        t = time.perf_counter()
+        with conn:
+            conn.execute("INSERT INTO recipes_fts(recipes_fts) VALUES ('optimize')")
+        stats.add("fts optimize", total, time.perf_counter() - t)
+    finally:
+        conn.close()
 
     # ----------------------------
-    # Insert recipes
+    # Ingredient posting lists
     # ----------------------------
-    print(f"📥 Inserting {len(df)} recipes")
-
-    df_db = df.copy()
-    df_db["steps_json"] = df_db["steps"].apply(json.dumps)
-    df_db["ingredients_json"] = df_db["ingredients"].apply(json.dumps)
-    df_db["tags_json"] = df_db["tags"].apply(json.dumps)
-
-    recipe_cols = [
-        "name",
-        "description",
-        "minutes",
-        "n_steps",
-        "n_ingredients",
-        "calories",
-        "total_fat_pdv",
-        "sugar_pdv",
-        "sodium_pdv",
-        "protein_pdv",
-        "saturated_fat_pdv",
-        "carbs_pdv",
-        "steps_json",
-        "ingredients_json",
-        "tags_json",
-        "document",
-    ]
-
-    df_db[recipe_cols].to_sql(
-        "recipes",
-        engine,
-        if_exists="append",   # ⚠️ never replace constrained tables
-        index=False
-    )
+    print("🗂️ Building ingredient index")
+    t = time.perf_counter()
+    index = build_ingredient_index(persist=True, bind=write_engine)
+    reset_ingredient_index()
+    stats.add("ingredient index", len(index.postings), time.perf_counter() - t)
+    print(f"🗂️ Indexed {index.n_ingredients} distinct ingredients")
 
     # ----------------------------
-    # Fetch recipe IDs
+    # Columnar nutrition store
     # ----------------------------
-    print("🔁 Fetching recipe IDs")
+    version = new_dataset_version()
 
-    recipes = pd.read_sql(
-        "SELECT recipe_id FROM recipes ORDER BY recipe_id",
-        engine
-    )
-
-    assert len(recipes) == len(df), (
-        "❌ Row count mismatch between CSV and database "
-        f"({len(df)} vs {len(recipes)})"
-    )
+    print("🧮 Writing columnar nutrition store")
+    t = time.perf_counter()
+    build_nutrition_store(dataset_version=version, bind=write_engine)
+    stats.add("nutrition store", total, time.perf_counter() - t)
 
     # ----------------------------
-    # Build ingredient & tag tables
+    # Publish dataset version + change log (invalidates serving caches)
     # ----------------------------
-    ingredient_rows = []
-    tag_rows = []
-
-    print("🧩 Building ingredient & tag tables")
-
-    for i, row in tqdm(df.iterrows(), total=len(df)):
-        rid = int(recipes.iloc[i]["recipe_id"])
-
-        for ing in row["ingredients"]:
-            ingredient_rows.append({
-                "recipe_id": rid,
-                "ingredient": ing.strip().lower()
-            })
-
-        for tag in row["tags"]:
-            tag_rows.append({
-                "recipe_id": rid,
-                "tag": tag.strip().lower()
-            })
-
-    pd.DataFrame(ingredient_rows).drop_duplicates().to_sql(
-        "recipe_ingredients",
-        engine,
-        if_exists="append",
-        index=False
-    )
-
-    pd.DataFrame(tag_rows).drop_duplicates().to_sql(
-        "recipe_tags",
-        engine,
-        if_exists="append",
-        index=False
-    )
+    with write_engine.begin() as conn:
+        if incremental:
+            record_dataset_version(
+                conn.connection, version, parent_version, "incremental", total,
+                added=added, updated=updated, deleted=deleted,
+            )
+        else:
+            record_dataset_version(
+                conn.connection, version, parent_version, "full", total,
+            )
 
     # ----------------------------
     # Done
     # ----------------------------
+    elapsed = time.perf_counter() - build_start
+    stats.report()
     print("✅ Database build complete")
-    print(f"📊 Total recipes: {len(df)}")
+    print(f"🏷️ Dataset version: {version}")
+    print(f"📊 Total recipes: {total} ({total / elapsed:,.0f} recipes/s end-to-end)")
 
 # --------------------------------------------------
 # Entry point
 # --------------------------------------------------
 if __name__ == "__main__":
-    build_database()
+    parser = argparse.ArgumentParser(description="Build the recipes SQLite database")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert changed recipes and delete removed ones instead of rebuilding",
+    )
+    args = parser.parse_args()
+
+    build_database(chunk_size=args.chunk_size, workers=args.workers, incremental=args.incremental)
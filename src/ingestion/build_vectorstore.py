@@ -1,87 +1,497 @@
+import argparse
+import time
+from dataclasses import replace
 from pathlib import Path
-from tqdm import tqdm
+from typing import List, Optional, Tuple
+
 import numpy as np
-import torch
 import pandas as pd
 
-from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
 
 from src.db.engine import engine
-from src.config.settings import VECTOR_INDEX_PATH
+from src.config.settings import EMBEDDING_MODEL, VECTOR_DIR, VECTOR_INDEX_PATH
+from src.ingestion.embedding_pipeline import (
+    SHARD_SIZE,
+    embed_to_memmap,
+    torch_device,
+)
+from src.retrieval.embedders import (
+    EMBEDDING_BACKENDS,
+    embedding_cache_dir,
+    embedding_model_id,
+    make_embedder,
+)
+from src.retrieval.embedding_cache import EmbeddingCache, document_key
+from src.retrieval.lexical_index import build_lexical_index, save_lexical_index
+from src.retrieval.sharded_index import (
+    assign_shards,
+    range_bounds,
+    remove_stale_shards,
+    shard_dirs,
+    sharded_index_exists,
+)
+from src.retrieval.vector_index import (
+    INDEX_KINDS,
+    RERANK_VECTORS_FILE,
+    SHARD_STRATEGIES,
+    IndexConfig,
+    add_rows,
+    build_index,
+    load_index,
+    load_index_config,
+    remove_rows,
+    save_index,
+    save_index_config,
+    save_rerank_vectors,
+    training_size,
+)
+
+# Which document (by key) each indexed vector came from
+MANIFEST_PATH = VECTOR_INDEX_PATH / "manifest.npz"
+
+# Scratch matrix the embedding workers write into (merged into the cache)
+PENDING_VECTORS_PATH = VECTOR_DIR / "embedding_cache.pending.npy"
+
+# Above this share of changed recipes an update rebuilds instead
+REBUILD_FRACTION = 0.5
+
+# Pickled LangChain docstore of the old index format (no longer written)
+LEGACY_DOCSTORE_PATH = VECTOR_INDEX_PATH / "index.pkl"
+
 
 # --------------------------------------------------
 # Load documents from DB
 # --------------------------------------------------
-def load_recipe_documents():
+def load_recipe_documents(model_id: str = EMBEDDING_MODEL) -> pd.DataFrame:
     print("📖 Loading recipe documents from DB")
 
     df = pd.read_sql(
-        "SELECT recipe_id, document FROM recipes",
+        "SELECT recipe_id, name, document FROM recipes ORDER BY recipe_id",
         engine
     )
+    df["recipe_id"] = df["recipe_id"].astype("int64")
+    df["name"] = df["name"].fillna("")
+    df["document"] = df["document"].fillna("")
+    df["key"] = [document_key(model_id, d) for d in df["document"]]
+    return df
 
-    docs = []
-    for _, row in df.iterrows():
-        docs.append(
-            Document(
-                page_content=row["document"],
-                metadata={"recipe_id": int(row["recipe_id"])}
-            )
-        )
-    return docs
 
 # --------------------------------------------------
-# Build FAISS vectorstore
+# Embeddings (cached by document hash)
 # --------------------------------------------------
-def build_vectorstore():
-    print("🚀 Starting FAISS index build")
+def make_embeddings(backend: str = "torch") -> Embeddings:
+    if backend != "torch":
+        print(f"🧠 Using {backend} encoder (CPU)")
+        return make_embedder(backend)
 
-    docs = load_recipe_documents()
-    texts = [d.page_content for d in docs]
-    metadatas = [d.metadata for d in docs]
-
-    device = "mps" if torch.backends.mps.is_available() else "cpu"
+    device = torch_device()
     print(f"🧠 Using device: {device}")
+    return make_embedder(backend, device=device)
+
+
+def embed_missing(
+        cache: EmbeddingCache,
+        embeddings: Embeddings,
+        docs: pd.DataFrame,
+        workers: Optional[int] = None,
+        threads_per_worker: Optional[int] = None,
+        shard_size: int = SHARD_SIZE,
+        backend: str = "torch",
+) -> int:
+    """
+    Embed the documents whose key is not cached yet into a memmap and
+    append it to the cache. Returns how many were embedded.
+    """
+    unique = docs.drop_duplicates("key")
+    missing = unique.iloc[cache.missing(unique["key"].tolist())]
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={"device": device},
-        encode_kwargs={
-            "batch_size": 64,
-            "normalize_embeddings": True
-        }
+    print(f"📐 Embedding {len(missing)} documents ({len(docs) - len(missing)} cached)")
+    if missing.empty:
+        return 0
+
+    dim = cache.dim or len(embeddings.embed_query("dimension probe"))
+    vectors = embed_to_memmap(
+        missing["document"].tolist(),
+        PENDING_VECTORS_PATH,
+        dim,
+        workers=workers,
+        threads_per_worker=threads_per_worker,
+        shard_size=shard_size,
+        embed=embeddings.embed_documents,
+        backend=backend,
+    )
+    cache.put(missing["key"].tolist(), vectors)
+    return len(missing)
+
+
+# --------------------------------------------------
+# Index manifest
+# --------------------------------------------------
+def save_manifest(recipe_ids: np.ndarray, keys: List[str], model_id: str = EMBEDDING_MODEL):
+    np.savez(
+        MANIFEST_PATH,
+        recipe_ids=np.asarray(recipe_ids, dtype=np.int64),
+        keys=np.array(keys, dtype="S32"),
+        model=np.array(model_id),
     )
 
-    print("📐 Embedding documents")
-    vectors = []
-    batch_size = 64
 
-    for i in tqdm(range(0, len(texts), batch_size), desc="Embedding"):
-        batch = texts[i:i + batch_size]
-        batch_vectors = embeddings.embed_documents(batch)
-        vectors.extend(batch_vectors)
+def load_manifest(model_id: str = EMBEDDING_MODEL) -> Optional[Tuple[np.ndarray, List[str]]]:
+    """
+    (recipe_ids, keys) of the current index, or None if the index was not
+    built by this script with the same model (and backend namespace).
+    """
+    if not MANIFEST_PATH.exists() or not sharded_index_exists(load_index_config()):
+        return None
+    with np.load(MANIFEST_PATH, allow_pickle=False) as data:
+        if str(data["model"]) != model_id:
+            return None
+        return data["recipe_ids"], data["keys"].astype(str).tolist()
+
+
+# --------------------------------------------------
+# Build FAISS index (raw index + row -> recipe_id array)
+# --------------------------------------------------
+def _save(index, row_recipe_ids: np.ndarray, index_dir: Path = VECTOR_INDEX_PATH):
+    print(f"💾 Saving index to {index_dir}")
+    save_index(index, row_recipe_ids, index_dir)
+    LEGACY_DOCSTORE_PATH.unlink(missing_ok=True)
+
+
+def build_shard(
+        docs: pd.DataFrame,
+        cache: EmbeddingCache,
+        config: IndexConfig,
+        index_dir: Path = VECTOR_INDEX_PATH,
+) -> IndexConfig:
+    """
+    Build one unsharded index over `docs` into `index_dir` (the whole
+    index, or one shard of it). Returns the resolved config.
+    """
+    config = config.resolved(len(docs))
+    print(f"📦 Building FAISS index: {config.describe()}")
+
+    recipe_ids = docs["recipe_id"].to_numpy()
+    keys = docs["key"].tolist()
+
+    training = None
+    n_train = training_size(config, len(keys))
+    if n_train:
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(len(keys), size=n_train, replace=False))
+        training = cache.take([keys[i] for i in sample])
+
+    # Filled block by block from the mapped cache, without a second
+    # full copy of the vectors
+    index = build_index(config, cache.dim, len(keys), cache.iter_blocks(keys), training)
+
+    _save(index, recipe_ids, index_dir)
+    save_index_config(config, index_dir)
+    write_rerank_vectors(docs, cache, config, index_dir)
+    return config
+
+
+def rebuild_index(
+        docs: pd.DataFrame,
+        cache: EmbeddingCache,
+        config: IndexConfig,
+):
+    if config.is_sharded:
+        if config.shard_by == "range" and config.shard_bounds is None:
+            config = replace(config, shard_bounds=range_bounds(docs["recipe_id"], config.shards))
+        assignment = assign_shards(config, docs["recipe_id"])
+        sizes = np.bincount(assignment, minlength=config.shards)
+        if not sizes.all():
+            raise ValueError(f"{config.shards} shards leave some empty ({sizes.tolist()}) - use fewer")
+
+        print(f"🧩 Building {config.shards} shards by {config.shard_by}: {sizes.tolist()} recipes")
+        for shard, shard_dir in enumerate(shard_dirs(config)):
+            build_shard(docs[assignment == shard], cache, config.unsharded(), shard_dir)
+        save_index_config(config)
+    else:
+        config = build_shard(docs, cache, config)
+
+    remove_stale_shards(config)
+    save_manifest(docs["recipe_id"].to_numpy(), docs["key"].tolist(), cache.model_name)
+
+    print(f"🎉 Indexed {len(docs)} recipes")
+
+
+def update_shard(
+        shard_docs: pd.DataFrame,
+        stale: List[int],
+        fresh: pd.DataFrame,
+        cache: EmbeddingCache,
+        index_dir: Path = VECTOR_INDEX_PATH,
+) -> bool:
+    """
+    In-place remove / add on one index directory. Returns False when a
+    rebuild of it is the better option.
+    """
+    if max(len(stale), len(fresh)) > REBUILD_FRACTION * max(len(shard_docs), 1):
+        print(f"⚠️ Too many changes for an in-place update of {index_dir.name}")
+        return False
+
+    index, row_recipe_ids = load_index(index_dir, mmap=False)
+    row_of = {int(rid): row for row, rid in enumerate(row_recipe_ids) if rid >= 0}
 
-    vectors = np.array(vectors, dtype="float32")
+    try:
+        if stale:
+            rows = sorted(row_of[rid] for rid in stale if rid in row_of)
+            row_recipe_ids = remove_rows(index, row_recipe_ids, rows)
+        if not fresh.empty:
+            row_recipe_ids = add_rows(
+                index,
+                row_recipe_ids,
+                cache.take(fresh["key"].tolist()),
+                fresh["recipe_id"].to_numpy(),
+            )
+    except (ValueError, RuntimeError) as e:
+        # e.g. index type without remove_ids support
+        print(f"⚠️ In-place update failed: {e}")
+        return False
+
+    _save(index, row_recipe_ids, index_dir)
+    return True
+
+
+def update_index(
+        docs: pd.DataFrame,
+        cache: EmbeddingCache,
+        manifest: Tuple[np.ndarray, List[str]],
+        config: IndexConfig,
+) -> bool:
+    """
+    Remove vectors of deleted/changed recipes and add new/changed ones,
+    touching only the shards they belong to (a shard that cannot be
+    updated in place is rebuilt on its own). Returns False when a full
+    rebuild is the better option.
+    """
+    indexed = dict(zip(manifest[0].tolist(), manifest[1]))
+    current = dict(zip(docs["recipe_id"].tolist(), docs["key"]))
+
+    stale = [rid for rid, key in indexed.items() if current.get(rid) != key]
+    fresh = docs[[indexed.get(rid) != key for rid, key in current.items()]]
+
+    print(f"🔁 {len(fresh)} recipes to add, {len(stale)} to remove")
+    if max(len(stale), len(fresh)) > REBUILD_FRACTION * max(len(docs), 1):
+        print("⚠️ Too many changes for an in-place update")
+        return False
+    if not stale and fresh.empty:
+        print("✅ Index already up to date")
+
+    doc_shard = assign_shards(config, docs["recipe_id"])
+    stale_shard = assign_shards(config, stale)
+    fresh_shard = assign_shards(config, fresh["recipe_id"])
+
+    for shard, shard_dir in enumerate(shard_dirs(config)):
+        shard_docs = docs[doc_shard == shard]
+        shard_stale = [rid for rid, s in zip(stale, stale_shard) if s == shard]
+        shard_fresh = fresh[fresh_shard == shard]
+        changed = bool(shard_stale) or not shard_fresh.empty
+
+        if changed and not update_shard(shard_docs, shard_stale, shard_fresh, cache, shard_dir):
+            if not config.is_sharded:
+                return False
+            print(f"⚠️ Rebuilding {shard_dir.name}")
+            build_shard(shard_docs, cache, config.unsharded(), shard_dir)
+        elif changed or bool(config.rerank) != (shard_dir / RERANK_VECTORS_FILE).exists():
+            write_rerank_vectors(shard_docs, cache, config, shard_dir)
 
-    print("📦 Building FAISS index")
+    save_index_config(config)
+    save_manifest(docs["recipe_id"].to_numpy(), docs["key"].tolist(), cache.model_name)
 
-    vectorstore = FAISS.from_embeddings(
-        text_embeddings=list(zip(texts, vectors)),
-        embedding=embeddings,
-        metadatas=metadatas
+    print(f"🎉 Index holds {len(docs)} recipes")
+    return True
+
+
+def write_rerank_vectors(
+        docs: pd.DataFrame,
+        cache: EmbeddingCache,
+        config: IndexConfig,
+        index_dir: Path = VECTOR_INDEX_PATH,
+):
+    """
+    Full-precision vectors in FAISS row order for exact re-ranking of
+    compressed-index candidates; removed rows are left as zeros.
+    Dropped when re-ranking is off.
+    """
+    path = index_dir / RERANK_VECTORS_FILE
+    if not config.rerank:
+        path.unlink(missing_ok=True)
+        return
+
+    _, row_recipe_ids = load_index(index_dir)
+    key_of = dict(zip(docs["recipe_id"].tolist(), docs["key"]))
+
+    def blocks(block_rows: int = 16_384):
+        for start in range(0, len(row_recipe_ids), block_rows):
+            rids = row_recipe_ids[start:start + block_rows]
+            block = np.zeros((len(rids), cache.dim), dtype=np.float32)
+            live = np.flatnonzero(rids >= 0)
+            if len(live):
+                block[live] = cache.take([key_of[int(rids[i])] for i in live])
+            yield block
+
+    save_rerank_vectors(blocks(), len(row_recipe_ids), cache.dim, index_dir)
+    print(f"🎯 Re-rank vectors: {len(row_recipe_ids)} rows ({path.stat().st_size / 2**20:.1f} MB)")
+
+
+# --------------------------------------------------
+# Lexical (BM25) index for hybrid retrieval
+# --------------------------------------------------
+def rebuild_lexical_index(docs: pd.DataFrame):
+    """
+    Cheap relative to embedding, so it is rebuilt from scratch on every
+    build / update to stay in step with the FAISS index.
+    """
+    start = time.perf_counter()
+    index = build_lexical_index(docs["recipe_id"], docs["document"], docs["name"])
+    save_lexical_index(index)
+    print(
+        f"🔤 BM25 index: {len(index.vocab):,} terms, {len(index.rows):,} postings "
+        f"in {time.perf_counter() - start:.1f}s"
     )
 
-    VECTOR_INDEX_PATH.mkdir(parents=True, exist_ok=True)
 
-    print(f"💾 Saving index to {VECTOR_INDEX_PATH}")
-    vectorstore.save_local(str(VECTOR_INDEX_PATH))
+def build_vectorstore(
+        update: bool = False,
+        workers: Optional[int] = None,
+        threads_per_worker: Optional[int] = None,
+        shard_size: int = SHARD_SIZE,
+        index_config: Optional[IndexConfig] = None,
+        backend: str = "torch",
+):
+    """
+    `index_config=None` keeps the type of the existing index (flat if none).
+    `backend` encodes the documents (see src.retrieval.embedders); int8
+    vectors are cached separately from fp32 ones.
+    """
+    print("🚀 Starting FAISS index build")
+
+    existing_config = load_index_config()
+    if index_config is None:
+        index_config = existing_config
+
+    model_id = embedding_model_id(backend)
+    cache_dir = embedding_cache_dir(backend)
+    docs = load_recipe_documents(model_id)
+    embeddings = make_embeddings(backend)
+
+    cache = EmbeddingCache.load(model_id, cache_dir)
+    embedded = embed_missing(cache, embeddings, docs, workers, threads_per_worker, shard_size, backend)
+
+    # Persist right away so an interrupted index build keeps the vectors
+    n_cached = cache.save(cache_dir, keep=docs["key"])
+    print(f"💾 Embedding cache holds {n_cached} documents")
 
-    print(f"🎉 Indexed {len(texts)} recipes")
+    if embedded:
+        cache = EmbeddingCache.load(model_id, cache_dir)
+        PENDING_VECTORS_PATH.unlink(missing_ok=True)
+
+    if update:
+        manifest = load_manifest(model_id)
+        if manifest is None:
+            print("⚠️ No compatible index to update, rebuilding")
+        elif not index_config.same_structure(existing_config):
+            print(f"⚠️ Index type changed (was {existing_config.describe()}), rebuilding")
+        elif update_index(docs, cache, manifest, existing_config.with_search_params(
+            nprobe=index_config.nprobe,
+            ef_search=index_config.ef_search,
+            rerank=index_config.rerank,
+        )):
+            rebuild_lexical_index(docs)
+            return
+
+    rebuild_index(docs, cache, index_config)
+    rebuild_lexical_index(docs)
 
 # --------------------------------------------------
 # Entry point
 # --------------------------------------------------
 if __name__ == "__main__":
-    build_vectorstore()
+    parser = argparse.ArgumentParser(description="Build the FAISS recipe index")
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Only embed and re-index new/changed recipes (falls back to a full rebuild)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Embedding processes (1 = in-process on the default device; "
+             "default 1 with an accelerator, else half the cores)",
+    )
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument(
+        "--backend",
+        choices=EMBEDDING_BACKENDS,
+        default="torch",
+        help="Document encoder (onnx / onnx-int8 need export_onnx_encoder)",
+    )
+
+    # Index type (omit --index-type to keep the current one). The knobs
+    # below default to None = "not given": with --index-type, unset ones
+    # take the IndexConfig defaults; without it, given ones override the
+    # existing index's config (a structural change rebuilds).
+    defaults = IndexConfig()
+    parser.add_argument("--index-type", choices=INDEX_KINDS, default=None)
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4*sqrt(n))")
+    parser.add_argument("--nprobe", type=int, default=None, help=f"default {defaults.nprobe}")
+    parser.add_argument("--hnsw-m", type=int, default=None, help=f"default {defaults.hnsw_m}")
+    parser.add_argument("--ef-construction", type=int, default=None, help=f"default {defaults.ef_construction}")
+    parser.add_argument("--ef-search", type=int, default=None, help=f"default {defaults.ef_search}")
+    parser.add_argument(
+        "--pq-m",
+        type=int,
+        default=None,
+        help=f"ivfpq sub-vectors, must divide the dimension (default {defaults.pq_m})",
+    )
+    parser.add_argument("--pq-nbits", type=int, default=None, help=f"default {defaults.pq_nbits}")
+    parser.add_argument(
+        "--rerank",
+        type=int,
+        default=None,
+        help="Re-rank k * N candidates exactly from full-precision vectors (0 = off, the default)",
+    )
+    parser.add_argument("--shards", type=int, default=None, help=f"Independent index shards (default {defaults.shards})")
+    parser.add_argument("--shard-by", choices=SHARD_STRATEGIES, default=None, help=f"default {defaults.shard_by}")
+    args = parser.parse_args()
+
+    overrides = {
+        name: value
+        for name, value in (
+            ("nlist", args.nlist),
+            ("nprobe", args.nprobe),
+            ("hnsw_m", args.hnsw_m),
+            ("ef_construction", args.ef_construction),
+            ("ef_search", args.ef_search),
+            ("pq_m", args.pq_m),
+            ("pq_nbits", args.pq_nbits),
+            ("rerank", args.rerank),
+            ("shards", args.shards),
+            ("shard_by", args.shard_by),
+        )
+        if value is not None
+    }
+
+    index_config = None
+    if args.index_type:
+        index_config = IndexConfig(kind=args.index_type, **overrides)
+    elif overrides:
+        if "shards" in overrides or "shard_by" in overrides:
+            # Range bounds belong to the old layout; picked again at build
+            overrides["shard_bounds"] = None
+        index_config = replace(load_index_config(), **overrides)
+
+    build_vectorstore(
+        update=args.update,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        shard_size=args.shard_size,
+        index_config=index_config,
+        backend=args.backend,
+    )
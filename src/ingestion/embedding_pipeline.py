@@ -0,0 +1,149 @@
+# src/ingestion/embedding_pipeline.py
+#
+# Sharded multi-process document embedding. Each worker process owns one
+# model instance pinned to a fixed number of threads and writes its
+# shard's vectors straight into a shared memory-mapped float32 matrix, so
+# the parent never holds Python lists of vectors.
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+from src.retrieval.embedders import ENCODE_BATCH_SIZE, make_embedder
+
+SHARD_SIZE = 1024
+
+
+def torch_device() -> str:
+    """Device the in-process torch encoder runs on."""
+    import torch
+
+    return "mps" if torch.backends.mps.is_available() else "cpu"
+
+
+def default_embed_workers(backend: str = "torch") -> int:
+    """
+    Half the cores, or 1 (in-process) when the torch encoder has an
+    accelerator: spawned workers always encode on CPU.
+    """
+    if backend == "torch" and torch_device() != "cpu":
+        return 1
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def default_threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+# --------------------------------------------------
+# Worker side
+# --------------------------------------------------
+_WORKER_EMBEDDINGS = None
+
+
+def _init_worker(backend: str, threads: int):
+    global _WORKER_EMBEDDINGS
+    if backend == "torch":
+        import torch
+
+        torch.set_num_threads(threads)
+    _WORKER_EMBEDDINGS = make_embedder(backend, device="cpu", threads=threads)
+
+
+def _write_shard(embed: Callable, out_path: str, start: int, texts: List[str]) -> Tuple[int, float]:
+    t = time.perf_counter()
+    out = np.load(out_path, mmap_mode="r+")
+    for i in range(0, len(texts), ENCODE_BATCH_SIZE):
+        batch = texts[i:i + ENCODE_BATCH_SIZE]
+        out[start + i:start + i + len(batch)] = np.asarray(embed(batch), dtype=np.float32)
+    out.flush()
+    return len(texts), time.perf_counter() - t
+
+
+def _embed_shard(out_path: str, start: int, texts: List[str]) -> Tuple[int, float]:
+    return _write_shard(_WORKER_EMBEDDINGS.embed_documents, out_path, start, texts)
+
+
+# --------------------------------------------------
+# Parent side
+# --------------------------------------------------
+def embed_to_memmap(
+        texts: Sequence[str],
+        out_path: Path,
+        dim: int,
+        workers: Optional[int] = None,
+        threads_per_worker: Optional[int] = None,
+        shard_size: int = SHARD_SIZE,
+        embed: Optional[Callable] = None,
+        backend: str = "torch",
+) -> np.ndarray:
+    """
+    Embed `texts` into a new (len(texts), dim) float32 .npy memmap at
+    `out_path` and return it opened read-only.
+
+    `workers=None` picks default_embed_workers(backend). With
+    workers <= 1 the shards run in-process through `embed` (the
+    caller's model, on whatever device it uses). Otherwise shards are
+    fanned out to `workers` spawned CPU processes, each running its
+    own `backend` encoder (see src.retrieval.embedders), with at most
+    2 * workers shards in flight to bound memory.
+    """
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float32, shape=(len(texts), dim))
+    del out
+
+    if workers is None:
+        workers = default_embed_workers(backend)
+    threads = threads_per_worker or default_threads_per_worker(workers)
+    shards = [(s, list(texts[s:s + shard_size])) for s in range(0, len(texts), shard_size)]
+
+    start = time.perf_counter()
+    worker_secs = 0.0
+    progress = tqdm(total=len(texts), unit=" docs", desc="Embedding")
+
+    if workers <= 1:
+        if embed is None:
+            embed = make_embedder(backend, device="cpu").embed_documents
+        for s, shard in shards:
+            n, secs = _write_shard(embed, str(out_path), s, shard)
+            worker_secs += secs
+            progress.update(n)
+    else:
+        print(f"🧵 {workers} embedding workers x {threads} threads")
+        ctx = multiprocessing.get_context("spawn")   # never fork a process holding torch threads
+
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(backend, threads),
+        ) as pool:
+            pending = deque()
+            for s, shard in shards:
+                pending.append(pool.submit(_embed_shard, str(out_path), s, shard))
+                if len(pending) >= 2 * workers:
+                    n, secs = pending.popleft().result()
+                    worker_secs += secs
+                    progress.update(n)
+            while pending:
+                n, secs = pending.popleft().result()
+                worker_secs += secs
+                progress.update(n)
+
+    progress.close()
+
+    elapsed = time.perf_counter() - start
+    if texts:
+        print(
+            f"📐 Embedded {len(texts)} docs in {elapsed:.1f}s "
+            f"({len(texts) / elapsed:,.0f} docs/s, {worker_secs:.1f} worker-s)"
+        )
+
+    return np.load(out_path, mmap_mode="r")
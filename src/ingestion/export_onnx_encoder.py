@@ -0,0 +1,122 @@
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+from src.config.settings import EMBEDDING_MODEL, ONNX_ENCODER_DIR
+from src.retrieval.embedders import (
+    ENCODER_META_FILE,
+    MAX_SEQ_LENGTH,
+    ONNX_MODEL_FILES,
+    TOKENIZER_FILE,
+)
+
+ONNX_OPSET = 17
+
+
+# --------------------------------------------------
+# Export (needs torch + transformers, build machines only)
+# --------------------------------------------------
+def _export_fp32(model_name: str, out_dir: Path, opset: int) -> Path:
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    print(f"📤 Exporting {model_name} to ONNX (opset {opset})")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    # tokenizer.json is all the serving side needs (tokenizers library)
+    tokenizer.backend_tokenizer.save(str(out_dir / TOKENIZER_FILE))
+
+    sample = tokenizer(
+        ["a sample recipe document", "another one"],
+        padding=True,
+        return_tensors="pt",
+    )
+    inputs = ("input_ids", "attention_mask", "token_type_ids")
+    dynamic = {"batch": 0, "sequence": 1}
+
+    path = out_dir / ONNX_MODEL_FILES["onnx"]
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in inputs),
+            str(path),
+            input_names=list(inputs),
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                name: {axis: label for label, axis in dynamic.items()}
+                for name in (*inputs, "last_hidden_state")
+            },
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    return path
+
+
+def _quantize_int8(fp32_path: Path, out_dir: Path) -> Path:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print("🗜️ Quantizing weights to int8 (dynamic)")
+    path = out_dir / ONNX_MODEL_FILES["onnx-int8"]
+    quantize_dynamic(
+        str(fp32_path),
+        str(path),
+        weight_type=QuantType.QInt8,
+    )
+    return path
+
+
+def export_onnx_encoder(
+        model_name: str = EMBEDDING_MODEL,
+        out_dir: Path = ONNX_ENCODER_DIR,
+        opset: int = ONNX_OPSET,
+        quantize: bool = True,
+):
+    """
+    Write model.onnx (+ model.int8.onnx), tokenizer.json and encoder.json
+    into `out_dir`. Files are staged in a temporary directory and swapped
+    in, so a running retriever never sees a half-written model.
+    """
+    start = time.perf_counter()
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    fp32 = _export_fp32(model_name, tmp_dir, opset)
+    files = [fp32]
+    if quantize:
+        files.append(_quantize_int8(fp32, tmp_dir))
+
+    (tmp_dir / ENCODER_META_FILE).write_text(json.dumps({
+        "model": model_name,
+        "opset": opset,
+        "max_seq_length": MAX_SEQ_LENGTH,
+        "files": [f.name for f in files],
+    }, indent=2))
+
+    old_dir = out_dir.with_name(out_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if out_dir.exists():
+        out_dir.rename(old_dir)
+    tmp_dir.rename(out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    for f in files:
+        size_mb = (out_dir / f.name).stat().st_size / 2**20
+        print(f"💾 {out_dir / f.name} ({size_mb:.1f} MB)")
+    print(f"✅ Export done in {time.perf_counter() - start:.1f}s")
+
+
+# --------------------------------------------------
+# Entry point
+# --------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (fp32 + int8)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--opset", type=int, default=ONNX_OPSET)
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 model")
+    args = parser.parse_args()
+
+    export_onnx_encoder(model_name=args.model, opset=args.opset, quantize=not args.no_quantize)
@@ -17,7 +17,11 @@ CREATE TABLE IF NOT EXISTS recipes (
   steps_json TEXT,
   ingredients_json TEXT,
   tags_json TEXT,
-  document TEXT
+  document TEXT,
+
+  -- Incremental-build bookkeeping (not part of the served row)
+  source_key TEXT,
+  row_hash TEXT
 );
 
 CREATE TABLE IF NOT EXISTS recipe_ingredients (
@@ -32,6 +36,59 @@ CREATE TABLE IF NOT EXISTS recipe_tags (
   PRIMARY KEY (recipe_id, tag)
 );
 
+-- Survives rebuilds; holds dataset_version for downstream cache invalidation
+CREATE TABLE IF NOT EXISTS dataset_meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+
+-- One row per build; incremental builds also log changed recipe_ids
+CREATE TABLE IF NOT EXISTS dataset_versions (
+  version TEXT PRIMARY KEY,
+  parent_version TEXT,
+  mode TEXT,
+  built_at TEXT,
+  n_recipes INTEGER,
+  n_added INTEGER,
+  n_updated INTEGER,
+  n_deleted INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS dataset_changes (
+  version TEXT,
+  recipe_id INTEGER,
+  change TEXT,
+  PRIMARY KEY (version, recipe_id)
+);
+
 CREATE INDEX IF NOT EXISTS idx_recipe_name ON recipes(name);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_recipe_source_key ON recipes(source_key);
 CREATE INDEX IF NOT EXISTS idx_ingredient ON recipe_ingredients(ingredient);
 CREATE INDEX IF NOT EXISTS idx_tag ON recipe_tags(tag);
+
+-- --------------------------------------------------
+-- Full-text search (external content over recipes)
+-- --------------------------------------------------
+-- Recipe names only (ranked name resolution); ingredient matching is
+-- served by the in-memory posting lists (src/db/ingredient_index.py)
+
+CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+  name,
+  content='recipes',
+  content_rowid='recipe_id',
+  tokenize='unicode61 remove_diacritics 2',
+  prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+  INSERT INTO recipes_fts(rowid, name) VALUES (new.recipe_id, new.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+  INSERT INTO recipes_fts(recipes_fts, rowid, name) VALUES ('delete', old.recipe_id, old.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipes_fts_au AFTER UPDATE OF name ON recipes BEGIN
+  INSERT INTO recipes_fts(recipes_fts, rowid, name) VALUES ('delete', old.recipe_id, old.name);
+  INSERT INTO recipes_fts(rowid, name) VALUES (new.recipe_id, new.name);
+END;
@@ -0,0 +1,72 @@
+# src/retrieval/diversity.py
+#
+# Maximal marginal relevance (MMR): pick k of n candidates, each step
+# taking the one that maximizes
+#     lambda * sim(query, c) - (1 - lambda) * max sim(c, already picked)
+# so near-duplicates of earlier picks drop down the list. sim(query, c)
+# is cosine unless the caller passes its own relevance (e.g. a fused
+# BM25 + vector rank).
+# Candidate-candidate similarities are one batched matmul; the greedy
+# steps (k of them) are vectorized over candidates and queries.
+
+from typing import Optional
+
+import numpy as np
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+
+def mmr_select(
+        queries: np.ndarray,
+        candidates: np.ndarray,
+        k: int,
+        lambda_: float = 0.7,
+        valid: Optional[np.ndarray] = None,
+        relevance: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    MMR order for a batch of queries.
+
+    Args:
+        queries: (q, d) query vectors
+        candidates: (q, n, d) candidate vectors per query, in relevance order
+        k: picks per query
+        lambda_: 1.0 = pure relevance, 0.0 = pure diversity
+        valid: (q, n) bool, False for padding slots
+        relevance: (q, n) query-candidate relevance in [0, 1] to use
+            instead of cosine similarity
+
+    Returns:
+        (q, min(k, n)) candidate positions, -1 where a query ran out
+    """
+    if not 0.0 <= lambda_ <= 1.0:
+        raise ValueError(f"MMR lambda must be in [0, 1], got {lambda_}")
+    n_queries, n = candidates.shape[:2]
+    k = min(k, n)
+    if valid is None:
+        valid = np.ones((n_queries, n), dtype=bool)
+
+    c = _unit(np.asarray(candidates, dtype=np.float32))
+    q = _unit(np.asarray(queries, dtype=np.float32))
+    if relevance is None:
+        relevance = np.einsum("qnd,qd->qn", c, q)      # (q, n)
+    pairwise = c @ c.transpose(0, 2, 1)                 # (q, n, n)
+
+    # No picks yet: the redundancy term starts at 0
+    redundancy = np.zeros((n_queries, n), dtype=np.float32)
+    available = valid.copy()
+    picks = np.full((n_queries, k), -1, dtype=np.int64)
+    batch = np.arange(n_queries)
+
+    for step in range(k):
+        score = lambda_ * relevance - (1.0 - lambda_) * redundancy
+        score[~available] = -np.inf
+        best = score.argmax(axis=1)
+        ok = available[batch, best]
+        picks[ok, step] = best[ok]
+        available[batch[ok], best[ok]] = False
+        redundancy = np.maximum(redundancy, pairwise[batch, best])
+
+    return picks
@@ -0,0 +1,167 @@
+# src/retrieval/embedders.py
+#
+# Text encoders behind one interface (LangChain's Embeddings:
+# embed_documents / embed_query), selected by backend name:
+#   torch      sentence-transformers via HuggingFaceEmbeddings (reference)
+#   onnx       the same model exported to ONNX, run on ONNX Runtime
+#   onnx-int8  the ONNX graph with dynamically quantized int8 weights
+# The ONNX backends never import torch. Export them once with
+#   python -m src.ingestion.export_onnx_encoder
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.config.settings import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_MODEL,
+    ONNX_ENCODER_DIR,
+)
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Files written by export_onnx_encoder into ONNX_ENCODER_DIR
+ONNX_MODEL_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+TOKENIZER_FILE = "tokenizer.json"
+ENCODER_META_FILE = "encoder.json"
+
+# sentence-transformers truncates all-MiniLM-L6-v2 inputs at 256 tokens
+MAX_SEQ_LENGTH = 256
+ENCODE_BATCH_SIZE = 64
+
+
+def embedding_model_id(backend: str) -> str:
+    """
+    Namespace for cached document vectors. fp32 ONNX reproduces the torch
+    vectors (to ~1e-6), int8 does not, so int8 vectors get their own.
+    """
+    return f"{EMBEDDING_MODEL}+int8" if backend == "onnx-int8" else EMBEDDING_MODEL
+
+
+def embedding_cache_dir(backend: str) -> Path:
+    """
+    int8 vectors live in their own cache directory, so switching the
+    build backend back and forth never throws the other cache away.
+    """
+    if backend == "onnx-int8":
+        return EMBEDDING_CACHE_DIR.with_name(EMBEDDING_CACHE_DIR.name + ".int8")
+    return EMBEDDING_CACHE_DIR
+
+
+# --------------------------------------------------
+# ONNX Runtime encoder
+# --------------------------------------------------
+class OnnxEmbedder(Embeddings):
+    """
+    Mean-pooled, L2-normalized sentence embeddings from an exported
+    transformer graph (the same pipeline as the sentence-transformers
+    model: token embeddings -> mean over the attention mask -> normalize).
+    """
+
+    def __init__(
+            self,
+            model_path: Path,
+            tokenizer_path: Path,
+            threads: Optional[int] = None,
+            batch_size: int = ENCODE_BATCH_SIZE,
+            max_length: int = MAX_SEQ_LENGTH,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), dim) float32, unit-norm rows."""
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[i:i + self.batch_size]))
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": mask,
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            out.append(pooled.astype(np.float32))
+
+        if not out:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(out)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+# --------------------------------------------------
+# Factory
+# --------------------------------------------------
+def make_embedder(
+        backend: str = EMBEDDING_BACKEND,
+        device: Optional[str] = None,
+        batch_size: int = ENCODE_BATCH_SIZE,
+        threads: Optional[int] = None,
+        model_dir: Path = ONNX_ENCODER_DIR,
+) -> Embeddings:
+    """
+    Encoder for `backend`. `device` only applies to torch (None lets
+    sentence-transformers pick); `threads` only to ONNX Runtime (torch
+    threads are set process-wide).
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (expected one of {EMBEDDING_BACKENDS})")
+
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            model_kwargs={"device": device} if device else {},
+            encode_kwargs={
+                "batch_size": batch_size,
+                "normalize_embeddings": True
+            }
+        )
+
+    model_path = model_dir / ONNX_MODEL_FILES[backend]
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"{model_path} not found - run `python -m src.ingestion.export_onnx_encoder` first"
+        )
+
+    meta_path = model_dir / ENCODER_META_FILE
+    if meta_path.exists():
+        exported = json.loads(meta_path.read_text()).get("model")
+        if exported != EMBEDDING_MODEL:
+            raise ValueError(f"ONNX encoder was exported from '{exported}', expected '{EMBEDDING_MODEL}'")
+
+    return OnnxEmbedder(model_path, model_dir / TOKENIZER_FILE, threads=threads, batch_size=batch_size)
@@ -0,0 +1,163 @@
+# src/retrieval/embedding_cache.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from src.config.settings import EMBEDDING_CACHE_DIR
+
+
+def document_key(model_name: str, document: Optional[str]) -> str:
+    """
+    Cache key of one document embedding: hash of the model name and text,
+    so switching models never serves stale vectors.
+    """
+    payload = f"{model_name}\0{document or ''}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk document embeddings keyed by `document_key`.
+
+    Layout (one directory):
+        vectors.npy   float32, (n, dim)
+        keys.npy      S32 hex keys, row i <-> vectors[i]
+        meta.json     model name, dim, count
+
+    Rows live in segments (the mapped file plus any matrices added with
+    `put`, which may themselves be memmaps), so large caches are never
+    concatenated in memory.
+    """
+
+    def __init__(self, model_name: str, keys: Sequence[str] = (), vectors: Optional[np.ndarray] = None):
+        self.model_name = model_name
+        self._keys: List[str] = list(keys)
+        self._rows: Dict[str, int] = {k: i for i, k in enumerate(self._keys)}
+        self._segments: List[np.ndarray] = []
+        self._starts: List[int] = []
+        if vectors is not None and len(vectors):
+            self._add_segment(vectors)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def keys(self) -> List[str]:
+        return self._keys
+
+    @property
+    def dim(self) -> Optional[int]:
+        return int(self._segments[0].shape[1]) if self._segments else None
+
+    def _add_segment(self, vectors: np.ndarray) -> None:
+        self._starts.append(sum(len(seg) for seg in self._segments))
+        self._segments.append(vectors)
+
+    # ----------------------------
+    # Lookup / fill
+    # ----------------------------
+
+    def missing(self, keys: Sequence[str]) -> List[int]:
+        """Positions in `keys` that have no cached vector."""
+        return [i for i, k in enumerate(keys) if k not in self._rows]
+
+    def put(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Append vectors for new keys. `vectors` is kept by reference
+        (a memmap stays on disk until `save`).
+        """
+        if len(keys) != len(vectors):
+            raise ValueError("keys and vectors must have the same length")
+        if vectors.dtype != np.float32:
+            vectors = vectors.astype(np.float32)
+        for k in keys:
+            if k in self._rows:
+                raise ValueError(f"Embedding already cached for key {k}")
+            self._rows[k] = len(self._keys)
+            self._keys.append(k)
+        if len(keys):
+            self._add_segment(vectors)
+
+    def take(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        Vectors for `keys` in order (all must be cached).
+        """
+        rows = np.fromiter((self._rows[k] for k in keys), dtype=np.int64, count=len(keys))
+        out = np.empty((len(rows), self.dim or 0), dtype=np.float32)
+        for start, seg in zip(self._starts, self._segments):
+            local = rows - start
+            hit = (local >= 0) & (local < len(seg))
+            if hit.any():
+                out[hit] = seg[local[hit]]
+        return out
+
+    def iter_blocks(self, keys: Sequence[str], block_rows: int = 16_384) -> Iterator[np.ndarray]:
+        """`take(keys)` in blocks, for consumers that must bound memory."""
+        for i in range(0, len(keys), block_rows):
+            yield self.take(keys[i:i + block_rows])
+
+    # ----------------------------
+    # Persist / load
+    # ----------------------------
+
+    def save(self, directory: Path = EMBEDDING_CACHE_DIR, keep: Optional[Iterable[str]] = None) -> int:
+        """
+        Write the cache, optionally compacted to `keep` (the keys still in
+        use), via a temporary directory swap. Returns the entries written.
+        """
+        keys = self._keys if keep is None else list(dict.fromkeys(keep))
+
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        out = np.lib.format.open_memmap(
+            tmp_dir / "vectors.npy", mode="w+", dtype=np.float32, shape=(len(keys), self.dim or 0)
+        )
+        row = 0
+        for block in self.iter_blocks(keys):
+            out[row:row + len(block)] = block
+            row += len(block)
+        out.flush()
+        del out
+
+        np.save(tmp_dir / "keys.npy", np.array(keys, dtype="S32"))
+        (tmp_dir / "meta.json").write_text(json.dumps({
+            "model": self.model_name,
+            "dim": self.dim,
+            "count": len(keys),
+        }))
+
+        old_dir = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if directory.exists():
+            directory.rename(old_dir)
+        tmp_dir.rename(directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        return len(keys)
+
+    @classmethod
+    def load(cls, model_name: str, directory: Path = EMBEDDING_CACHE_DIR) -> "EmbeddingCache":
+        """
+        Load the cache for `model_name`; empty if missing or built for
+        another model.
+        """
+        meta_path = directory / "meta.json"
+        if not meta_path.exists():
+            return cls(model_name)
+
+        meta = json.loads(meta_path.read_text())
+        if meta.get("model") != model_name or not meta.get("count"):
+            return cls(model_name)
+
+        keys = np.load(directory / "keys.npy").astype(str).tolist()
+        vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+        return cls(model_name, keys=keys, vectors=vectors)
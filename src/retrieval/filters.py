@@ -0,0 +1,97 @@
+# src/retrieval/filters.py
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from src.db.ingredient_index import get_ingredient_index
+from src.db.nutrition_store import get_nutrition_store
+from src.db.recipes import get_recipe_ids_in_ranges, get_recipe_ids_with_tags
+
+Range = Tuple[Optional[float], Optional[float]]
+
+
+def _terms(values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    return tuple(sorted({v.strip().lower() for v in values or [] if v and v.strip()}))
+
+
+def _range(value: Optional[Range]) -> Optional[Range]:
+    if value is None:
+        return None
+    low, high = value
+    return None if low is None and high is None else (low, high)
+
+
+def _dense(recipe_ids: np.ndarray, size: int) -> np.ndarray:
+    mask = np.zeros(size, dtype=bool)
+    recipe_ids = recipe_ids[recipe_ids < size]
+    mask[recipe_ids] = True
+    return mask
+
+
+@dataclass(frozen=True)
+class RecipeFilters:
+    """
+    Hard constraints applied inside vector search.
+
+    exclude:  banned ingredients (exact match, same as exclude_ingredients)
+    tags:     required tags (recipe must carry all of them)
+    calories / minutes: inclusive (low, high) ranges, None = open
+    """
+    exclude: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+    calories: Optional[Range] = None
+    minutes: Optional[Range] = None
+
+    @classmethod
+    def build(
+            cls,
+            exclude: Optional[Iterable[str]] = None,
+            tags: Optional[Iterable[str]] = None,
+            calories: Optional[Range] = None,
+            minutes: Optional[Range] = None,
+    ) -> "RecipeFilters":
+        """Normalized filters (usable as a cache key)."""
+        return cls(
+            exclude=_terms(exclude),
+            tags=_terms(tags),
+            calories=_range(calories),
+            minutes=_range(minutes),
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.exclude or self.tags or self.ranges())
+
+    def ranges(self) -> Dict[str, Range]:
+        return {
+            col: value
+            for col, value in (("calories", self.calories), ("minutes", self.minutes))
+            if value is not None
+        }
+
+    def recipe_mask(self, size: int) -> np.ndarray:
+        """
+        Dense bool mask over recipe_id 0..size-1, True where allowed.
+        Uses the ingredient index, recipe_tags and the nutrition store
+        (SQL when the store has not been built).
+        """
+        mask = np.ones(size, dtype=bool)
+
+        if self.exclude:
+            banned = get_ingredient_index().match_any(list(self.exclude))
+            mask &= ~_dense(banned, size)
+
+        if self.tags:
+            mask &= _dense(get_recipe_ids_with_tags(list(self.tags)), size)
+
+        ranges = self.ranges()
+        if ranges:
+            store = get_nutrition_store()
+            ids = store.filter(**ranges) if store is not None else get_recipe_ids_in_ranges(**ranges)
+            mask &= _dense(ids, size)
+
+        return mask
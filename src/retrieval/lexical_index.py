@@ -0,0 +1,230 @@
+# src/retrieval/lexical_index.py
+
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.config.settings import VECTOR_INDEX_PATH
+
+# Persisted next to index.faiss / index_config.json
+LEXICAL_INDEX_FILE = "lexical_index.npz"
+
+# Standard Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no signal in recipe queries / documents
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "some", "something",
+    "that", "the", "this", "to", "want", "with", "ingredients", "tags",
+    "recipe", "recipes", "idea", "ideas",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+# ==================================================
+# BM25 posting lists
+# ==================================================
+
+@dataclass(frozen=True)
+class LexicalIndex:
+    """
+    BM25 index over recipe documents in CSR layout.
+
+    The postings of `vocab[i]` are rows `rows[offsets[i]:offsets[i + 1]]`
+    with their precomputed BM25 term weights in `weights`, so scoring a
+    query is a gather + bincount. Row r is recipe `recipe_ids[r]`.
+    """
+    vocab: np.ndarray        # sorted unique terms (unicode)
+    offsets: np.ndarray      # int64, len(vocab) + 1
+    rows: np.ndarray         # int32 document rows
+    weights: np.ndarray      # float32 idf * saturated tf
+    recipe_ids: np.ndarray   # int64, row -> recipe_id
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def _term(self, term: str) -> int:
+        i = int(np.searchsorted(self.vocab, term))
+        return i if i < len(self.vocab) and self.vocab[i] == term else -1
+
+    def row_mask(self, recipe_mask: np.ndarray) -> np.ndarray:
+        """
+        Bool per row from a bool mask over recipe_id (ids past its end are
+        excluded); computed once per filter set and reused across queries.
+        """
+        ids = self.recipe_ids
+        inside = ids < len(recipe_mask)
+        out = np.zeros(len(ids), dtype=bool)
+        out[inside] = recipe_mask[ids[inside]]
+        return out
+
+    def search(
+            self,
+            query: str,
+            k: int,
+            row_mask: Optional[np.ndarray] = None,
+    ) -> List[int]:
+        """
+        Top-k recipe_ids by BM25 score (best first, ties by recipe_id).
+        Repeated query terms count once; rows outside `row_mask` are skipped.
+        """
+        spans = [
+            (self.offsets[i], self.offsets[i + 1])
+            for i in map(self._term, dict.fromkeys(tokenize(query)))
+            if i >= 0
+        ]
+        if not spans:
+            return []
+
+        if len(spans) == 1:
+            # Single term: the postings already are the scores
+            lo, hi = spans[0]
+            rows, scores = self.rows[lo:hi], self.weights[lo:hi]
+            if row_mask is not None:
+                keep = row_mask[rows]
+                rows, scores = rows[keep], scores[keep]
+            if len(rows) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+        else:
+            # Accumulate into a dense score vector (cheaper than a sparse
+            # merge once common terms are involved)
+            dense = np.bincount(
+                np.concatenate([self.rows[lo:hi] for lo, hi in spans]),
+                weights=np.concatenate([self.weights[lo:hi] for lo, hi in spans]),
+                minlength=len(self),
+            )
+            if row_mask is not None:
+                np.multiply(dense, row_mask, out=dense)
+            rows = np.argpartition(-dense, k - 1)[:k] if len(dense) > k else np.arange(len(dense))
+            rows = rows[dense[rows] > 0]
+            scores = dense[rows]
+
+        ids = self.recipe_ids[rows]
+        return ids[np.lexsort((ids, -scores))].tolist()
+
+
+def reciprocal_rank_fusion(
+        rankings: Sequence[Sequence[int]],
+        k: int,
+        rrf_k: int = 60,
+) -> List[int]:
+    """
+    Merge ranked id lists by sum(1 / (rrf_k + rank)), rank starting at 1.
+    Ties keep first-seen order (the first ranking wins).
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, rid in enumerate(ranking, start=1):
+            fused[rid] = fused.get(rid, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused, key=fused.__getitem__, reverse=True)[:k]
+
+
+# ==================================================
+# Build / persist
+# ==================================================
+
+def build_lexical_index(
+        recipe_ids: Iterable[int],
+        documents: Iterable[str],
+        names: Optional[Iterable[str]] = None,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+) -> LexicalIndex:
+    """
+    Index `documents` (one per recipe). Name tokens are added to the
+    document once more, which doubles their term frequency (a cheap
+    name-field boost for dish-name queries).
+    """
+    recipe_ids = np.fromiter(recipe_ids, dtype=np.int64)
+    documents = list(documents)
+    names = list(names) if names is not None else [""] * len(documents)
+
+    term_ids: Dict[str, int] = {}
+    post_terms: List[int] = []
+    post_rows: List[int] = []
+    post_tfs: List[int] = []
+    doc_len = np.zeros(len(documents), dtype=np.float32)
+
+    for row, (name, document) in enumerate(zip(names, documents)):
+        tokens = tokenize(name) + tokenize(document)
+        doc_len[row] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            post_terms.append(term_ids.setdefault(term, len(term_ids)))
+            post_rows.append(row)
+            post_tfs.append(tf)
+
+    terms = np.array(post_terms, dtype=np.int64)
+    rows = np.array(post_rows, dtype=np.int32)
+    tfs = np.array(post_tfs, dtype=np.float32)
+
+    # Renumber terms alphabetically so lookups can use searchsorted
+    words = np.array(list(term_ids), dtype=str)
+    alpha = np.argsort(words)
+    rank = np.empty_like(alpha)
+    rank[alpha] = np.arange(len(alpha))
+    terms = rank[terms]
+
+    order = np.lexsort((rows, terms))
+    terms, rows, tfs = terms[order], rows[order], tfs[order]
+    df = np.bincount(terms, minlength=len(words))
+    offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+    n = max(len(documents), 1)
+    avg_len = float(doc_len.mean()) if len(doc_len) else 1.0
+    idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+    norm = k1 * (1.0 - b + b * doc_len[rows] / max(avg_len, 1.0))
+    weights = idf[terms] * tfs * (k1 + 1.0) / (tfs + norm)
+
+    return LexicalIndex(
+        vocab=words[alpha],
+        offsets=offsets,
+        rows=rows,
+        weights=weights.astype(np.float32),
+        recipe_ids=recipe_ids,
+    )
+
+
+def save_lexical_index(index: LexicalIndex, index_dir: Path = VECTOR_INDEX_PATH) -> None:
+    """
+    Write via a temp file renamed into place, so a loading reader never
+    sees a partially written archive.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    tmp = index_dir / (LEXICAL_INDEX_FILE + ".tmp")
+    # Through a file handle: np.savez would append ".npz" to the temp name
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            vocab=index.vocab,
+            offsets=index.offsets,
+            rows=index.rows,
+            weights=index.weights,
+            recipe_ids=index.recipe_ids,
+        )
+    os.replace(tmp, index_dir / LEXICAL_INDEX_FILE)
+
+
+def load_lexical_index(index_dir: Path = VECTOR_INDEX_PATH) -> Optional[LexicalIndex]:
+    """
+    Persisted index, or None for vector indexes built before it existed.
+    """
+    path = index_dir / LEXICAL_INDEX_FILE
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        return LexicalIndex(**{name: data[name] for name in data.files})
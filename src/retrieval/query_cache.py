@@ -0,0 +1,92 @@
+# src/retrieval/query_cache.py
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key form of a query: trimmed, whitespace-collapsed, lowercased
+    (the MiniLM tokenizer is uncased, so case never changes the vector).
+    """
+    return _WS.sub(" ", (query or "").strip()).lower()
+
+
+class QueryCache:
+    """
+    Bounded, thread-safe LRU with an optional per-entry TTL and
+    dataset-version invalidation (same contract as RecipeCache).
+    """
+
+    def __init__(self, max_entries: int, ttl_s: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        """Cached value or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_s is not None and now - entry[0] > self.ttl_s:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def check_version(self, version: Optional[str]) -> None:
+        """Drop everything if the dataset version changed since the last check."""
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
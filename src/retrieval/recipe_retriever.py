@@ -1,13 +1,34 @@
 from __future__ import annotations
 
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+import faiss
+import numpy as np
 
-from src.config.settings import VECTOR_INDEX_PATH
-from src.db.recipes import get_recipes_by_ids, exclude_ingredients
+from src.config.settings import (
+    EMBEDDING_BACKEND,
+    HYBRID_CANDIDATES,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    RERANK_MAX_CANDIDATES,
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_TTL_S,
+    RRF_K,
+)
+from src.db.meta import current_dataset_version
+from src.db.recipes import Fields, get_recipes_by_ids
+from src.retrieval.diversity import mmr_select
+from src.retrieval.filters import Range, RecipeFilters
+from src.retrieval.lexical_index import LexicalIndex, load_lexical_index, reciprocal_rank_fusion
+from src.retrieval.query_cache import QueryCache, normalize_query
+from src.retrieval.sharded_index import ShardedIndex, load_sharded_index
+from src.retrieval.vector_index import IndexConfig, load_index_config
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
 
 
 @dataclass(frozen=True)
@@ -17,19 +38,413 @@ class RetrievalResult:
 
 
 # --------------------------------------------------
-# Load embeddings + FAISS index (module-level cache)
+# Embeddings + FAISS index (lazy, process-wide)
 # --------------------------------------------------
+# Loaded on first search (or by warmup()), not at import, so importing the
+# tools package stays cheap for CLIs and scripts that never search.
 
-_EMBEDDINGS = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",
-    encode_kwargs={"normalize_embeddings": True},
-)
+_EMBEDDINGS: Optional["Embeddings"] = None
+_INDEX: Optional[ShardedIndex] = None          # one or more FAISS shards
+_INDEX_CONFIG: Optional[IndexConfig] = None
+_ROW_RECIPE_IDS: Optional[np.ndarray] = None   # global row -> recipe_id (-1 = removed)
+_LEXICAL: Optional[LexicalIndex] = None         # BM25 side of hybrid retrieval
+_LOAD_LOCK = threading.Lock()
 
-_VECTORSTORE = FAISS.load_local(
-    str(VECTOR_INDEX_PATH),
-    _EMBEDDINGS,
-    allow_dangerous_deserialization=True,
-)
+# Startup phase -> seconds, in the order they ran
+_STARTUP_TIMINGS: Dict[str, float] = {}
+_WARMUP_THREAD: Optional[threading.Thread] = None
+_WARMUP_ERROR: Optional[BaseException] = None
+_WARMUP_LOCK = threading.Lock()
+
+
+@contextmanager
+def _timed(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _STARTUP_TIMINGS[phase] = time.perf_counter() - start
+
+
+def _load() -> None:
+    global _EMBEDDINGS, _INDEX, _INDEX_CONFIG, _ROW_RECIPE_IDS, _LEXICAL
+
+    with _timed("import_libraries"):
+        from src.retrieval.embedders import make_embedder
+
+    # torch backend: includes importing torch / sentence-transformers
+    with _timed("load_embedding_model"):
+        embeddings = make_embedder(EMBEDDING_BACKEND)
+
+    # Raw index + row -> recipe_id array per shard, memory-mapped read-only
+    # (page-cache shared between serving processes, nothing unpickled)
+    with _timed("load_faiss_index"):
+        # Index type, sharding and query-time knobs chosen at build time
+        config = load_index_config()
+        index = load_sharded_index(config)
+
+    with _timed("load_lexical_index"):
+        lexical = load_lexical_index()
+
+    _EMBEDDINGS, _INDEX_CONFIG, _ROW_RECIPE_IDS = embeddings, config, index.row_recipe_ids
+    _LEXICAL = lexical
+    _INDEX = index  # published last: non-None means fully loaded
+
+
+def _get_index() -> ShardedIndex:
+    """
+    Shared (possibly sharded) FAISS index, loading the model and index on first use.
+    """
+    if _INDEX is None:
+        with _LOAD_LOCK:
+            if _INDEX is None:
+                _load()
+    return _INDEX
+
+
+def _warmup() -> None:
+    global _WARMUP_ERROR
+    try:
+        index = _get_index()
+        if "first_query" not in _STARTUP_TIMINGS:
+            # First encode/search pays lazy allocations; keep it off the
+            # first user request
+            with _timed("first_query"):
+                index.search(np.asarray([_EMBEDDINGS.embed_query("warmup")], dtype=np.float32), 1)
+        _WARMUP_ERROR = None
+    except Exception as e:
+        _WARMUP_ERROR = e
+        print(f"⚠️ Retriever warm-up failed: {e}")
+
+
+def warmup(background: bool = True) -> Optional[threading.Thread]:
+    """
+    Load the embedding model and FAISS index and run one query.
+
+    With background=True (the default) this starts a daemon thread and
+    returns it; repeated calls reuse the running/finished thread. Searches
+    issued meanwhile simply wait for the load.
+    """
+    global _WARMUP_THREAD
+    if not background:
+        _warmup()
+        return None
+
+    with _WARMUP_LOCK:
+        if _WARMUP_THREAD is None:
+            _WARMUP_THREAD = threading.Thread(target=_warmup, name="retriever-warmup", daemon=True)
+            _WARMUP_THREAD.start()
+        return _WARMUP_THREAD
+
+
+def startup_timings() -> dict:
+    """
+    Seconds spent per startup phase so far, for cold-start tracking.
+    """
+    phases = dict(_STARTUP_TIMINGS)
+    return {
+        "phases": phases,
+        "total_s": sum(phases.values()),
+        "ready": _INDEX is not None,
+        "index": _INDEX_CONFIG.describe() if _INDEX_CONFIG else None,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "warmup_error": repr(_WARMUP_ERROR) if _WARMUP_ERROR else None,
+    }
+
+
+# --------------------------------------------------
+# Query caches
+# --------------------------------------------------
+# Embeddings depend only on the text; ranked ids also depend on the data,
+# so they expire (TTL) and are dropped when the dataset version changes.
+
+_QUERY_EMBEDDINGS = QueryCache(QUERY_EMBEDDING_CACHE_SIZE)
+_RESULTS = QueryCache(RETRIEVAL_CACHE_SIZE, ttl_s=RETRIEVAL_CACHE_TTL_S)
+
+
+def _embed_queries(normalized: Sequence[str]) -> np.ndarray:
+    """
+    (n, dim) float32 matrix for already-normalized queries. Cache misses
+    are encoded together in one batched forward pass.
+    """
+    vectors: List[Optional[np.ndarray]] = [_QUERY_EMBEDDINGS.get(q) for q in normalized]
+    missing = list(dict.fromkeys(q for q, v in zip(normalized, vectors) if v is None))
+
+    if missing:
+        _get_index()
+        encoded = np.asarray(_EMBEDDINGS.embed_documents(missing), dtype=np.float32)
+        fresh = {}
+        for q, vector in zip(missing, encoded):
+            vector.setflags(write=False)
+            _QUERY_EMBEDDINGS.put(q, vector)
+            fresh[q] = vector
+        vectors = [fresh[q] if v is None else v for q, v in zip(normalized, vectors)]
+
+    return np.vstack(vectors)
+
+
+_ROW_OF_RECIPE: Optional[np.ndarray] = None    # recipe_id -> global row (-1 = not indexed)
+
+
+def _rows_of(recipe_ids: np.ndarray) -> np.ndarray:
+    """Global FAISS row of each recipe_id (-1 if not in the index)."""
+    global _ROW_OF_RECIPE
+    _get_index()
+    if _ROW_OF_RECIPE is None:
+        live = np.flatnonzero(_ROW_RECIPE_IDS >= 0)
+        row_of = np.full(int(_ROW_RECIPE_IDS.max(initial=0)) + 1, -1, dtype=np.int64)
+        row_of[_ROW_RECIPE_IDS[live]] = live
+        _ROW_OF_RECIPE = row_of
+    in_range = (recipe_ids >= 0) & (recipe_ids < len(_ROW_OF_RECIPE))
+    return np.where(in_range, _ROW_OF_RECIPE[np.where(in_range, recipe_ids, 0)], -1)
+
+
+def _rows_to_ids(rows: np.ndarray) -> List[List[int]]:
+    ids = np.where(rows >= 0, _ROW_RECIPE_IDS[rows], -1)
+    return [[int(rid) for rid in row if rid >= 0] for row in ids]
+
+
+def _search(vectors: np.ndarray, k: int) -> List[List[int]]:
+    """
+    One FAISS search over a query matrix (all shards); ranked recipe_ids
+    per query. Compressed indexes built with rerank > 0 re-order their
+    candidates exactly inside each shard.
+    """
+    _, rows = _get_index().search(vectors, k)
+    return _rows_to_ids(rows)
+
+
+# --------------------------------------------------
+# Filtered search
+# --------------------------------------------------
+# Filters become a bitmap over FAISS rows that the index checks while
+# searching, so every returned hit is valid. IVF/HNSW only visit part of
+# the index, so a selective filter can leave them short of k; those
+# queries are re-run with nprobe / efSearch widened 4x at a time.
+
+@dataclass(frozen=True)
+class _AllowedRows:
+    rows: np.ndarray                 # bool per global FAISS row
+    bits: List[np.ndarray]           # same, packed per shard (kept alive for the selectors)
+    selectors: List["faiss.IDSelector"]
+    count: int
+    lexical_rows: Optional[np.ndarray] = None   # bool per BM25 row (hybrid mode)
+
+
+_ALLOWED_ROWS = QueryCache(64)
+_FILTER_STATS = {"searches": 0, "widened": 0, "post_filtered": 0, "short": 0}
+_FILTER_STATS_LOCK = threading.Lock()    # searches run on concurrent tool threads
+
+
+def _count(stat: str, n: int) -> None:
+    with _FILTER_STATS_LOCK:
+        _FILTER_STATS[stat] += n
+
+
+def _allowed_rows(filters: RecipeFilters) -> Optional[_AllowedRows]:
+    if filters.is_empty:
+        return None
+    _ALLOWED_ROWS.check_version(current_dataset_version())
+    allowed = _ALLOWED_ROWS.get(filters)
+    if allowed is None:
+        index = _get_index()
+        by_recipe = filters.recipe_mask(int(_ROW_RECIPE_IDS.max(initial=0)) + 1)
+        rows = np.where(_ROW_RECIPE_IDS >= 0, by_recipe[_ROW_RECIPE_IDS], False)
+        shard_selectors = index.selectors(rows)
+        allowed = _AllowedRows(
+            rows=rows,
+            bits=[bits for bits, _ in shard_selectors],
+            selectors=[selector for _, selector in shard_selectors],
+            count=int(rows.sum()),
+            lexical_rows=_LEXICAL.row_mask(by_recipe) if _LEXICAL is not None else None,
+        )
+        _ALLOWED_ROWS.put(filters, allowed)
+    return allowed
+
+
+def _rows_allowed(rows: np.ndarray) -> _AllowedRows:
+    """_AllowedRows for an explicit set of global rows (not cached)."""
+    mask = np.zeros(len(_ROW_RECIPE_IDS), dtype=bool)
+    mask[rows] = True
+    shard_selectors = _get_index().selectors(mask)
+    return _AllowedRows(
+        rows=mask,
+        bits=[bits for bits, _ in shard_selectors],
+        selectors=[selector for _, selector in shard_selectors],
+        count=int(mask.sum()),
+    )
+
+
+def _post_filtered_search(vectors: np.ndarray, k: int, allowed: _AllowedRows, oversample: int) -> List[List[int]]:
+    """Fallback for indexes without selector support: over-fetch and drop."""
+    index = _get_index()
+    fetch = k * oversample
+    while True:
+        _, rows = index.search(vectors, min(fetch, index.ntotal))
+        kept = [[r for r in row if r >= 0 and allowed.rows[r]][:k] for row in rows]
+        if all(len(r) >= min(k, allowed.count) for r in kept) or fetch >= index.ntotal:
+            return _rows_to_ids(np.array([r + [-1] * (k - len(r)) for r in kept], dtype=np.int64))
+        fetch *= 4
+
+
+def _filtered_search(
+        vectors: np.ndarray,
+        k: int,
+        filters: RecipeFilters,
+        oversample: int = 3,
+) -> List[List[int]]:
+    """
+    Top-k recipe_ids per query among recipes passing `filters`; returns
+    fewer than k only if fewer recipes pass.
+    """
+    allowed = _allowed_rows(filters)
+    if allowed is None:
+        return _search(vectors, k)
+    return _search_allowed(vectors, k, allowed, oversample)
+
+
+def _search_allowed(
+        vectors: np.ndarray,
+        k: int,
+        allowed: _AllowedRows,
+        oversample: int = 3,
+) -> List[List[int]]:
+    """Top-k recipe_ids per query among `allowed` rows (see _filtered_search)."""
+    _count("searches", len(vectors))
+    results: List[List[int]] = [[] for _ in range(len(vectors))]
+    target = min(k, allowed.count)
+    if target == 0:
+        return results
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = _get_index()
+    pending = np.arange(len(vectors))
+    scale = 1
+
+    while True:
+        try:
+            _, rows = index.search(vectors[pending], k, allowed.selectors, scale)
+        except RuntimeError:
+            _count("post_filtered", len(pending))
+            for i, ids in zip(pending, _post_filtered_search(vectors[pending], k, allowed, oversample)):
+                results[i] = ids
+            break
+
+        for i, ids in zip(pending, _rows_to_ids(rows)):
+            results[i] = ids
+        pending = np.array([i for i in pending if len(results[i]) < target], dtype=np.int64)
+        if not len(pending) or not index.can_widen(scale):
+            break
+        _count("widened", len(pending))
+        scale *= 4
+
+    _count("short", sum(len(r) < target for r in results))
+    return results
+
+
+# --------------------------------------------------
+# Hybrid (BM25 + vector) retrieval
+# --------------------------------------------------
+# Each side ranks HYBRID_CANDIDATES recipes under the same filters and the
+# lists are merged with reciprocal-rank fusion, so exact dish names and
+# rare ingredients the embedding blurs still surface.
+
+RETRIEVAL_MODES = ("vector", "hybrid")
+
+
+def _lexical_search(queries: Sequence[str], k: int, filters: RecipeFilters) -> List[List[int]]:
+    """
+    BM25 top-k per query (empty lists when the index predates the
+    lexical index, i.e. hybrid degrades to vector-only).
+    """
+    _get_index()
+    if _LEXICAL is None:
+        return [[] for _ in queries]
+    allowed = _allowed_rows(filters)
+    mask = allowed.lexical_rows if allowed is not None else None
+    return [_LEXICAL.search(q, k, mask) for q in queries]
+
+
+def _hybrid_search(
+        queries: Sequence[str],
+        vectors: np.ndarray,
+        k: int,
+        filters: RecipeFilters,
+        oversample: int = 3,
+) -> List[List[int]]:
+    depth = max(k, HYBRID_CANDIDATES)
+    semantic = _filtered_search(vectors, depth, filters, oversample)
+    lexical = _lexical_search(queries, depth, filters)
+    return [
+        reciprocal_rank_fusion([sem, lex], k, rrf_k=RRF_K)
+        for sem, lex in zip(semantic, lexical)
+    ]
+
+
+# --------------------------------------------------
+# Diversity (MMR) re-ranking
+# --------------------------------------------------
+# Picks k of the oversampled candidates, trading similarity to the query
+# against similarity to recipes already picked, so near-duplicates do not
+# fill the list.
+
+def _fused_rank_relevance(found: List[List[int]], width: int) -> np.ndarray:
+    """
+    (q, width) relevance of fused-list positions: 1 / (RRF_K + rank),
+    scaled per query so the first candidate is 1 and the last is 0.
+    Decreasing in rank, so lambda = 1.0 keeps the fused order.
+    """
+    scores = 1.0 / (RRF_K + 1.0 + np.arange(width, dtype=np.float32))
+    lengths = np.array([max(len(ids), 1) for ids in found])
+    last = scores[lengths - 1][:, None]
+    return (scores[None, :] - last) / np.maximum(scores[0] - last, 1e-12)
+
+
+def _diversify(
+        vectors: np.ndarray,
+        found: List[List[int]],
+        k: int,
+        mmr_lambda: float,
+        fused: bool = False,
+) -> List[List[int]]:
+    """
+    MMR over each candidate list. Relevance is cosine to the query, or
+    with `fused` (hybrid lists) the position in the fused ranking, so
+    the BM25 evidence is not thrown away.
+    """
+    width = max((len(ids) for ids in found), default=0)
+    if width <= k:
+        return [ids[:k] for ids in found] if width else found
+
+    ids = np.full((len(found), width), -1, dtype=np.int64)
+    for i, row in enumerate(found):
+        ids[i, :len(row)] = row
+    rows = _rows_of(ids.ravel()).reshape(ids.shape)
+    valid = rows >= 0
+
+    candidates = np.zeros((*ids.shape, vectors.shape[1]), dtype=np.float32)
+    candidates[valid] = _get_index().reconstruct(rows[valid])
+
+    relevance = _fused_rank_relevance(found, width) if fused else None
+    picks = mmr_select(vectors, candidates, k, mmr_lambda, valid, relevance)
+    return [[int(ids[i, j]) for j in row if j >= 0] for i, row in enumerate(picks)]
+
+
+def retrieval_cache_stats() -> dict:
+    with _FILTER_STATS_LOCK:
+        filtered_search = dict(_FILTER_STATS)
+    return {
+        "query_embeddings": _QUERY_EMBEDDINGS.stats(),
+        "results": _RESULTS.stats(),
+        "filter_bitmaps": _ALLOWED_ROWS.stats(),
+        "filtered_search": filtered_search,
+    }
+
+
+def clear_retrieval_caches() -> None:
+    _QUERY_EMBEDDINGS.clear()
+    _RESULTS.clear()
+    _ALLOWED_ROWS.clear()
 
 
 # --------------------------------------------------
@@ -40,50 +455,173 @@ def retrieve_recipe_ids(query: str, k: int = 10) -> List[int]:
     """
     Semantic retrieval: returns recipe_ids only.
     """
-    docs = _VECTORSTORE.similarity_search(query, k=k)
-    recipe_ids = [int(d.metadata["recipe_id"]) for d in docs if "recipe_id" in d.metadata]
+    key = ("ids", normalize_query(query), k)
+    _RESULTS.check_version(current_dataset_version())
+    cached = _RESULTS.get(key)
+    if cached is not None:
+        return list(cached)
+
+    recipe_ids = _search(_embed_queries([key[1]]), k)[0]
+
+    _RESULTS.put(key, tuple(recipe_ids))
     return recipe_ids
 
 
+def rank_recipe_ids(query: str, recipe_ids: Sequence[int], k: int) -> List[int]:
+    """
+    Semantic re-ranking of a given candidate set: the k of `recipe_ids`
+    closest to `query`, nearest first.
+
+    The query is encoded once (through the embedding cache), the
+    candidates' stored vectors are reconstructed from the index and scored
+    with one matrix-vector product. Every candidate is considered;
+    candidates missing from the index follow the ranked ones in input order.
+    Above RERANK_MAX_CANDIDATES indexed candidates, the index is searched
+    with a bitmap over their rows instead (approximate for IVF / HNSW).
+    """
+    k = max(0, int(k))
+    candidates = np.fromiter(dict.fromkeys(int(rid) for rid in recipe_ids), dtype=np.int64)
+    if not k or not len(candidates):
+        return []
+
+    query_vector = _embed_queries([normalize_query(query)])[0]
+    rows = _rows_of(candidates)
+    indexed = rows >= 0
+
+    ranked: List[int] = []
+    if indexed.sum() > RERANK_MAX_CANDIDATES:
+        allowed = _rows_allowed(rows[indexed])
+        ranked = _search_allowed(query_vector[None, :], k, allowed)[0]
+    elif indexed.any():
+        vectors = _get_index().reconstruct(rows[indexed])
+        # Squared L2 minus the constant |q|^2, as the index ranks
+        dist = np.einsum("ij,ij->i", vectors, vectors) - 2.0 * (vectors @ query_vector)
+        top = min(k, len(dist))
+        best = np.argpartition(dist, top - 1)[:top]
+        best = best[np.argsort(dist[best], kind="stable")]
+        ranked = candidates[indexed][best].tolist()
+
+    if len(ranked) < k:
+        ranked += candidates[~indexed][:k - len(ranked)].tolist()
+    return ranked
+
+
 def retrieve_recipes(
     query: str,
     k: int = 5,
     exclude: Optional[List[str]] = None,
     oversample: int = 3,
+    fields: Fields = "full",
+    tags: Optional[List[str]] = None,
+    calories: Optional[Range] = None,
+    minutes: Optional[Range] = None,
+    mode: str = "vector",
+    mmr_lambda: Optional[float] = None,
 ) -> RetrievalResult:
     """
-    Retrieve recipes semantically, then enforce deterministic filters via SQL.
+    Retrieve recipes semantically, with hard filters applied inside the
+    vector search (so k results come back whenever k recipes qualify).
 
     Args:
         query: user query text
         k: final number of recipes to return
         exclude: ingredients to exclude (e.g., allergies)
-        oversample: retrieve k*oversample candidates from FAISS before filtering
+        oversample: over-fetch factor (indexes that cannot filter in-search,
+                    and the candidate pool of the MMR stage: k * oversample)
+        fields: recipe field set / columns to fetch (see src.db.recipes)
+        tags: tags every recipe must carry
+        calories / minutes: inclusive (low, high) ranges, None = open
+        mode: "vector" (embedding similarity) or "hybrid" (BM25 + vector,
+              fused by reciprocal rank; better on exact names / rare terms)
+        mmr_lambda: None = plain ranking; otherwise re-rank the candidate
+              pool by maximal marginal relevance (1.0 = relevance only,
+              lower values favour variety, ~0.7 is a good start); in
+              hybrid mode relevance is the fused rank
 
     Returns:
         RetrievalResult(recipe_ids, recipes)
     """
+    return retrieve_recipes_many(
+        [query],
+        k=k,
+        exclude=exclude,
+        oversample=oversample,
+        fields=fields,
+        tags=tags,
+        calories=calories,
+        minutes=minutes,
+        mode=mode,
+        mmr_lambda=mmr_lambda,
+    )[0]
+
+
+def retrieve_recipes_many(
+    queries: Sequence[str],
+    k: int = 5,
+    exclude: Optional[List[str]] = None,
+    oversample: int = 3,
+    fields: Fields = "full",
+    tags: Optional[List[str]] = None,
+    calories: Optional[Range] = None,
+    minutes: Optional[Range] = None,
+    mode: str = "vector",
+    mmr_lambda: Optional[float] = None,
+) -> List[RetrievalResult]:
+    """
+    `retrieve_recipes` for several queries at once: one batched encode of
+    the uncached queries, one filtered FAISS search over the query matrix
+    and one DB fetch for the union of results.
+
+    Returns:
+        One RetrievalResult per query, in input order
+    """
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}' (expected one of {RETRIEVAL_MODES})")
+    if mmr_lambda is not None and not 0.0 <= mmr_lambda <= 1.0:
+        raise ValueError(f"mmr_lambda must be in [0, 1], got {mmr_lambda}")
     k = max(1, int(k))
     oversample = max(1, int(oversample))
+    if not queries:
+        return []
 
-    # 1) FAISS candidate recall
-    candidate_ids = retrieve_recipe_ids(query, k=k * oversample)
-    if not candidate_ids:
-        return RetrievalResult(recipe_ids=[], recipes=[])
-
-    # 2) Fetch full rows from DB (preserves FAISS order)
-    df = get_recipes_by_ids(candidate_ids)
+    filters = RecipeFilters.build(exclude=exclude, tags=tags, calories=calories, minutes=minutes)
+    normalized = [normalize_query(q) for q in queries]
 
-    # 3) Enforce hard exclusions deterministically
-    if exclude:
-        df = exclude_ingredients(df, exclude)
+    # 0) Cached final ids (hot queries skip encode + search)
+    _RESULTS.check_version(current_dataset_version())
+    final: Dict[str, Tuple[int, ...]] = {}
+    for q in dict.fromkeys(normalized):
+        cached = _RESULTS.get(("recipes", mode, q, k, filters, mmr_lambda))
+        if cached is not None:
+            final[q] = cached
 
-    if df.empty:
-        return RetrievalResult(recipe_ids=[], recipes=[])
+    # 1) Batched encode + single filtered FAISS search for the rest
+    #    (hybrid also ranks with BM25 and fuses the two lists; MMR
+    #    re-ranks a k * oversample pool for variety)
+    todo = [q for q in dict.fromkeys(normalized) if q not in final]
+    if todo:
+        vectors = _embed_queries(todo)
+        depth = k if mmr_lambda is None else k * oversample
+        if mode == "hybrid":
+            found = _hybrid_search(todo, vectors, depth, filters, oversample)
+        else:
+            found = _filtered_search(vectors, depth, filters, oversample)
+        if mmr_lambda is not None:
+            found = _diversify(vectors, found, k, mmr_lambda, fused=mode == "hybrid")
+        for q, ids in zip(todo, found):
+            final[q] = tuple(ids)
+            _RESULTS.put(("recipes", mode, q, k, filters, mmr_lambda), final[q])
 
-    # 4) Limit to top-k after filtering
-    df = df.head(k)
-    recipes = df.to_dict(orient="records")
-    recipe_ids = [int(r["recipe_id"]) for r in recipes]
+    # 2) One fetch for every id any query returns
+    union = list(dict.fromkeys(rid for ids in final.values() for rid in ids))
+    df = get_recipes_by_ids(union, fields=fields)
+    rows = {int(r["recipe_id"]): r for r in df.to_dict(orient="records")}
 
-    return RetrievalResult(recipe_ids=recipe_ids, recipes=recipes)
+    results = []
+    for q in normalized:
+        recipes = [dict(rows[rid]) for rid in final[q] if rid in rows]
+        results.append(RetrievalResult(
+            recipe_ids=[int(r["recipe_id"]) for r in recipes],
+            recipes=recipes,
+        ))
+    return results
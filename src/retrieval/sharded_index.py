@@ -0,0 +1,245 @@
+# src/retrieval/sharded_index.py
+#
+# The recipe vector index as N independent shards. Each shard directory
+# has the single-index layout (index.faiss, recipe_ids.npy,
+# index_config.json, optional vectors.npy), so shards are built, updated
+# and rebuilt on their own. An unsharded index is the one-shard case
+# stored directly in the index directory.
+#
+# Searches fan out to the shards on a thread pool (FAISS releases the GIL
+# while searching) and the per-shard top-k lists are merged with a heap.
+# Rows are global: shard i's local row r is offset_i + r.
+
+from __future__ import annotations
+
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from src.config.settings import SHARD_SEARCH_THREADS, VECTOR_INDEX_PATH
+from src.retrieval.vector_index import (
+    INDEX_FILE,
+    INDEX_STAMP_FILE,
+    RERANK_VECTORS_FILE,
+    ROW_IDS_FILE,
+    IndexConfig,
+    apply_search_params,
+    can_widen,
+    exact_rerank,
+    index_exists,
+    load_index,
+    load_index_config,
+    load_rerank_vectors,
+    search_parameters,
+)
+
+SHARD_DIR_FORMAT = "shard-{:03d}"
+
+
+# ==================================================
+# Layout / assignment
+# ==================================================
+
+def shard_dirs(config: IndexConfig, index_dir: Path = VECTOR_INDEX_PATH) -> List[Path]:
+    if not config.is_sharded:
+        return [index_dir]
+    return [index_dir / SHARD_DIR_FORMAT.format(i) for i in range(config.shards)]
+
+
+def sharded_index_exists(config: IndexConfig, index_dir: Path = VECTOR_INDEX_PATH) -> bool:
+    return all(index_exists(d) for d in shard_dirs(config, index_dir))
+
+
+def range_bounds(recipe_ids: Sequence[int], n_shards: int) -> Tuple[int, ...]:
+    """First recipe_id of shards 1..n-1, splitting `recipe_ids` into equal parts."""
+    ids = np.sort(np.asarray(recipe_ids, dtype=np.int64))
+    return tuple(int(ids[len(ids) * i // n_shards]) for i in range(1, n_shards))
+
+
+def assign_shards(config: IndexConfig, recipe_ids: Sequence[int]) -> np.ndarray:
+    """Shard number of each recipe_id (recipes never move between shards)."""
+    recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+    if not config.is_sharded:
+        return np.zeros(len(recipe_ids), dtype=np.int64)
+    if config.shard_by == "range":
+        if config.shard_bounds is None:
+            raise ValueError("Range-sharded config has no shard_bounds (resolve them at build time)")
+        return np.searchsorted(np.asarray(config.shard_bounds), recipe_ids, side="right")
+    return recipe_ids % config.shards
+
+
+def remove_stale_shards(config: IndexConfig, index_dir: Path = VECTOR_INDEX_PATH) -> None:
+    """
+    Drop files of a previous layout: shard directories beyond
+    `config.shards` and, for a sharded index, the single-index files.
+    """
+    keep = set(shard_dirs(config, index_dir))
+    for path in index_dir.glob(SHARD_DIR_FORMAT.replace("{:03d}", "*")):
+        if path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+    if config.is_sharded:
+        for name in (INDEX_FILE, ROW_IDS_FILE, INDEX_STAMP_FILE, RERANK_VECTORS_FILE):
+            (index_dir / name).unlink(missing_ok=True)
+
+
+# ==================================================
+# Search
+# ==================================================
+
+@dataclass
+class IndexShard:
+    index: faiss.Index
+    row_recipe_ids: np.ndarray              # local row -> recipe_id (-1 = removed)
+    config: IndexConfig
+    rerank_vectors: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        # IVF shards reconstruct through a row -> list position map; built
+        # here, before the shard is shared between search threads. Rows
+        # removed by updates leave id holes, which need the hash map.
+        if self.rerank_vectors is None:
+            ivf = faiss.try_extract_index_ivf(self.index)
+            if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+                sequential = ivf.ntotal == len(self.row_recipe_ids)
+                ivf.set_direct_map_type(faiss.DirectMap.Array if sequential else faiss.DirectMap.Hashtable)
+
+    def search(
+            self,
+            queries: np.ndarray,
+            k: int,
+            selector: Optional["faiss.IDSelector"] = None,
+            scale: int = 1,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(distances, local rows), k columns, -1 padded."""
+        params = search_parameters(self.config, selector, scale) if selector is not None else None
+        if self.rerank_vectors is None:
+            return self.index.search(queries, k, params=params)
+        _, rows = self.index.search(queries, k * self.config.rerank, params=params)
+        return exact_rerank(queries, rows, self.rerank_vectors, k)
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Stored vectors of local rows: full precision when re-rank vectors
+        exist, else decoded from the index (lossy for compressed kinds).
+        """
+        if self.rerank_vectors is not None:
+            return np.asarray(self.rerank_vectors[rows], dtype=np.float32)
+        return self.index.reconstruct_batch(np.ascontiguousarray(rows, dtype=np.int64))
+
+
+class ShardedIndex:
+    """
+    Search over all shards as if they were one index with global rows.
+    """
+
+    def __init__(self, shards: List[IndexShard], threads: int = SHARD_SEARCH_THREADS):
+        if not shards:
+            raise ValueError("ShardedIndex needs at least one shard")
+        self.shards = shards
+        sizes = [len(s.row_recipe_ids) for s in shards]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        # One shard keeps the (memory-mapped) array as is
+        self.row_recipe_ids = (
+            shards[0].row_recipe_ids if len(shards) == 1
+            else np.concatenate([s.row_recipe_ids for s in shards])
+        )
+        self._pool = (
+            ThreadPoolExecutor(max_workers=threads or len(shards), thread_name_prefix="faiss-shard")
+            if len(shards) > 1 else None
+        )
+
+    @property
+    def ntotal(self) -> int:
+        return sum(s.index.ntotal for s in self.shards)
+
+    @property
+    def d(self) -> int:
+        return self.shards[0].index.d
+
+    def selectors(self, rows: np.ndarray) -> List[Tuple[np.ndarray, "faiss.IDSelector"]]:
+        """
+        Per-shard (bits, selector) for a bool mask over global rows; the
+        packed bits must stay alive as long as the selector.
+        """
+        out = []
+        for shard, offset in zip(self.shards, self.offsets):
+            local = rows[offset:offset + len(shard.row_recipe_ids)]
+            bits = np.packbits(local, bitorder="little")
+            out.append((bits, faiss.IDSelectorBitmap(len(local), faiss.swig_ptr(bits))))
+        return out
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        """(len(rows), d) stored vectors of global rows (all >= 0)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        shard_of = np.searchsorted(self.offsets, rows, side="right") - 1
+        out = np.empty((len(rows), self.d), dtype=np.float32)
+        for shard in np.unique(shard_of):
+            at = np.flatnonzero(shard_of == shard)
+            out[at] = self.shards[shard].reconstruct(rows[at] - self.offsets[shard])
+        return out
+
+    def can_widen(self, scale: int) -> bool:
+        return any(can_widen(s.config, scale, s.index.ntotal) for s in self.shards)
+
+    def search(
+            self,
+            queries: np.ndarray,
+            k: int,
+            selectors: Optional[Sequence["faiss.IDSelector"]] = None,
+            scale: int = 1,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (distances, global rows) of the top-k over all shards, -1 padded.
+        `selectors` is one per shard (see selectors()); `scale` widens
+        IVF / HNSW searches.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        selectors = selectors or [None] * len(self.shards)
+        if self._pool is None:
+            return self.shards[0].search(queries, k, selectors[0], scale)
+
+        futures = [
+            self._pool.submit(shard.search, queries, k, selector, scale)
+            for shard, selector in zip(self.shards, selectors)
+        ]
+        heap = faiss.ResultHeap(len(queries), k)
+        for future, offset in zip(futures, self.offsets):
+            dist, rows = future.result()
+            heap.add_result(
+                np.ascontiguousarray(dist, dtype=np.float32),
+                np.where(rows >= 0, rows + offset, -1),
+            )
+        heap.finalize()
+        return heap.D, heap.I
+
+
+def load_sharded_index(
+        config: Optional[IndexConfig] = None,
+        index_dir: Path = VECTOR_INDEX_PATH,
+        mmap: bool = True,
+        threads: int = SHARD_SEARCH_THREADS,
+) -> ShardedIndex:
+    """
+    All shards of the index in `index_dir`, with the query-time knobs
+    (nprobe / efSearch / rerank) of the top-level config applied to each.
+    """
+    config = config or load_index_config(index_dir)
+    shards = []
+    for shard_dir in shard_dirs(config, index_dir):
+        index, row_recipe_ids = load_index(shard_dir, mmap=mmap)
+        shard_config = config
+        if config.is_sharded:
+            shard_config = load_index_config(shard_dir).with_search_params(
+                nprobe=config.nprobe,
+                ef_search=config.ef_search,
+                rerank=config.rerank,
+            )
+        apply_search_params(index, shard_config)
+        rerank_vectors = load_rerank_vectors(shard_dir) if shard_config.rerank else None
+        shards.append(IndexShard(index, row_recipe_ids, shard_config, rerank_vectors))
+    return ShardedIndex(shards, threads)
@@ -0,0 +1,464 @@
+# src/retrieval/vector_index.py
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from src.config.settings import VECTOR_INDEX_PATH
+
+INDEX_KINDS = ("flat", "ivf", "hnsw", "sq8", "sqfp16", "ivfpq")
+IVF_KINDS = ("ivf", "ivfpq")
+# How recipes are split across shards (see src.retrieval.sharded_index)
+SHARD_STRATEGIES = ("hash", "range")
+
+# Lean on-disk format: the raw FAISS index plus FAISS row -> recipe_id
+# (-1 = removed row), no pickled docstore
+INDEX_FILE = "index.faiss"
+ROW_IDS_FILE = "recipe_ids.npy"
+INDEX_CONFIG_FILE = "index_config.json"
+# ntotal plus the identity (inode, size, mtime) of the index.faiss /
+# recipe_ids.npy pair last saved together; the two files are replaced
+# one after the other, so a reader checks it to never pair new ids with
+# an old index
+INDEX_STAMP_FILE = "index_stamp.json"
+# Full-precision float32 vectors by FAISS row, for exact re-ranking of
+# compressed-index candidates (written when rerank > 0)
+RERANK_VECTORS_FILE = "vectors.npy"
+
+# Map the index file instead of reading it (flat codes / HNSW storage via
+# MMAP_IFC, inverted lists via MMAP), so serving processes share its pages
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+# IVF k-means sample size per inverted list
+TRAIN_POINTS_PER_LIST = 64
+# PQ k-means sample size per sub-quantizer centroid
+TRAIN_POINTS_PER_CENTROID = 39
+# Enough rows to estimate per-dimension ranges for sq8
+SQ_TRAIN_POINTS = 65536
+
+
+# ==================================================
+# Index configuration
+# ==================================================
+
+def default_nlist(n_vectors: int) -> int:
+    # ~4 * sqrt(n), keeping >= 39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(max(n_vectors, 1))), n_vectors // 39))
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    """
+    Build- and search-time parameters of the recipe FAISS index.
+
+    flat:   exact L2 search (the original behaviour)
+    ivf:    inverted lists; `nlist` clusters, `nprobe` visited per query
+            (nlist=None picks ~4 * sqrt(n) at build time)
+    hnsw:   graph index; `hnsw_m` links per node, `ef_construction` /
+            `ef_search` candidate list sizes
+    sq8 / sqfp16: exhaustive search over scalar-quantized codes
+            (1 / 2 bytes per dimension instead of 4)
+    ivfpq:  inverted lists over product-quantized codes, `pq_m`
+            sub-vectors of `pq_nbits` bits each (pq_m bytes per vector at 8 bits)
+
+    rerank > 0 fetches k * rerank candidates and re-orders them by exact
+    distance to the full-precision vectors (memory-mapped from disk).
+
+    shards > 1 splits the recipes into independent indexes of this kind,
+    by recipe_id modulo shards ("hash") or by recipe_id range ("range";
+    `shard_bounds` are the first recipe_id of shards 1..N-1, picked at
+    build time for equal-sized shards).
+    """
+    kind: str = "flat"
+    nlist: Optional[int] = None
+    nprobe: int = 16
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    pq_m: int = 48
+    pq_nbits: int = 8
+    rerank: int = 0
+    shards: int = 1
+    shard_by: str = "hash"
+    shard_bounds: Optional[Tuple[int, ...]] = None
+
+    def __post_init__(self):
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index type '{self.kind}' (expected one of {INDEX_KINDS})")
+        if self.shard_by not in SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy '{self.shard_by}' (expected one of {SHARD_STRATEGIES})")
+        if self.shard_bounds is not None:
+            # Lists when read back from JSON
+            object.__setattr__(self, "shard_bounds", tuple(int(b) for b in self.shard_bounds))
+
+    @property
+    def is_ivf(self) -> bool:
+        return self.kind in IVF_KINDS
+
+    @property
+    def is_sharded(self) -> bool:
+        return self.shards > 1
+
+    def unsharded(self) -> "IndexConfig":
+        """Config of one shard (same kind and knobs)."""
+        return replace(self, shards=1, shard_by="hash", shard_bounds=None)
+
+    def describe(self) -> str:
+        if self.kind == "ivf":
+            text = f"ivf(nlist={self.nlist}, nprobe={self.nprobe})"
+        elif self.kind == "ivfpq":
+            text = f"ivfpq(nlist={self.nlist}, m={self.pq_m}x{self.pq_nbits}b, nprobe={self.nprobe})"
+        elif self.kind == "hnsw":
+            text = f"hnsw(M={self.hnsw_m}, efSearch={self.ef_search})"
+        else:
+            text = self.kind
+        if self.rerank:
+            text += f" +rerank x{self.rerank}"
+        if self.is_sharded:
+            text += f" x{self.shards} shards ({self.shard_by})"
+        return text
+
+    def bytes_per_vector(self, dim: int) -> float:
+        """Approximate index memory per vector (codes + ids, excluding HNSW links)."""
+        if self.kind == "sq8":
+            return dim
+        if self.kind == "sqfp16":
+            return 2 * dim
+        if self.kind == "ivfpq":
+            return self.pq_m * self.pq_nbits / 8 + 8
+        return 4 * dim + (8 if self.kind == "ivf" else 0)
+
+    def resolved(self, n_vectors: int) -> "IndexConfig":
+        """Fill in build-time defaults that depend on corpus size."""
+        if self.is_ivf and self.nlist is None:
+            return replace(self, nlist=default_nlist(n_vectors))
+        return self
+
+    def with_search_params(self, **params) -> "IndexConfig":
+        return replace(self, **params)
+
+    def same_structure(self, built: "IndexConfig") -> bool:
+        """
+        True if an index built with `built` can serve this config by only
+        changing query-time knobs (nlist=None accepts any nlist).
+        """
+        if (self.kind, self.shards) != (built.kind, built.shards):
+            return False
+        if self.is_sharded and self.shard_by != built.shard_by:
+            return False
+        if self.kind == "ivf":
+            return self.nlist is None or self.nlist == built.nlist
+        if self.kind == "ivfpq":
+            return (
+                (self.nlist is None or self.nlist == built.nlist)
+                and (self.pq_m, self.pq_nbits) == (built.pq_m, built.pq_nbits)
+            )
+        if self.kind == "hnsw":
+            return (self.hnsw_m, self.ef_construction) == (built.hnsw_m, built.ef_construction)
+        return True
+
+
+def save_index_config(config: IndexConfig, index_dir: Path = VECTOR_INDEX_PATH) -> None:
+    index_dir.mkdir(parents=True, exist_ok=True)
+    (index_dir / INDEX_CONFIG_FILE).write_text(json.dumps(asdict(config), indent=2))
+
+
+def load_index_config(index_dir: Path = VECTOR_INDEX_PATH) -> IndexConfig:
+    """
+    Config the index was built with (flat for indexes that predate it).
+    """
+    path = index_dir / INDEX_CONFIG_FILE
+    if not path.exists():
+        return IndexConfig()
+    return IndexConfig(**json.loads(path.read_text()))
+
+
+# ==================================================
+# Build / tune
+# ==================================================
+
+def make_index(
+        config: IndexConfig,
+        dim: int,
+        n_vectors: int,
+        training_vectors: Optional[np.ndarray] = None,
+) -> faiss.Index:
+    """
+    Empty (but trained) FAISS index for `config`. IVF / PQ / sq8 need
+    `training_vectors`, a representative sample of the corpus.
+    """
+    config = config.resolved(n_vectors)
+
+    if config.kind == "flat":
+        index = faiss.IndexFlatL2(dim)
+
+    elif config.kind == "ivf":
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, config.nlist, faiss.METRIC_L2)
+
+    elif config.kind == "ivfpq":
+        if dim % config.pq_m:
+            raise ValueError(f"pq_m={config.pq_m} must divide the embedding dimension {dim}")
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, config.nlist, config.pq_m, config.pq_nbits)
+
+    elif config.kind == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+
+    elif config.kind == "sqfp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+
+    else:
+        index = faiss.IndexHNSWFlat(dim, config.hnsw_m)
+        index.hnsw.efConstruction = config.ef_construction
+
+    if not index.is_trained:
+        if training_vectors is None:
+            raise ValueError(f"{config.kind} index needs training vectors")
+        index.train(np.ascontiguousarray(training_vectors, dtype=np.float32))
+
+    apply_search_params(index, config)
+    return index
+
+
+def training_size(config: IndexConfig, n_vectors: int) -> int:
+    """How many corpus vectors to sample for training (0 = none needed)."""
+    config = config.resolved(n_vectors)
+    if config.kind == "ivf":
+        return min(n_vectors, TRAIN_POINTS_PER_LIST * config.nlist)
+    if config.kind == "ivfpq":
+        pq_points = TRAIN_POINTS_PER_CENTROID * 2 ** config.pq_nbits
+        return min(n_vectors, max(TRAIN_POINTS_PER_LIST * config.nlist, pq_points))
+    if config.kind == "sq8":
+        return min(n_vectors, SQ_TRAIN_POINTS)
+    return 0
+
+
+def apply_search_params(index: faiss.Index, config: IndexConfig) -> None:
+    """
+    Set query-time knobs (nprobe / efSearch) on a built or loaded index.
+    """
+    if config.is_ivf:
+        faiss.extract_index_ivf(index).nprobe = config.nprobe
+    elif config.kind == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = config.ef_search
+
+
+def search_parameters(
+        config: IndexConfig,
+        selector: Optional[faiss.IDSelector] = None,
+        scale: int = 1,
+) -> faiss.SearchParameters:
+    """
+    Per-call search parameters: an optional id selector (filtering inside
+    the search) and the query-time knobs multiplied by `scale`, used to
+    widen IVF/HNSW searches when a selective filter starves them.
+    """
+    if config.is_ivf:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=min(config.nprobe * scale, config.nlist))
+    if config.kind == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=config.ef_search * scale)
+    return faiss.SearchParameters(sel=selector)
+
+
+def can_widen(config: IndexConfig, scale: int, ntotal: int) -> bool:
+    """False once a search at `scale` is already exhaustive."""
+    if config.is_ivf:
+        return config.nprobe * scale < config.nlist
+    if config.kind == "hnsw":
+        return config.ef_search * scale < ntotal
+    return False
+
+
+def build_index(
+        config: IndexConfig,
+        dim: int,
+        n_vectors: int,
+        blocks: Iterable[np.ndarray],
+        training_vectors: Optional[np.ndarray] = None,
+) -> faiss.Index:
+    """
+    Build an index for `config` from vector blocks (added in order, so
+    FAISS row i is the i-th vector). IVF trains on `training_vectors`.
+    """
+    index = make_index(config, dim, n_vectors, training_vectors)
+    for block in blocks:
+        index.add(np.ascontiguousarray(block, dtype=np.float32))
+    return index
+
+
+# ==================================================
+# In-place updates (row -> recipe_id bookkeeping)
+# ==================================================
+# IndexFlat / HNSW ids are row positions, so removing rows shifts the
+# rest down. IVF keeps the ids it was given, so removed rows leave -1
+# holes and new vectors get fresh ids past the end.
+
+def remove_rows(index: faiss.Index, row_recipe_ids: np.ndarray, rows: Sequence[int]) -> np.ndarray:
+    """
+    Remove FAISS rows; returns the updated row -> recipe_id array.
+    Raises RuntimeError for index types that cannot remove (HNSW).
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    index.remove_ids(rows)
+    if isinstance(faiss.try_extract_index_ivf(index), faiss.IndexIVF):
+        out = np.array(row_recipe_ids, dtype=np.int64)
+        out[rows] = -1
+        return out
+    return np.delete(row_recipe_ids, rows)
+
+
+def add_rows(index: faiss.Index, row_recipe_ids: np.ndarray, vectors: np.ndarray, recipe_ids: Sequence[int]) -> np.ndarray:
+    """Append vectors; returns the updated row -> recipe_id array."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if isinstance(faiss.try_extract_index_ivf(index), faiss.IndexIVF):
+        index.add_with_ids(vectors, np.arange(len(row_recipe_ids), len(row_recipe_ids) + len(vectors)))
+    else:
+        index.add(vectors)
+    return np.concatenate([row_recipe_ids, np.asarray(recipe_ids, dtype=np.int64)])
+
+
+# ==================================================
+# Persist / load
+# ==================================================
+
+# Attempts load_index makes while a save swaps the files underneath it
+LOAD_ATTEMPTS = 20
+LOAD_RETRY_SECS = 0.05
+
+
+def _file_stamp(path: Path) -> list:
+    st = path.stat()
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def save_index(index: faiss.Index, row_recipe_ids: np.ndarray, index_dir: Path = VECTOR_INDEX_PATH) -> None:
+    """
+    Write index.faiss + recipe_ids.npy. Each file is written to a temp
+    name and renamed over the old one, so a mapped reader never sees a
+    partially written file; the stamp, renamed in last, marks the pair
+    as complete.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    ids_tmp = index_dir / (ROW_IDS_FILE + ".tmp")
+    with open(ids_tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(row_recipe_ids, dtype=np.int64))
+    index_tmp = index_dir / (INDEX_FILE + ".tmp")
+    faiss.write_index(index, str(index_tmp))
+    # Renames keep inode / size / mtime, so the stamp is taken up front
+    stamp = {"ntotal": int(index.ntotal), "index": _file_stamp(index_tmp), "ids": _file_stamp(ids_tmp)}
+    stamp_tmp = index_dir / (INDEX_STAMP_FILE + ".tmp")
+    stamp_tmp.write_text(json.dumps(stamp))
+
+    os.replace(ids_tmp, index_dir / ROW_IDS_FILE)
+    os.replace(index_tmp, index_dir / INDEX_FILE)
+    os.replace(stamp_tmp, index_dir / INDEX_STAMP_FILE)
+
+
+def index_exists(index_dir: Path = VECTOR_INDEX_PATH) -> bool:
+    return (index_dir / INDEX_FILE).exists() and (index_dir / ROW_IDS_FILE).exists()
+
+
+def load_index(index_dir: Path = VECTOR_INDEX_PATH, mmap: bool = True) -> Tuple[faiss.Index, np.ndarray]:
+    """
+    (index, row -> recipe_id). With mmap=True both are mapped read-only
+    (for serving); mmap=False reads a writable copy (for updates).
+
+    The pair is checked against the stamp written by save_index and
+    re-read while a concurrent save is mid-swap (indexes saved before
+    stamps existed load unchecked).
+    """
+    if not index_exists(index_dir):
+        raise FileNotFoundError(
+            f"No {INDEX_FILE} + {ROW_IDS_FILE} in {index_dir} - "
+            "run `python -m src.ingestion.build_vectorstore` (indexes saved by "
+            "LangChain's save_local need one rebuild; --update does it from the embedding cache)"
+        )
+    stamp_path = index_dir / INDEX_STAMP_FILE
+    for _ in range(LOAD_ATTEMPTS):
+        stamp = json.loads(stamp_path.read_text()) if stamp_path.exists() else None
+        index = faiss.read_index(str(index_dir / INDEX_FILE), MMAP_FLAGS if mmap else 0)
+        row_recipe_ids = np.load(index_dir / ROW_IDS_FILE, mmap_mode="r" if mmap else None)
+        # Files only move forward, so matching stats after the reads mean
+        # both reads saw the stamped pair
+        if stamp is None or (
+            index.ntotal == stamp["ntotal"]
+            and _file_stamp(index_dir / INDEX_FILE) == stamp["index"]
+            and _file_stamp(index_dir / ROW_IDS_FILE) == stamp["ids"]
+        ):
+            break
+        time.sleep(LOAD_RETRY_SECS)
+    else:
+        raise ValueError(
+            f"{INDEX_FILE} / {ROW_IDS_FILE} in {index_dir} do not match {INDEX_STAMP_FILE} "
+            "(interrupted save?) - rebuild with `python -m src.ingestion.build_vectorstore`"
+        )
+    if len(row_recipe_ids) < index.ntotal:
+        raise ValueError(f"{ROW_IDS_FILE} has {len(row_recipe_ids)} rows for {index.ntotal} vectors")
+    return index, row_recipe_ids
+
+
+# ==================================================
+# Exact re-ranking (compressed indexes)
+# ==================================================
+
+def save_rerank_vectors(
+        blocks: Iterable[np.ndarray],
+        n_rows: int,
+        dim: int,
+        index_dir: Path = VECTOR_INDEX_PATH,
+) -> None:
+    """
+    Write the full-precision vectors in FAISS row order (blocks of
+    consecutive rows), via a temp file renamed into place.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    tmp = index_dir / (RERANK_VECTORS_FILE + ".tmp")
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(n_rows, dim))
+    start = 0
+    for block in blocks:
+        out[start:start + len(block)] = block
+        start += len(block)
+    out.flush()
+    del out
+    os.replace(tmp, index_dir / RERANK_VECTORS_FILE)
+
+
+def load_rerank_vectors(index_dir: Path = VECTOR_INDEX_PATH) -> Optional[np.ndarray]:
+    """Row-aligned float32 vectors, memory-mapped read-only (None if not built)."""
+    path = index_dir / RERANK_VECTORS_FILE
+    return np.load(path, mmap_mode="r") if path.exists() else None
+
+
+def exact_rerank(
+        queries: np.ndarray,
+        rows: np.ndarray,
+        vectors: np.ndarray,
+        k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Re-order candidate rows (-1 = none) by exact L2 distance to the
+    full-precision `vectors`; returns (distances, rows) of the top-k per
+    query, padded with (inf, -1). Only the candidates' pages of the mapped
+    file are read.
+    """
+    valid = rows >= 0
+    candidates = vectors[np.where(valid, rows, 0)]                     # (nq, m, dim)
+    dist = ((candidates - queries[:, None, :]) ** 2).sum(axis=2)
+    dist[~valid] = np.inf
+
+    order = np.argsort(dist, axis=1, kind="stable")[:, :k]
+    top_dist = np.take_along_axis(dist, order, axis=1)
+    top = np.take_along_axis(rows, order, axis=1)
+    top[np.isinf(top_dist)] = -1
+    return top_dist, top
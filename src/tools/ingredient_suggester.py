@@ -6,7 +6,7 @@ from src.db.recipes import (
     get_recipes_with_any_ingredients,
     get_recipes_by_ids,  # IMPORTANT: re-ground semantic results
 )
-from src.retrieval.recipe_retriever import retrieve_recipes
+from src.retrieval.recipe_retriever import rank_recipe_ids
 from src.tools.registry import ToolSpec, register_tool
 
 
@@ -87,10 +87,13 @@ def ingredient_suggester(
 
     assumptions: List[str] = []
 
+    # Candidates are ranked ids straight from the ingredient index;
+    # display rows are fetched for the final k only.
+
     # ----------------------------
     # 1) STRICT match
     # ----------------------------
-    df = get_recipes_with_all_ingredients(ingredients)
+    df = get_recipes_with_all_ingredients(ingredients, fields="id")
     match_mode = "strict"
 
     # ----------------------------
@@ -100,6 +103,7 @@ def ingredient_suggester(
         df = get_recipes_with_any_ingredients(
             ingredients=ingredients,
             min_matches=max(1, len(ingredients) - 1),
+            fields="id",
         )
         match_mode = "relaxed"
 
@@ -124,22 +128,14 @@ def ingredient_suggester(
     candidate_ids = df["recipe_id"].tolist()
 
     if semantic_rerank and candidate_ids:
-        semantic = retrieve_recipes(
-            query=" ".join(ingredients),
-            k=min(len(candidate_ids), k * 3),
-        )
-
-        ranked_ids = [
-            r["recipe_id"]
-            for r in semantic.recipes
-            if r.get("recipe_id") in candidate_ids
-        ][:k]
+        # Scores exactly the SQL candidates against the query embedding
+        ranked_ids = rank_recipe_ids(" ".join(ingredients), candidate_ids, k)
 
         # 🔒 RE-GROUND through DB
-        df = get_recipes_by_ids(ranked_ids)
+        df = get_recipes_by_ids(ranked_ids, fields="card")
 
     else:
-        df = df.head(k)
+        df = get_recipes_by_ids(candidate_ids[:k], fields="card")
 
     # ----------------------------
     # 4) Final sanitize
@@ -48,7 +48,7 @@ def meal_planner(
             ],
         }
 
-    df = get_recipes_by_ids(candidate_recipe_ids)
+    df = get_recipes_by_ids(candidate_recipe_ids, fields="name")
 
     if df.empty:
         return {
@@ -69,8 +69,8 @@ def meal_planner(
         recipe = df.iloc[idx % len(df)]
         plan.append({
             "day": day,
-            "recipe_id": int(recipe.recipe_id),
-            "name": recipe.name,
+            "recipe_id": int(recipe["recipe_id"]),
+            "name": recipe["name"],
         })
         idx += 1
 
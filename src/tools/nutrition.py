@@ -1,9 +1,10 @@
 # src/tools/nutrition.py
 
-from typing import List
+from typing import Dict, List, Tuple
 from pydantic import BaseModel, Field
 
-from src.db.recipes import get_recipes_by_ids
+from src.db.nutrition_store import get_nutrition_store
+from src.db.recipes import NUTRITION_COLUMNS, get_recipes_by_ids
 from src.tools.registry import ToolSpec, register_tool
 
 
@@ -15,6 +16,30 @@ class NutritionAnalyzerInput(BaseModel):
     recipe_ids: List[int] = Field(..., min_items=1)
 
 
+# --------------------------------------------------
+# Internal helpers
+# --------------------------------------------------
+
+def _summarize(recipe_ids: List[int]) -> Tuple[Dict[int, dict], Dict[str, float]]:
+    """
+    Per-recipe nutrition and totals.
+    Served from the memory-mapped columnar store when it has been built,
+    otherwise from SQLite.
+    """
+    store = get_nutrition_store()
+    if store is not None:
+        return store.summarize(recipe_ids)
+
+    df = get_recipes_by_ids(recipe_ids, fields="nutrition")
+    if df.empty:
+        return {}, {}
+
+    values = df.set_index("recipe_id")[list(NUTRITION_COLUMNS)].astype(float)
+    totals = {col: float(v) for col, v in values.fillna(0).sum().items()}
+    per_recipe = {int(rid): row for rid, row in values.to_dict(orient="index").items()}
+    return per_recipe, totals
+
+
 # --------------------------------------------------
 # Tool implementation
 # --------------------------------------------------
@@ -40,7 +65,7 @@ def nutrition_analyzer(recipe_ids: List[int], **kwargs) -> dict:
         }
 
     try:
-        df = get_recipes_by_ids(recipe_ids)
+        per_recipe, totals = _summarize(recipe_ids)
     except Exception:
         return {
             "type": "nutrition_summary",
@@ -50,7 +75,7 @@ def nutrition_analyzer(recipe_ids: List[int], **kwargs) -> dict:
             "assumptions": ["Failed to retrieve nutrition data."],
         }
 
-    if df.empty:
+    if not per_recipe:
         return {
             "type": "nutrition_summary",
             "recipe_ids": recipe_ids,
@@ -59,32 +84,6 @@ def nutrition_analyzer(recipe_ids: List[int], **kwargs) -> dict:
             "assumptions": ["No nutrition data available for the selected recipes."],
         }
 
-    nutrition_cols = [
-        "calories",
-        "total_fat_pdv",
-        "sugar_pdv",
-        "sodium_pdv",
-        "protein_pdv",
-        "saturated_fat_pdv",
-        "carbs_pdv",
-    ]
-
-    # Sum totals safely
-    totals = {
-        col: float(df[col].fillna(0).sum())
-        for col in nutrition_cols
-        if col in df.columns
-    }
-
-    # Per-recipe breakdown
-    per_recipe = {}
-    for _, row in df.iterrows():
-        rid = int(row["recipe_id"])
-        per_recipe[rid] = {
-            col: float(row[col]) if col in df.columns and row[col] is not None else 0.0
-            for col in nutrition_cols
-        }
-
     return {
         "type": "nutrition_summary",
         "recipe_ids": recipe_ids,
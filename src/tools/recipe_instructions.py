@@ -8,7 +8,7 @@ def recipe_instructions(recipe_id: int) -> Dict[str, Any]:
     Return grounded cooking instructions for a recipe.
     """
 
-    df = get_recipes_by_ids([recipe_id])
+    df = get_recipes_by_ids([recipe_id], fields="id")
 
     if df.empty:
         return {
@@ -1,6 +1,7 @@
 from typing import Optional
 from pydantic import BaseModel, Field
 
+from src.config.settings import RECIPE_LOOKUP_MMR_LAMBDA
 from src.retrieval.recipe_retriever import retrieve_recipes
 from src.tools.registry import ToolSpec, register_tool
 
@@ -34,7 +35,12 @@ def recipe_lookup(query: str, k: int = 5, **kwargs) -> dict:
         }
 
     try:
-        result = retrieve_recipes(query=query, k=k)
+        result = retrieve_recipes(
+            query=query,
+            k=k,
+            fields="lookup",
+            mmr_lambda=RECIPE_LOOKUP_MMR_LAMBDA,
+        )
     except Exception:
         # NEVER crash the execution loop
         return {
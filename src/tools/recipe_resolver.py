@@ -1,13 +1,12 @@
 from typing import Dict, Any
-from src.db.engine import engine
-import pandas as pd
+from src.db.recipes import search_recipes_by_name
 
 from src.tools.registry import ToolSpec, register_tool
 
 
 def resolve_recipe_by_name(name: str) -> Dict[str, Any]:
     """
-    Resolve a recipe name to a recipe_id using exact or fuzzy match.
+    Resolve a recipe name to a recipe_id using ranked full-text matching.
     """
 
     if not name:
@@ -17,18 +16,7 @@ def resolve_recipe_by_name(name: str) -> Dict[str, Any]:
             "assumptions": ["No recipe name provided."]
         }
 
-    query = """
-    SELECT recipe_id, name
-    FROM recipes
-    WHERE LOWER(name) LIKE ?
-    LIMIT 5
-    """
-
-    df = pd.read_sql(
-        query,
-        engine,
-        params=(f"%{name.lower()}%",)
-    )
+    df = search_recipes_by_name(name, limit=5)
 
     if df.empty:
         return {
@@ -37,7 +25,7 @@ def resolve_recipe_by_name(name: str) -> Dict[str, Any]:
             "assumptions": ["No matching recipe names found."]
         }
 
-    # Choose the best match deterministically (first row)
+    # Best match: exact name first, then bm25 rank
     best = df.iloc[0]
 
     return {
@@ -45,7 +33,7 @@ def resolve_recipe_by_name(name: str) -> Dict[str, Any]:
         "resolved_name": best["name"],
         "matches": df.to_dict(orient="records"),
         "assumptions": [
-            "Recipe was resolved by fuzzy name matching."
+            "Recipe was resolved by ranked name matching."
         ]
     }
 
@@ -2,9 +2,8 @@
 
 from typing import List, Dict, Set
 from pydantic import BaseModel, Field
-import json
 
-from src.db.recipes import get_recipes_by_ids
+from src.db.recipes import get_recipe_ingredients_many
 from src.tools.registry import ToolSpec, register_tool
 
 
@@ -28,7 +27,7 @@ def shopping_list(days: List[Dict], **kwargs) -> dict:
     Defensive behavior:
     - Empty days → empty list
     - Missing recipe IDs → skipped
-    - Bad ingredient JSON → skipped
+    - Unknown recipe IDs → contribute nothing
     """
 
     if not days:
@@ -41,7 +40,7 @@ def shopping_list(days: List[Dict], **kwargs) -> dict:
     recipe_ids = [
         d.get("recipe_id")
         for d in days
-        if isinstance(d, dict) and "recipe_id" in d
+        if isinstance(d, dict) and d.get("recipe_id") is not None
     ]
 
     if not recipe_ids:
@@ -52,7 +51,7 @@ def shopping_list(days: List[Dict], **kwargs) -> dict:
         }
 
     try:
-        df = get_recipes_by_ids(recipe_ids)
+        ingredients_by_recipe = get_recipe_ingredients_many(recipe_ids)
     except Exception:
         return {
             "type": "shopping_list",
@@ -60,24 +59,17 @@ def shopping_list(days: List[Dict], **kwargs) -> dict:
             "assumptions": ["Failed to retrieve recipes for shopping list."],
         }
 
-    if df.empty:
+    if not any(ingredients_by_recipe.values()):
         return {
             "type": "shopping_list",
             "items": [],
             "assumptions": ["No recipes found for the meal plan."],
         }
 
+    # Normalized (stripped, lower-cased) at build time
     items: Set[str] = set()
-
-    for _, row in df.iterrows():
-        try:
-            ingredients = json.loads(row.ingredients_json)
-            for ing in ingredients:
-                if isinstance(ing, str):
-                    items.add(ing.strip().lower())
-        except Exception:
-            # Skip malformed ingredient lists
-            continue
+    for ingredients in ingredients_by_recipe.values():
+        items.update(ingredients)
 
     return {
         "type": "shopping_list",